@@ -8,7 +8,6 @@ from app.db.session import get_db
 from datetime import timedelta
 from app.db.models.session import Session
 from dotenv import load_dotenv
-from app.services.authorization.permissions_service import PermissionService
 import os
 
 from sqlalchemy import select
@@ -31,19 +30,17 @@ async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
 ):
-    # 1. Autenticar usuario
-    user = await AuthService.authenticate_user(form_data.username, form_data.password, db)
-    if not user:
+    # 1. Autenticar usuario (usuario + permisos en una sola consulta)
+    authenticated = await AuthService.authenticate_login(form_data.username, form_data.password, db)
+    if not authenticated:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    
+    user, permissions = authenticated
+
     # 2. Configurar tiempos de expiración
     expires_delta_access = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     expires_delta_refresh = timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES)
 
-    # 3. Obtener permisos como strings
-    permissions = await PermissionService.get_user_permissions(user.id, db)
-
-    # 4. Crear access y refresh tokens
+    # 3. Crear access y refresh tokens
     access_token, access_expiration = AuthService.create_access_token(
         data={
             "sub": user.email,
@@ -64,7 +61,7 @@ async def login(
         expires_delta=expires_delta_refresh 
     )
 
-    # 5. Guardar sesión
+    # 4. Guardar sesión (sesión + refresh token en una sentencia)
     await AuthService.create_session(
         db=db,
         user_id=user.id,
@@ -74,7 +71,7 @@ async def login(
         refresh_expires_at=refresh_expiration,
     )
 
-    # 6. Respuesta
+    # 5. Respuesta
     return {
         "access_token": access_token,
         "expires_in_access": access_expiration.isoformat(),
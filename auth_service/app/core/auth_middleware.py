@@ -1,7 +1,6 @@
-from fastapi import Request, HTTPException
-from fastapi.routing import APIRoute
 from jose import jwt, JWTError
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 import os
 from dotenv import load_dotenv
 
@@ -13,29 +12,48 @@ ALGORITHM = os.getenv("ALGORITHM")
 # Rutas públicas que no requieren autenticación
 EXCLUDED_PATHS = {"/auth/api/v1/login", "/auth/api/v1/signup", "/auth/api/v1/refresh", "/auth/api/v1/status", "/auth/redoc", "/auth/docs", "/auth/openapi.json", "/auth/metrics", "/metrics"}
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class AuthMiddleware:
+    """Middleware ASGI puro (sin BaseHTTPMiddleware); responde 401 en JSON."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Omitir rutas excluidas
-        path=request.url.path
-        if path in EXCLUDED_PATHS:
-            return await call_next(request)
+        if scope["type"] != "http" or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
 
-        auth_header = request.headers.get("Authorization")
+        auth_header = _header(scope, b"authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
-            raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+            await _unauthorized("Missing or invalid Authorization header")(scope, receive, send)
+            return
 
         token = auth_header[len("Bearer "):]
 
         try:
             payload = jwt.decode(token, ACCESS_TOKEN_SECRET_KEY, algorithms=[ALGORITHM])
-            # Guardar información del usuario en el request.state
-            request.state.user = {
-                "username": payload.get("sub"),
-                "user_id": payload.get("user_id"),
-                "tenant_id": payload.get("tenant_id"),
-                "permissions": payload.get("permissions", [])
-            }
         except JWTError:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
+            await _unauthorized("Invalid or expired token")(scope, receive, send)
+            return
+
+        # Guardar información del usuario en el request.state
+        scope.setdefault("state", {})["user"] = {
+            "username": payload.get("sub"),
+            "user_id": payload.get("user_id"),
+            "tenant_id": payload.get("tenant_id"),
+            "permissions": payload.get("permissions", [])
+        }
+        await self.app(scope, receive, send)
+
 
-        return await call_next(request)
\ No newline at end of file
+def _unauthorized(detail: str) -> JSONResponse:
+    return JSONResponse(status_code=401, content={"detail": detail})
@@ -1,5 +1,66 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
\ No newline at end of file
+# Costo de bcrypt (log2 de iteraciones). min = max = default: un hash con otro costo
+# queda "needs_update" y se rehashea en el próximo login exitoso.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt libera el GIL, así que un pool de threads hashea en paralelo sin bloquear el event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
+
+_hash_executor = ThreadPoolExecutor(max_workers=max(1, PASSWORD_HASH_WORKERS), thread_name_prefix="bcrypt")
+# Operaciones enviadas al pool que todavía no terminaron (en cola + ejecutándose)
+_pending = 0
+
+try:
+    from prometheus_client import Gauge, Histogram
+
+    HASH_QUEUE_DEPTH = Gauge(
+        "anb_auth_password_hash_queue_depth", "Operaciones bcrypt pendientes en el pool (en cola + ejecutándose)"
+    )
+    HASH_QUEUE_DEPTH.set_function(lambda: _pending)
+    HASH_SECONDS = Histogram(
+        "anb_auth_password_hash_seconds",
+        "Tiempo de una operación bcrypt incluida la espera en el pool",
+        ["op"],
+        buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    )
+except (ImportError, ValueError):
+    HASH_QUEUE_DEPTH = HASH_SECONDS = None
+
+T = TypeVar("T")
+
+
+async def run_in_hash_pool(op: str, fn: Callable[..., T], *args) -> T:
+    """Ejecuta `fn(*args)` (hash o verify de bcrypt) en el pool dedicado."""
+    global _pending
+    _pending += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _pending -= 1
+        if HASH_SECONDS is not None:
+            HASH_SECONDS.labels(op=op).observe(time.perf_counter() - start)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True si el hash usa otro costo/esquema que el configurado (chequeo barato, sin bcrypt)."""
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except (TypeError, ValueError):
+        return False
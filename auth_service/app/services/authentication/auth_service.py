@@ -6,7 +6,7 @@ from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import distinct, func, insert, literal, select
 
 load_dotenv()
 
@@ -17,13 +17,69 @@ REFRESH_TOKEN_SECRET_KEY = os.environ["REFRESH_TOKEN_SECRET_KEY"]
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ["TOKEN_EXPIRE"])
 REFRESH_TOKEN_EXPIRE_MINUTES = int(os.environ["REFRESH_TOKEN_EXPIRE"])
 
-from app.core.security import pwd_context, oauth2_scheme
+from app.core.security import oauth2_scheme, password_needs_rehash, pwd_context, run_in_hash_pool
+from app.db.models.group_permissions import group_permission_table
+from app.db.models.permission import Permission
 from app.db.models.session import Session
 from app.db.models.refreshToken import RefreshToken
 from app.db.models.user import User
+from app.db.models.user_groups import user_group_table
 from app.services.authentication.user_service import UserService
 
 
+def _login_user_statement(email: str):
+    """Usuario + nombres de permisos (vía grupos) en una sola consulta."""
+    permissions = (
+        select(func.array_agg(distinct(Permission.name)))
+        .select_from(user_group_table)
+        .join(group_permission_table, group_permission_table.c.group_id == user_group_table.c.group_id)
+        .join(Permission, Permission.id == group_permission_table.c.permission_id)
+        .where(user_group_table.c.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    return select(User, permissions.label("permissions")).where(User.email == email)
+
+
+def _create_session_statement(
+    user_id: int,
+    access_token: str,
+    refresh_token: str,
+    access_expires_at: datetime,
+    refresh_expires_at: datetime,
+):
+    """INSERT de la sesión y de su refresh token en una sola sentencia (CTE)."""
+    now = datetime.now(timezone.utc)
+    new_session = (
+        insert(Session)
+        .values(
+            user_id=user_id,
+            session_token=access_token,
+            refresh_token=refresh_token,
+            refresh_expires_at=refresh_expires_at,
+            session_expires_at=access_expires_at,
+            created_at=now,
+            is_active=True,
+        )
+        .returning(Session.id)
+        .cte("new_session")
+    )
+    return (
+        insert(RefreshToken)
+        .from_select(
+            ["session_id", "token", "created_at", "expires_at", "is_active"],
+            select(
+                new_session.c.id,
+                literal(refresh_token, RefreshToken.token.type),
+                literal(now, RefreshToken.created_at.type),
+                literal(refresh_expires_at, RefreshToken.expires_at.type),
+                literal(True, RefreshToken.is_active.type),
+            ),
+        )
+        .returning(RefreshToken.session_id)
+    )
+
+
 
 class AuthService:
     @staticmethod
@@ -34,18 +90,53 @@ class AuthService:
     def get_password_hash(password: str) -> str:
         return pwd_context.hash(password)
 
+    @staticmethod
+    async def check_password(plain_password: str, hashed_password: str) -> bool:
+        """verify_password en el pool de bcrypt (no bloquea el event loop)."""
+        return await run_in_hash_pool("verify", AuthService.verify_password, plain_password, hashed_password)
+
+    @staticmethod
+    async def hash_password(password: str) -> str:
+        """get_password_hash en el pool de bcrypt (no bloquea el event loop)."""
+        return await run_in_hash_pool("hash", AuthService.get_password_hash, password)
+
     @staticmethod
     async def get_user(email: str, db: AsyncSession) -> Optional[User]:
         result = await db.execute(select(User).where(User.email == email))
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def get_user_with_permissions(email: str, db: AsyncSession) -> tuple[Optional[User], list[str]]:
+        """Usuario y sus permisos en un solo round trip (camino de login)."""
+        row = (await db.execute(_login_user_statement(email))).one_or_none()
+        if row is None:
+            return None, []
+        return row[0], sorted(row.permissions or [])
+
+    @staticmethod
+    async def _check_credentials(user: User, password: str) -> bool:
+        if not await AuthService.check_password(password, user.hashed_password):
+            return False
+        if password_needs_rehash(user.hashed_password):
+            # Cambió BCRYPT_ROUNDS: se rehashea con el costo actual; el commit de la sesión de login lo persiste
+            user.hashed_password = await AuthService.hash_password(password)
+        return True
+
     @staticmethod
     async def authenticate_user(email: str, password: str, db: AsyncSession) -> Optional[User]:
         user = await AuthService.get_user(email, db)
-        if not user or not AuthService.verify_password(password, user.hashed_password):
+        if not user or not await AuthService._check_credentials(user, password):
             return None
         return user
 
+    @staticmethod
+    async def authenticate_login(email: str, password: str, db: AsyncSession) -> Optional[tuple[User, list[str]]]:
+        """authenticate_user + permisos, cargados en la misma consulta que el usuario."""
+        user, permissions = await AuthService.get_user_with_permissions(email, db)
+        if not user or not await AuthService._check_credentials(user, password):
+            return None
+        return user, permissions
+
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> tuple[str, datetime]:
         to_encode = data.copy()
@@ -158,27 +249,11 @@ class AuthService:
         refresh_token: str,
         access_expires_at: datetime,
         refresh_expires_at: datetime,
-    ) -> Session:
-        session = Session(
-            user_id=user_id,
-            session_token=access_token,
-            refresh_token=refresh_token,
-            refresh_expires_at=refresh_expires_at,
-            session_expires_at=access_expires_at,
-            created_at=datetime.now(timezone.utc),
-            is_active=True,
-        )
-        db.add(session)
-        await db.flush()
-
-        refresh_entry = RefreshToken(
-            session_id=session.id,
-            token=refresh_token,
-            created_at=datetime.now(timezone.utc),
-            expires_at=refresh_expires_at,
-            is_active=True,
+    ) -> int:
+        """Crea la sesión y su refresh token en una sentencia y hace commit; devuelve el id de la sesión."""
+        result = await db.execute(
+            _create_session_statement(user_id, access_token, refresh_token, access_expires_at, refresh_expires_at)
         )
-        db.add(refresh_entry)
+        session_id = result.scalar_one()
         await db.commit()
-
-        return session
+        return session_id
@@ -26,7 +26,7 @@ class UserService:
             )
 
         # 2) Hash de contraseña (usa password1)
-        hashed_password = AuthService.get_password_hash(user_data.password1)
+        hashed_password = await AuthService.hash_password(user_data.password1)
 
         # 3) Construir el usuario (tenant por defecto a 0)
         new_user = User(
@@ -94,12 +94,11 @@ class TestLoginEndpoint:
 
     def test_login_success(self, client, valid_user_login_data, mock_user):
         """Test login exitoso"""
-        # Mock AuthService.authenticate_user
-        with patch('app.api.v1.endpoints.auth.AuthService.authenticate_user',
-                   return_value=mock_user):
-            # Mock PermissionService.get_user_permissions
-            with patch('app.api.v1.endpoints.auth.PermissionService.get_user_permissions',
-                       return_value=["read", "write"]):
+        # Mock AuthService.authenticate_login (usuario + permisos en una consulta)
+        with patch('app.api.v1.endpoints.auth.AuthService.authenticate_login',
+                   return_value=(mock_user, ["read", "write"])):
+            # Los permisos ya no se piden aparte
+            with patch('app.services.authorization.permissions_service.PermissionService.get_user_permissions') as mock_perms:
                 # Mock AuthService.create_access_token
                 mock_token = "mock_access_token"
                 mock_expiration = datetime.now(timezone.utc) + timedelta(minutes=15)
@@ -125,11 +124,12 @@ class TestLoginEndpoint:
                             assert data["token_type"] == "Bearer"
                             assert "expires_in_access" in data
                             assert "expires_in_refresh" in data
+                            mock_perms.assert_not_called()
 
     def test_login_invalid_credentials(self, client, valid_user_login_data):
         """Test login con credenciales inválidas"""
-        # Mock AuthService.authenticate_user retornando None
-        with patch('app.api.v1.endpoints.auth.AuthService.authenticate_user',
+        # Mock AuthService.authenticate_login retornando None
+        with patch('app.api.v1.endpoints.auth.AuthService.authenticate_login',
                    return_value=None):
             response = client.post(
                 "/auth/api/v1/login",
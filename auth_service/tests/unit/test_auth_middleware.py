@@ -0,0 +1,66 @@
+"""
+Tests del AuthMiddleware (ASGI puro): exclusiones, 401 en JSON y request.state.user
+"""
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.core import auth_middleware
+from app.core.auth_middleware import AuthMiddleware
+
+SECRET = "middleware-test-secret"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(auth_middleware, "ACCESS_TOKEN_SECRET_KEY", SECRET)
+    monkeypatch.setattr(auth_middleware, "ALGORITHM", "HS256")
+
+    app = FastAPI()
+    app.add_middleware(AuthMiddleware)
+
+    @app.get("/auth/api/v1/status")
+    async def status():
+        return {"status": "ok"}
+
+    @app.get("/auth/api/v1/me")
+    async def me(request: Request):
+        return request.state.user
+
+    return TestClient(app)
+
+
+class TestAuthMiddleware:
+    """Tests del middleware de autenticación"""
+
+    def test_excluded_path_skips_auth(self, client):
+        """Las rutas excluidas no piden token"""
+        response = client.get("/auth/api/v1/status")
+        assert response.status_code == 200
+
+    def test_missing_header_returns_401_json(self, client):
+        """Sin Authorization responde 401 con detail"""
+        response = client.get("/auth/api/v1/me")
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Missing or invalid Authorization header"}
+
+    def test_invalid_token_returns_401_json(self, client):
+        """Un token con otra firma responde 401"""
+        token = jwt.encode({"sub": "pedro@test.com"}, "other-secret", algorithm="HS256")
+        response = client.get("/auth/api/v1/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Invalid or expired token"}
+
+    def test_valid_token_sets_request_state_user(self, client):
+        """Con token válido, el usuario queda en request.state.user"""
+        token = jwt.encode({"sub": "pedro@test.com", "user_id": 7, "permissions": ["read"]}, SECRET, algorithm="HS256")
+        response = client.get("/auth/api/v1/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.json() == {
+            "username": "pedro@test.com",
+            "user_id": 7,
+            "tenant_id": None,
+            "permissions": ["read"],
+        }
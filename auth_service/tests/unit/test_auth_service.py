@@ -202,6 +202,62 @@ class TestAuthServiceUserMethods:
 
             assert user is None
 
+    @pytest.mark.asyncio
+    async def test_get_user_with_permissions_single_query(self, mock_db_session, mock_user):
+        """Usuario y permisos salen de una sola consulta"""
+        row = MagicMock()
+        row.__getitem__.side_effect = lambda i: mock_user
+        row.permissions = ["write", "read"]
+        mock_result = MagicMock()
+        mock_result.one_or_none.return_value = row
+        mock_db_session.execute.return_value = mock_result
+
+        user, permissions = await AuthService.get_user_with_permissions(mock_user.email, mock_db_session)
+
+        assert user is mock_user
+        assert permissions == ["read", "write"]
+        assert mock_db_session.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_get_user_with_permissions_without_groups(self, mock_db_session, mock_user):
+        """Sin grupos, array_agg devuelve NULL y se normaliza a []"""
+        row = MagicMock()
+        row.__getitem__.side_effect = lambda i: mock_user
+        row.permissions = None
+        mock_result = MagicMock()
+        mock_result.one_or_none.return_value = row
+        mock_db_session.execute.return_value = mock_result
+
+        assert await AuthService.get_user_with_permissions(mock_user.email, mock_db_session) == (mock_user, [])
+
+    @pytest.mark.asyncio
+    async def test_authenticate_login(self, mock_db_session, mock_user):
+        """authenticate_login devuelve usuario y permisos, o None si la contraseña no coincide"""
+        with patch.object(AuthService, 'get_user_with_permissions', return_value=(mock_user, ["read"])):
+            with patch.object(AuthService, 'verify_password', return_value=True):
+                assert await AuthService.authenticate_login(mock_user.email, "SecurePass123", mock_db_session) == (
+                    mock_user, ["read"]
+                )
+            with patch.object(AuthService, 'verify_password', return_value=False):
+                assert await AuthService.authenticate_login(mock_user.email, "WrongPassword", mock_db_session) is None
+
+    @pytest.mark.asyncio
+    async def test_authenticate_login_not_exists(self, mock_db_session):
+        """authenticate_login con un email inexistente devuelve None"""
+        with patch.object(AuthService, 'get_user_with_permissions', return_value=(None, [])):
+            assert await AuthService.authenticate_login("nonexistent@test.com", "AnyPassword", mock_db_session) is None
+
+    def test_login_user_statement_aggregates_permissions(self):
+        """La consulta de login agrega los permisos en una subconsulta correlacionada"""
+        from sqlalchemy.dialects import postgresql
+        from app.services.authentication.auth_service import _login_user_statement
+
+        sql = str(_login_user_statement("pedro@test.com").compile(dialect=postgresql.dialect()))
+
+        assert "array_agg(DISTINCT permissions.name)" in sql
+        assert "user_groups.user_id = users.id" in sql
+        assert "WHERE users.email = " in sql
+
 
 class TestAuthServiceSessionMethods:
     """Tests para métodos de sesiones"""
@@ -217,11 +273,12 @@ class TestAuthServiceSessionMethods:
         access_expires = datetime.now(timezone.utc) + timedelta(minutes=15)
         refresh_expires = datetime.now(timezone.utc) + timedelta(days=7)
 
-        # Mock flush y commit
-        mock_db_session.flush = AsyncMock()
         mock_db_session.commit = AsyncMock()
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 42
+        mock_db_session.execute.return_value = mock_result
 
-        await AuthService.create_session(
+        session_id = await AuthService.create_session(
             db=mock_db_session,
             user_id=user_id,
             access_token=access_token,
@@ -230,7 +287,71 @@ class TestAuthServiceSessionMethods:
             refresh_expires_at=refresh_expires
         )
 
-        # Verificar que se llamó add dos veces (Session y RefreshToken)
-        assert mock_db_session.add.call_count == 2
-        assert mock_db_session.flush.called
+        # Sesión y refresh token en una sola sentencia, sin flush intermedio
+        assert session_id == 42
+        assert mock_db_session.execute.await_count == 1
+        assert not mock_db_session.add.called
+        assert not mock_db_session.flush.called
         assert mock_db_session.commit.called
+
+    def test_create_session_statement_is_single_cte(self):
+        """INSERT de sessions en un CTE y el refresh token toma su id"""
+        from datetime import datetime, timezone, timedelta
+        from sqlalchemy.dialects import postgresql
+        from app.services.authentication.auth_service import _create_session_statement
+
+        now = datetime.now(timezone.utc)
+        stmt = _create_session_statement(1, "access", "refresh", now + timedelta(minutes=15), now + timedelta(days=7))
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        assert sql.startswith("WITH new_session AS \n(INSERT INTO sessions")
+        assert "RETURNING sessions.id" in sql
+        assert "INSERT INTO refresh_tokens (session_id, token, created_at, expires_at, is_active)" in sql
+        assert "FROM new_session" in sql
+
+
+class TestAuthServicePasswordPool:
+    """Tests del pool de bcrypt y el rehash al iniciar sesión"""
+
+    @pytest.mark.asyncio
+    async def test_check_password_runs_in_hash_pool(self):
+        """verify corre en un thread del pool, no en el del event loop"""
+        import threading
+
+        threads = []
+
+        def _verify(plain, hashed):
+            threads.append(threading.current_thread().name)
+            return True
+
+        with patch.object(AuthService, 'verify_password', side_effect=_verify):
+            assert await AuthService.check_password("pw", "hash") is True
+
+        assert threads and threads[0].startswith("bcrypt")
+
+    @pytest.mark.asyncio
+    async def test_authenticate_user_rehashes_outdated_cost(self, mock_db_session, mock_user):
+        """Un hash con otro costo se reemplaza por uno con BCRYPT_ROUNDS"""
+        from passlib.context import CryptContext
+        from app.core.security import BCRYPT_ROUNDS, password_needs_rehash
+
+        old_rounds = 4 if BCRYPT_ROUNDS != 4 else 5
+        mock_user.hashed_password = CryptContext(schemes=["bcrypt"]).hash("SecurePass123", rounds=old_rounds)
+        assert password_needs_rehash(mock_user.hashed_password)
+
+        with patch.object(AuthService, 'get_user', return_value=mock_user):
+            user = await AuthService.authenticate_user(mock_user.email, "SecurePass123", mock_db_session)
+
+        assert user is mock_user
+        assert user.hashed_password.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+        assert AuthService.verify_password("SecurePass123", user.hashed_password)
+
+    @pytest.mark.asyncio
+    async def test_authenticate_user_keeps_current_hash(self, mock_db_session, mock_user):
+        """Con el costo vigente no se vuelve a hashear"""
+        with patch.object(AuthService, 'get_user', return_value=mock_user), \
+             patch.object(AuthService, 'verify_password', return_value=True), \
+             patch.object(AuthService, 'get_password_hash') as mock_hash:
+            await AuthService.authenticate_user(mock_user.email, "SecurePass123", mock_db_session)
+
+        mock_hash.assert_not_called()
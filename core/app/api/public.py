@@ -3,14 +3,16 @@ Router de endpoints públicos
 Endpoints para listar videos, votar y consultar rankings
 """
 
-from typing import List, Optional
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Annotated, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-import jwt
-import os
 
+from app.core.tokens import request_claims
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 from app.database import get_session
 from app.schemas.vote import (
     PublicVideoResponse,
@@ -35,15 +37,24 @@ _bearer = HTTPBearer(auto_error=False)
     description="Lista todos los videos procesados disponibles para votación",
 )
 async def list_public_videos(
+    response: Response,
     city: Optional[str] = Query(None, description="Filtrar por ciudad"),
     limit: int = Query(50, ge=1, le=100, description="Número máximo de resultados"),
     offset: int = Query(0, ge=0, description="Número de resultados a saltar"),
+    cursor: Annotated[
+        Optional[str],
+        Query(description="Cursor de la página siguiente (header X-Next-Cursor); tiene prioridad sobre offset"),
+    ] = None,
     db: AsyncSession = Depends(get_session),
     service: PublicVideoServicePort = Depends(get_public_video_service),
 ) -> List[PublicVideoResponse]:
     """Lista videos públicos disponibles para votación."""
 
-    records = await service.list_videos(city=city, limit=limit, offset=offset, db=db)
+    after = decode_cursor(cursor, "public_videos", (int, str)) if cursor else None
+    records = await service.list_videos(city=city, limit=limit, offset=offset, after=after, db=db)
+    if records and len(records) == limit:
+        last = records[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor("public_videos", last.votes, last.video_id)
 
     public_videos: List[PublicVideoResponse] = []
     for record in records:
@@ -85,17 +96,13 @@ async def get_public_video(
     )
 
 
-def _get_user_id_from_token(creds: HTTPAuthorizationCredentials) -> str:
-    """Extrae user_id del token JWT"""
+def _get_user_id_from_token(creds: HTTPAuthorizationCredentials, request: Optional[Request] = None) -> str:
+    """Extrae user_id del token JWT (verificado una vez por request, con cache)"""
     if not creds:
         raise HTTPException(status_code=401, detail="Se requiere autenticación")
 
     try:
-        payload = jwt.decode(
-            creds.credentials,
-            os.getenv("ACCESS_TOKEN_SECRET_KEY", ""),
-            algorithms=[os.getenv("ALGORITHM", "HS256")],
-        )
+        payload = request_claims(request, creds.credentials)
         user_id = payload.get("user_id")
         if not user_id:
             raise ValueError("Token no contiene user_id")
@@ -113,6 +120,7 @@ def _get_user_id_from_token(creds: HTTPAuthorizationCredentials) -> str:
     responses={status.HTTP_400_BAD_REQUEST: {"model": ErrorResponse}},
 )
 async def vote_video(
+    request: Request,
     video_id: str,
     db: AsyncSession = Depends(get_session),
     creds: HTTPAuthorizationCredentials = Depends(_bearer),
@@ -120,7 +128,7 @@ async def vote_video(
 ) -> VoteResponse:
     """Registra un voto para un video."""
 
-    user_id = _get_user_id_from_token(creds)
+    user_id = _get_user_id_from_token(creds, request)
     await service.register_vote(video_id=video_id, user_id=user_id, db=db)
     return VoteResponse(message="Voto registrado exitosamente")
 
@@ -133,6 +141,7 @@ async def vote_video(
     description="Obtiene el ranking de jugadores ordenado por número de votos",
 )
 async def get_rankings(
+    response: Response,
     city: Optional[str] = Query(None, description="Filtrar ranking por ciudad"),
     limit: int = Query(10, ge=1, le=100, description="Número de posiciones a mostrar"),
     db: AsyncSession = Depends(get_session),
@@ -141,6 +150,10 @@ async def get_rankings(
     """Obtiene el ranking de jugadores por votos totales."""
 
     records = await service.get_rankings(city=city, limit=limit, db=db)
+    # Frescura del ranking materializado
+    refreshed = max((r.refreshed_at for r in records if r.refreshed_at), default=None)
+    if refreshed is not None:
+        response.headers["Last-Modified"] = format_datetime(refreshed.replace(tzinfo=timezone.utc), usegmt=True)
     ranking_items = [
         RankingItemResponse(
             position=index + 1,
@@ -3,23 +3,31 @@ Router de gestión de videos
 Endpoints para subir, listar, consultar y eliminar videos
 """
 
-from fastapi import APIRouter, status, HTTPException, UploadFile, File, Form, Response, Depends, Path, Request, BackgroundTasks
+from fastapi import APIRouter, status, HTTPException, UploadFile, File, Form, Response, Depends, Path, Query, Request, BackgroundTasks
 import logging
 import uuid
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-import os, jwt
+import jwt
+from app.core.tokens import request_claims
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 from app.database import get_session
-from app.services.uploads._init_ import get_upload_service
+from app.services.uploads._init_ import get_upload_service, get_direct_upload_service, get_streaming_upload_service
 from app.services.uploads.base import UploadServicePort
 from app.services.videos._init_ import get_video_query_service
 from app.services.videos.base import VideoQueryServicePort
 from app.services.storage.utils import storage_path_to_public_url
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import List
+from typing import List, Optional
+from app.config import settings
 from app.schemas.video import (
+    DirectUploadInitiateRequest,
+    DirectUploadInitiateResponse,
+    DirectUploadCompleteRequest,
     VideoUploadResponse,
     VideoListItemResponse,
     VideoResponse,
+    VideoStatusResponse,
     VideoDeleteResponse
 )
 
@@ -27,16 +35,10 @@ router = APIRouter(prefix="/videos", tags=["Videos"])
 _bearer = HTTPBearer(auto_error=True)
 log = logging.getLogger("anb.api.videos")
 
-def _current_user_id(creds: HTTPAuthorizationCredentials) -> str:
+def _current_user_id(creds: HTTPAuthorizationCredentials, request: Optional[Request] = None) -> str:
     try:
-        payload = jwt.decode(
-             creds.credentials,
-             os.getenv("ACCESS_TOKEN_SECRET_KEY", ""),
-             algorithms=[os.getenv("ALGORITHM", "HS256")],
-             options={"require": ["exp", "iat"], "verify_aud": False, "verify_iss": False},
-             audience=os.getenv("AUTH_AUDIENCE", "anb-api"),
-             issuer=os.getenv("AUTH_ISSUER", "anb-auth"),
-        )
+        # Claims ya verificados por AuthMiddleware (o por el cache de tokens)
+        payload = request_claims(request, creds.credentials)
         sub = payload.get("sub")
         if not sub:
                 raise ValueError("El token no trae 'sub'")
@@ -74,7 +76,7 @@ async def upload_video(
     log.info("Entrando a /upload: " + title)
     # Correlation: primero en el recorrido
     correlation_id = request.headers.get("x-correlation-id") or f"corr-{uuid.uuid4().hex[:12]}"
-    user_id = _current_user_id(creds)
+    user_id = _current_user_id(creds, request)
     user_info = _get_user_from_request(request)
 
     service: UploadServicePort = get_upload_service()
@@ -101,6 +103,110 @@ async def upload_video(
     return result
 
 
+@router.post(
+    "/upload/stream",
+    status_code=status.HTTP_201_CREATED,
+    response_model=VideoUploadResponse,
+    summary="Subir video en streaming",
+    description="Mismo formulario que /upload (video_file, title); el archivo va por partes a S3 mientras llega, sin archivo temporal",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["video_file", "title"],
+                        "properties": {
+                            "video_file": {"type": "string", "format": "binary"},
+                            "title": {"type": "string"},
+                        },
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_video_stream(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_session),
+    creds: HTTPAuthorizationCredentials = Depends(_bearer),
+) -> VideoUploadResponse:
+    correlation_id = request.headers.get("x-correlation-id") or f"corr-{uuid.uuid4().hex[:12]}"
+    user_id = _current_user_id(creds, request)
+    video, correlation_id = await get_streaming_upload_service().upload(
+        request=request,
+        user_id=user_id,
+        user_info=_get_user_from_request(request),
+        db=db,
+        correlation_id=correlation_id,
+        background_tasks=background_tasks,
+    )
+    response.headers["Location"] = f"/api/videos/{video.id}"
+    return VideoUploadResponse(
+        message="Video subido correctamente. Procesamiento en curso.",
+        video_id=str(video.id),
+        task_id=correlation_id,
+    )
+
+
+@router.post(
+    "/upload/initiate",
+    status_code=status.HTTP_201_CREATED,
+    response_model=DirectUploadInitiateResponse,
+    summary="Iniciar subida directa a S3",
+    description="Devuelve URLs prefirmadas (multipart) para subir el archivo directamente a S3",
+)
+async def initiate_direct_upload(
+    request: Request,
+    body: DirectUploadInitiateRequest,
+    creds: HTTPAuthorizationCredentials = Depends(_bearer),
+) -> DirectUploadInitiateResponse:
+    correlation_id = request.headers.get("x-correlation-id") or f"corr-{uuid.uuid4().hex[:12]}"
+    user_id = _current_user_id(creds, request)
+    result = await get_direct_upload_service().initiate(
+        user_id=user_id,
+        title=body.title,
+        filename=body.filename,
+        size_bytes=body.size_bytes,
+        content_type=body.content_type,
+        correlation_id=correlation_id,
+    )
+    return DirectUploadInitiateResponse(**result)
+
+
+@router.post(
+    "/upload/complete",
+    status_code=status.HTTP_201_CREATED,
+    response_model=VideoUploadResponse,
+    summary="Completar subida directa a S3",
+    description="Ensambla las partes subidas, verifica el objeto y encola el procesamiento",
+)
+async def complete_direct_upload(
+    request: Request,
+    response: Response,
+    body: DirectUploadCompleteRequest,
+    db: AsyncSession = Depends(get_session),
+    creds: HTTPAuthorizationCredentials = Depends(_bearer),
+) -> VideoUploadResponse:
+    user_id = _current_user_id(creds, request)
+    video, correlation_id = await get_direct_upload_service().complete(
+        user_id=user_id,
+        upload_token=body.upload_token,
+        parts=[(p.part_number, p.etag) for p in body.parts],
+        user_info=_get_user_from_request(request),
+        db=db,
+    )
+    response.headers["Location"] = f"/api/videos/{video.id}"
+    return VideoUploadResponse(
+        message="Video subido correctamente. Procesamiento en curso.",
+        video_id=str(video.id),
+        task_id=correlation_id,
+    )
+
+
 @router.get(
     "",
     status_code=status.HTTP_200_OK,
@@ -109,19 +215,28 @@ async def upload_video(
     description="Obtiene la lista de videos del usuario autenticado",
 )
 async def get_my_videos(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_session),
     creds: HTTPAuthorizationCredentials = Depends(_bearer),
     service: VideoQueryServicePort = Depends(get_video_query_service),
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> List[VideoListItemResponse]:
-    user_id = _current_user_id(creds)
+    user_id = _current_user_id(creds, request)
+    # Keyset: `cursor` (header X-Next-Cursor de la página anterior) tiene prioridad sobre offset
+    after = decode_cursor(cursor, "my_videos", (datetime.fromisoformat, str)) if cursor else None
     videos = await service.list_user_videos(
         user_id=user_id,
         limit=limit,
         offset=offset,
+        after=after,
         db=db,
     )
+    if videos and len(videos) == limit:
+        last = videos[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor("my_videos", last.created_at, str(last.id))
 
     items: List[VideoListItemResponse] = []
     for v in videos:
@@ -146,12 +261,13 @@ async def get_my_videos(
     description="Detalle de un video del usuario autenticado",
 )
 async def get_video_detail(
+    request: Request,
     video_id: str = Path(..., description="UUID del video"),
     db: AsyncSession = Depends(get_session),
     creds: HTTPAuthorizationCredentials = Depends(_bearer),
     service: VideoQueryServicePort = Depends(get_video_query_service),
 ) -> VideoResponse:
-    user_id = _current_user_id(creds)
+    user_id = _current_user_id(creds, request)
     video = await service.get_user_video(user_id=user_id, video_id=video_id, db=db)
 
     return VideoResponse(
@@ -166,6 +282,44 @@ async def get_video_detail(
     )
 
 
+@router.get(
+    "/{video_id}/status",
+    status_code=status.HTTP_200_OK,
+    response_model=VideoStatusResponse,
+    summary="Esperar cambios de estado del video",
+    description=(
+        "Long-poll: responde en cuanto el estado o el avance difieren de los enviados por el cliente "
+        "(`status`, `progress`), si el video ya terminó, o al cumplirse `wait` segundos."
+    ),
+)
+async def wait_video_status(
+    request: Request,
+    video_id: str = Path(..., description="UUID del video"),
+    wait: int = Query(0, ge=0, description="Segundos máximos de espera (acotado por VIDEO_STATUS_MAX_WAIT_SECONDS)"),
+    known_status: Optional[str] = Query(None, alias="status", description="Último estado conocido por el cliente"),
+    known_progress: Optional[int] = Query(None, alias="progress", description="Último avance conocido por el cliente"),
+    db: AsyncSession = Depends(get_session),
+    creds: HTTPAuthorizationCredentials = Depends(_bearer),
+    service: VideoQueryServicePort = Depends(get_video_query_service),
+) -> VideoStatusResponse:
+    user_id = _current_user_id(creds, request)
+    video = await service.wait_for_status_change(
+        user_id=user_id,
+        video_id=video_id,
+        known_status=known_status,
+        known_progress=known_progress,
+        timeout=min(wait, settings.VIDEO_STATUS_MAX_WAIT_SECONDS),
+        db=db,
+    )
+    return VideoStatusResponse(
+        video_id=str(video.id),
+        status=video.status,
+        progress_percent=video.progress_percent,
+        processed_at=video.processed_at,
+        processed_url=storage_path_to_public_url(video.processed_path),
+    )
+
+
 @router.delete(
     "/{video_id}",
     status_code=status.HTTP_200_OK,
@@ -174,12 +328,13 @@ async def get_video_detail(
     description="Elimina un video propio si aún no está publicado (status != processed).",
 )
 async def delete_video(
+    request: Request,
     video_id: str,
     db: AsyncSession = Depends(get_session),
     creds: HTTPAuthorizationCredentials = Depends(_bearer),
     service: VideoQueryServicePort = Depends(get_video_query_service),
 ) -> VideoDeleteResponse:
-    user_id = _current_user_id(creds)
+    user_id = _current_user_id(creds, request)
     deleted_id = await service.delete_user_video(user_id=user_id, video_id=video_id, db=db)
 
     return VideoDeleteResponse(
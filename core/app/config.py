@@ -28,9 +28,56 @@ class Settings(BaseSettings):
     PROCESSED_DIR: str = os.getenv("PROCESSED_DIR", "/app/storage/processed")
     PUBLIC_BASE_URL: str | None = os.getenv("PUBLIC_BASE_URL") or None
 
+    # Cache de access tokens verificados (claims por digest del token, hasta su exp)
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", "4096"))
+
     # Configuración de base de datos
     DATABASE_URL: str | None = os.getenv("DATABASE_URL") or None
 
+    # Deduplicación por contenido: reutiliza el original en S3 si ya existe un video procesado con el mismo SHA-256
+    UPLOAD_DEDUP_ENABLED: bool = bool(int(os.getenv("UPLOAD_DEDUP_ENABLED", "1")))
+
+    # Reconciliación periódica de videos.votes_count contra la tabla votes (0 = deshabilitada)
+    VOTE_COUNT_RECONCILE_INTERVAL_SECONDS: float = float(os.getenv("VOTE_COUNT_RECONCILE_INTERVAL_SECONDS", "600"))
+
+    # Cache en proceso de /public/videos, /public/videos/{id} y /public/rankings
+    PUBLIC_CACHE_ENABLED: bool = bool(int(os.getenv("PUBLIC_CACHE_ENABLED", "1")))
+    PUBLIC_CACHE_TTL_SECONDS: float = float(os.getenv("PUBLIC_CACHE_TTL_SECONDS", "5"))
+    PUBLIC_CACHE_STALE_SECONDS: float = float(os.getenv("PUBLIC_CACHE_STALE_SECONDS", "30"))
+    PUBLIC_CACHE_MAX_ENTRIES: int = int(os.getenv("PUBLIC_CACHE_MAX_ENTRIES", "1024"))
+    # Canal LISTEN/NOTIFY por el que el worker avisa videos procesados ("" = sin listener)
+    PUBLIC_CACHE_NOTIFY_CHANNEL: str = os.getenv("PUBLIC_CACHE_NOTIFY_CHANNEL", "anb_public_videos")
+
+    # Ingesta de votos write-behind: log local + flush por lotes (0 = un INSERT por voto)
+    VOTE_BUFFER_ENABLED: bool = bool(int(os.getenv("VOTE_BUFFER_ENABLED", "0")))
+    VOTE_BUFFER_DIR: str = os.getenv("VOTE_BUFFER_DIR", "/app/storage/vote_buffer")
+    VOTE_BUFFER_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("VOTE_BUFFER_FLUSH_INTERVAL_SECONDS", "1"))
+    VOTE_BUFFER_MAX_BATCH: int = int(os.getenv("VOTE_BUFFER_MAX_BATCH", "1000"))
+
+    # Ranking materializado (player_rankings): cada cuánto se reconstruye (0 = calcular en vivo)
+    RANKINGS_REFRESH_INTERVAL_SECONDS: float = float(os.getenv("RANKINGS_REFRESH_INTERVAL_SECONDS", "30"))
+
+    # Long-poll de estado de videos (GET /videos/{video_id}/status)
+    VIDEO_STATUS_MAX_WAIT_SECONDS: int = int(os.getenv("VIDEO_STATUS_MAX_WAIT_SECONDS", "30"))
+    VIDEO_STATUS_POLL_INTERVAL_SECONDS: float = float(os.getenv("VIDEO_STATUS_POLL_INTERVAL_SECONDS", "1"))
+
+    # Cola durable de subidas (S3 + publicación fuera del request, con reintentos y replay al arrancar)
+    UPLOAD_QUEUE_ENABLED: bool = bool(int(os.getenv("UPLOAD_QUEUE_ENABLED", "1")))
+    UPLOAD_QUEUE_DIR: str = os.getenv("UPLOAD_QUEUE_DIR", "/app/storage/upload_queue")
+    UPLOAD_QUEUE_MAX_ITEMS: int = int(os.getenv("UPLOAD_QUEUE_MAX_ITEMS", "64"))
+    UPLOAD_QUEUE_WORKERS: int = int(os.getenv("UPLOAD_QUEUE_WORKERS", "4"))
+    UPLOAD_QUEUE_MAX_ATTEMPTS: int = int(os.getenv("UPLOAD_QUEUE_MAX_ATTEMPTS", "10"))
+    UPLOAD_QUEUE_RETRY_AFTER_SECONDS: int = int(os.getenv("UPLOAD_QUEUE_RETRY_AFTER_SECONDS", "5"))
+
+    # Subida directa a S3 (multipart con URLs prefirmadas, sin pasar bytes por la API)
+    DIRECT_UPLOAD_PART_SIZE_MB: int = int(os.getenv("DIRECT_UPLOAD_PART_SIZE_MB", "8"))
+    DIRECT_UPLOAD_URL_EXPIRES_SECONDS: int = int(os.getenv("DIRECT_UPLOAD_URL_EXPIRES_SECONDS", "3600"))
+    DIRECT_UPLOAD_TOKEN_SECRET: str | None = os.getenv("DIRECT_UPLOAD_TOKEN_SECRET") or None
+
+    # Subida en streaming (POST /videos/upload/stream): partes multipart a S3 desde un pool acotado de buffers
+    UPLOAD_STREAM_PART_SIZE_MB: int = int(os.getenv("UPLOAD_STREAM_PART_SIZE_MB", "8"))
+    UPLOAD_STREAM_BUFFERS: int = int(os.getenv("UPLOAD_STREAM_BUFFERS", "16"))
+
     VIDEO_EXCHANGE: str = os.getenv("VIDEO_EXCHANGE", "video")
     WORKER_INPUT_PREFIX: str = "/mnt/uploads"
 
@@ -42,6 +89,10 @@ class Settings(BaseSettings):
     S3_FORCE_PATH_STYLE: bool = bool(int(os.getenv("S3_FORCE_PATH_STYLE", "0")))
     S3_VERIFY_SSL: bool = bool(int(os.getenv("S3_VERIFY_SSL", "1")))
     S3_PUBLIC_BASE_URL: str | None = os.getenv("S3_PUBLIC_BASE_URL") or None
+    # Llamadas S3 desde el event loop (puerto async sobre el executor de I/O)
+    S3_ASYNC_MAX_CONCURRENCY: int = int(os.getenv("S3_ASYNC_MAX_CONCURRENCY", "32"))
+    S3_ASYNC_TIMEOUT_SECONDS: float = float(os.getenv("S3_ASYNC_TIMEOUT_SECONDS", "30"))
+    S3_ASYNC_UPLOAD_TIMEOUT_SECONDS: float = float(os.getenv("S3_ASYNC_UPLOAD_TIMEOUT_SECONDS", "900"))
 
     # Credenciales AWS (fail-fast, se leen del entorno y se pasan explícitamente a boto3)
     AWS_ACCESS_KEY_ID: str | None = os.getenv("AWS_ACCESS_KEY_ID")
@@ -1,14 +1,11 @@
-from fastapi import Request
+from jwt import InvalidTokenError
 from starlette.responses import JSONResponse
-from jose import jwt, JWTError
-from starlette.middleware.base import BaseHTTPMiddleware
-import os
+from starlette.types import ASGIApp, Receive, Scope, Send
 from dotenv import load_dotenv
 
-load_dotenv(dotenv_path=".env")
+from app.core.tokens import get_token_verifier
 
-ACCESS_TOKEN_SECRET_KEY = os.getenv("ACCESS_TOKEN_SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
+load_dotenv(dotenv_path=".env")
 
 EXCLUDED_PATHS = {
     "/",
@@ -22,44 +19,63 @@ EXCLUDED_PATHS = {
     "/metrics"
 }
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        root_path = request.scope.get("root_path") or ""
+PUBLIC_PREFIXES = ("/docs", "/redoc", "/openapi", "/public", "/auth")
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class AuthMiddleware:
+    """Middleware ASGI puro: sin la tarea extra ni el re-empaquetado del body de BaseHTTPMiddleware."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        root_path = scope.get("root_path") or ""
         rel_path = path[len(root_path):] if root_path and path.startswith(root_path) else path
 
         # Verificar tanto el path completo como el relativo para compatibilidad
-        if path in EXCLUDED_PATHS or rel_path in EXCLUDED_PATHS:
-            return await call_next(request)
-
-        public_prefixes = ("/docs", "/redoc", "/openapi", "/public", "/auth")
-        if any(rel_path.startswith(prefix) for prefix in public_prefixes):
-            return await call_next(request)
+        if path in EXCLUDED_PATHS or rel_path in EXCLUDED_PATHS or rel_path.startswith(PUBLIC_PREFIXES):
+            await self.app(scope, receive, send)
+            return
 
-        auth_header = request.headers.get("Authorization")
+        auth_header = _header(scope, b"authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Missing or invalid Authorization header"}
-            )
+            await _unauthorized("Missing or invalid Authorization header")(scope, receive, send)
+            return
 
         token = auth_header[len("Bearer "):]
 
         try:
-            payload = jwt.decode(token, ACCESS_TOKEN_SECRET_KEY, algorithms=[ALGORITHM])
-            request.state.user = {
-                "username": payload.get("sub"),
-                "user_id": payload.get("user_id"),
-                "tenant_id": payload.get("tenant_id"),
-                "permissions": payload.get("permissions", []),
-                "first_name": payload.get("first_name", ""),
-                "last_name": payload.get("last_name", ""),
-                "city": payload.get("city", "")
-            }
-        except JWTError:
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Invalid or expired token"}
-            )
-
-        return await call_next(request)
\ No newline at end of file
+            payload = get_token_verifier().verify(token)
+        except InvalidTokenError:
+            await _unauthorized("Invalid or expired token")(scope, receive, send)
+            return
+
+        # request.state lee este dict; los routers reutilizan los claims (app.core.tokens.request_claims)
+        state = scope.setdefault("state", {})
+        state["token"], state["claims"] = token, payload
+        state["user"] = {
+            "username": payload.get("sub"),
+            "user_id": payload.get("user_id"),
+            "tenant_id": payload.get("tenant_id"),
+            "permissions": payload.get("permissions", []),
+            "first_name": payload.get("first_name", ""),
+            "last_name": payload.get("last_name", ""),
+            "city": payload.get("city", "")
+        }
+        await self.app(scope, receive, send)
+
+
+def _unauthorized(detail: str) -> JSONResponse:
+    return JSONResponse(status_code=401, content={"detail": detail})
@@ -1,5 +1,6 @@
 from prometheus_client import Histogram
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import time
 
 # Buckets extended up to 120s to capture long uploads
@@ -9,28 +10,122 @@ HISTOGRAM_BUCKETS = [
     5, 10, 30, 60, 120,
 ]
 
+# Tamaños de body: de 100 B a 1 GiB (subidas de video)
+SIZE_BUCKETS = [
+    100, 1_000, 10_000, 100_000, 1_000_000,
+    10_000_000, 100_000_000, 1_000_000_000,
+]
+
+# Label para requests que no coinciden con ninguna ruta (404): un solo valor, no uno por path
+UNMATCHED_ROUTE = "<unmatched>"
+
 REQUEST_HISTOGRAM = Histogram(
     'http_request_duration_seconds_handler',
     'HTTP request latency by handler (custom, extended buckets)',
     ['handler', 'method', 'status'],
     buckets=HISTOGRAM_BUCKETS,
 )
+REQUEST_SIZE_HISTOGRAM = Histogram(
+    'http_request_size_bytes_handler',
+    'HTTP request body size by handler',
+    ['handler', 'method'],
+    buckets=SIZE_BUCKETS,
+)
+RESPONSE_SIZE_HISTOGRAM = Histogram(
+    'http_response_size_bytes_handler',
+    'HTTP response body size by handler',
+    ['handler', 'method', 'status'],
+    buckets=SIZE_BUCKETS,
+)
+
+try:
+    from prometheus_client import Gauge
+
+    REQUESTS_IN_FLIGHT = Gauge(
+        'http_requests_in_flight_handler',
+        'HTTP requests currently being served by handler',
+        ['handler', 'method'],
+    )
+except (ImportError, ValueError):
+    REQUESTS_IN_FLIGHT = None
+
+
+def route_label(scope: Scope) -> str:
+    """Template de la ruta que atiende el request (p. ej. /videos/{video_id}), no el path crudo.
 
+    Así cada UUID no crea una serie nueva. Se resuelve antes de llamar a la app
+    (también para los 401 del AuthMiddleware, que cortan antes del router).
+    """
+    router = getattr(scope.get("app"), "router", None)
+    partial = None
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match is Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+        if match is Match.PARTIAL and partial is None:
+            partial = route
+    # PARTIAL = path conocido con otro método (405)
+    return getattr(partial, "path", UNMATCHED_ROUTE)
+
+
+def _content_length(scope: Scope) -> int:
+    """Content-Length declarado (el body puede no leerse si el request se rechaza antes); 0 si falta."""
+    for key, value in scope["headers"]:
+        if key == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: status y tamaños salen de los mensajes ASGI, sin re-empaquetar el body."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
         start = time.time()
-        response = await call_next(request)
-        duration = time.time() - start
-        try:
-            handler = request.url.path
-        except Exception:
-            handler = request.scope.get('path', 'unknown')
-        method = request.method
-        status = str(response.status_code)
+        handler = route_label(scope)
+        method = scope.get('method', '')
+        status = "500"
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        if REQUESTS_IN_FLIGHT is not None:
+            REQUESTS_IN_FLIGHT.labels(handler=handler, method=method).inc()
         try:
-            REQUEST_HISTOGRAM.labels(handler=handler, method=method, status=status).observe(duration)
-        except Exception:
-            # avoid breaking app if prometheus client errors
-            pass
-        return response
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            duration = time.time() - start
+            if REQUESTS_IN_FLIGHT is not None:
+                REQUESTS_IN_FLIGHT.labels(handler=handler, method=method).dec()
+            try:
+                REQUEST_HISTOGRAM.labels(handler=handler, method=method, status=status).observe(duration)
+                REQUEST_SIZE_HISTOGRAM.labels(handler=handler, method=method).observe(
+                    _content_length(scope) or request_bytes
+                )
+                RESPONSE_SIZE_HISTOGRAM.labels(handler=handler, method=method, status=status).observe(response_bytes)
+            except Exception:
+                # avoid breaking app if prometheus client errors
+                pass
@@ -0,0 +1,39 @@
+"""Cursores opacos para paginación keyset.
+
+El cursor codifica la clave de orden de la última fila devuelta (p. ej.
+`(votes_count, id)` o `(created_at, id)`) y el listado al que pertenece. La
+página siguiente filtra con `(col1, col2) < (v1, v2)` sobre un índice
+compuesto, así el costo no crece con la profundidad como con OFFSET.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Sequence, Tuple
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(kind: str, *values: Any) -> str:
+    raw = json.dumps({"k": kind, "v": list(values)}, default=_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str, parsers: Sequence[Callable[[Any], Any]]) -> Tuple:
+    """Devuelve la clave del cursor; 400 si no es válido o es de otro listado."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data.get("k") != kind or len(data["v"]) != len(parsers):
+            raise ValueError(kind)
+        return tuple(parse(value) for parse, value in zip(parsers, data["v"]))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido") from None
@@ -0,0 +1,100 @@
+"""Verificación única de los access tokens (JWT) con cache LRU.
+
+AuthMiddleware verifica el token y deja los claims en `request.state.claims`;
+los routers los reutilizan con `request_claims()` en lugar de volver a
+decodificar. Los claims verificados se guardan por digest SHA-256 del token
+hasta su `exp`, así un cliente que repite el mismo token no paga de nuevo la
+verificación HMAC ni el parseo del JSON. Los tokens inválidos no se cachean.
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+import jwt
+from fastapi import Request
+
+from app.config import settings
+
+try:
+    from prometheus_client import Counter
+
+    TOKEN_CACHE_REQUESTS = Counter(
+        "anb_auth_token_cache_requests", "Verificaciones de access token por resultado del cache (hit, miss)",
+        ["result"],
+    )
+except (ImportError, ValueError):
+    TOKEN_CACHE_REQUESTS = None
+
+
+def _decode(token: str) -> Dict:
+    # Sin `audience`, PyJWT rechaza cualquier token con claim `aud`: los access tokens
+    # no lo llevan y los tokens de otros usos (p. ej. subida directa) sí.
+    # `exp` e `iat` obligatorios, como en la verificación original de /videos.
+    return jwt.decode(
+        token,
+        os.getenv("ACCESS_TOKEN_SECRET_KEY", ""),
+        algorithms=[os.getenv("ALGORITHM", "HS256")],
+        options={"require": ["exp", "iat"], "verify_iss": False},
+    )
+
+
+class TokenVerifier:
+    """Cache LRU acotado de claims verificados, válido hasta el `exp` de cada token."""
+
+    def __init__(self, *, max_entries: int = 4096, clock: Callable[[], float] = time.time) -> None:
+        self.max_entries = max(1, max_entries)
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[Dict, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def verify(self, token: str) -> Dict:
+        """Devuelve los claims del token; propaga jwt.InvalidTokenError (incluye expirado)."""
+        digest = hashlib.sha256(token.encode()).digest()
+        cached = self._entries.get(digest)
+        if cached is not None:
+            claims, exp = cached
+            if self._clock() < exp:
+                self._entries.move_to_end(digest)
+                self._count("hit")
+                return claims
+            del self._entries[digest]
+            raise jwt.ExpiredSignatureError("Signature has expired")
+
+        self._count("miss")
+        claims = _decode(token)
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)) and self._clock() < exp:
+            self._entries[digest] = (claims, float(exp))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return claims
+
+    @staticmethod
+    def _count(result: str) -> None:
+        if TOKEN_CACHE_REQUESTS is not None:
+            TOKEN_CACHE_REQUESTS.labels(result=result).inc()
+
+
+@lru_cache(maxsize=1)
+def get_token_verifier() -> TokenVerifier:
+    return TokenVerifier(max_entries=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES)
+
+
+def request_claims(request: Optional[Request], token: str) -> Dict:
+    """Claims del token del request: los que dejó AuthMiddleware o, si no pasó por él, verificados acá."""
+    state = getattr(request, "state", None)
+    if state is not None and getattr(state, "token", None) == token:
+        return state.claims
+    claims = get_token_verifier().verify(token)
+    if state is not None:
+        state.token, state.claims = token, claims
+    return claims
@@ -1,6 +1,6 @@
 """Script para inicializar las tablas de la base de datos"""
 from app.database import engine, Base
-from app.models import Video, Vote  # noqa: F401
+from app.models import Video, Vote, PlayerRanking  # noqa: F401
 
 def init_db():
     """Crea todas las tablas en la base de datos"""
@@ -10,7 +10,7 @@ def init_db():
     Base.metadata.create_all(bind=engine)
 
     print("Base de datos inicializada correctamente")
-    print("Tablas creadas: videos, votes")
+    print("Tablas creadas: videos, votes, player_rankings")
 
 
 if __name__ == "__main__":
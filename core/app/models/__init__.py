@@ -4,6 +4,7 @@ Exporta todos los modelos para fácil importación en otros módulos
 """
 from app.models.video import Video, VideoStatus
 from app.models.vote import Vote
+from app.models.ranking import PlayerRanking
 
-__all__ = ["Video", "VideoStatus", "Vote"]
+__all__ = ["Video", "VideoStatus", "Vote", "PlayerRanking"]
 
@@ -0,0 +1,32 @@
+"""
+Modelo de Ranking materializado
+Resumen de votos por jugador (nombre y ciudad) para /public/rankings
+Se reconstruye periódicamente desde videos.votes_count
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, String
+from app.database import Base
+
+
+class PlayerRanking(Base):
+    """
+    Fila del ranking materializado
+    Una por jugador con al menos un voto en videos procesados
+    """
+    __tablename__ = "player_rankings"
+
+    # Clave sustituta: el refresh inserta con INSERT ... SELECT
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    player_first_name = Column(String(100), nullable=True)
+    player_last_name = Column(String(100), nullable=True)
+    player_city = Column(String(100), nullable=True)
+    total_votes = Column(Integer, nullable=False)
+
+    # Momento del refresh que generó la fila (mismo valor para toda la tabla)
+    refreshed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Ranking global y por ciudad: top-N por índice
+        Index('idx_ranking_votes', total_votes.desc()),
+        Index('idx_ranking_city_votes', 'player_city', total_votes.desc()),
+    )
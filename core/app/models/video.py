@@ -3,7 +3,7 @@ Modelo de Video
 Almacena información de los videos subidos por los jugadores
 Incluye estados de procesamiento y rutas de almacenamiento
 """
-from sqlalchemy import Column, String, Integer, Float, Enum, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, Float, Enum, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.base import BaseModel
@@ -53,11 +53,34 @@ class Video(BaseModel):
     
     # Timestamp de procesamiento
     processed_at = Column(DateTime, nullable=True)
+
+    # Avance (0-100) reportado por el worker mientras ffmpeg codifica
+    progress_percent = Column(Integer, nullable=True)
     
     # Campo para trazabilidad con el sistema de procesamiento asíncrono
     correlation_id = Column(String(100), nullable=True, index=True)
+
+    # Deduplicación: SHA-256 del archivo subido y huella de la configuración del pipeline
+    # con la que el worker generó processed_path (ver worker/tasks/process_video.py)
+    content_sha256 = Column(String(64), nullable=True)
+    pipeline_fingerprint = Column(String(64), nullable=True)
+
+    # Contador desnormalizado de votos: se incrementa en la misma transacción que inserta
+    # el voto y un job de reconciliación lo recalcula desde `votes`
+    votes_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relaciones con otras tablas
     #user = relationship("User", back_populates="videos")
     votes = relationship("Vote", back_populates="video", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Búsqueda de duplicados por contenido (upload y worker)
+        Index('idx_video_content_dedup', 'content_sha256', 'pipeline_fingerprint'),
+    )
+
+
+# Índices de los listados con paginación keyset (id viene de BaseModel, por eso se declaran acá)
+# Listado público: ORDER BY votes_count DESC, id DESC sin agregar la tabla votes
+Index('idx_video_status_votes_id', Video.status, Video.votes_count.desc(), Video.id.desc())
+# Mis videos: ORDER BY created_at DESC, id DESC
+Index('idx_video_user_created_id', Video.user_id, Video.created_at.desc(), Video.id.desc())
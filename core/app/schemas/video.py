@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 
@@ -28,6 +28,50 @@ class VideoUploadResponse(BaseModel):
         }
 
 
+class DirectUploadInitiateRequest(BaseModel):
+    """Schema para iniciar una subida directa (multipart) a S3"""
+    title: str = Field(..., min_length=1, max_length=255, description="Título del video")
+    filename: str = Field(..., min_length=1, max_length=255, description="Nombre del archivo original")
+    size_bytes: int = Field(..., gt=0, description="Tamaño exacto del archivo en bytes")
+    content_type: str = Field("application/octet-stream", description="Content-Type del archivo")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "title": "Tiros de tres en movimiento",
+                "filename": "tiros.mp4",
+                "size_bytes": 20971520,
+                "content_type": "video/mp4"
+            }
+        }
+
+
+class DirectUploadPartUrl(BaseModel):
+    """URL prefirmada para subir una parte con PUT"""
+    part_number: int = Field(..., description="Número de parte (1..N)")
+    url: str = Field(..., description="URL prefirmada de S3")
+
+
+class DirectUploadInitiateResponse(BaseModel):
+    """Schema para la respuesta de inicio de subida directa"""
+    upload_token: str = Field(..., description="Token firmado a enviar en /upload/complete")
+    part_size: int = Field(..., description="Tamaño de cada parte en bytes (la última puede ser menor)")
+    parts: List[DirectUploadPartUrl] = Field(..., description="URLs prefirmadas por parte")
+    expires_in: int = Field(..., description="Segundos de validez de las URLs y del token")
+
+
+class DirectUploadCompletedPart(BaseModel):
+    """Parte subida por el cliente: número y ETag devuelto por S3 en el PUT"""
+    part_number: int = Field(..., ge=1, le=10000)
+    etag: str = Field(..., min_length=1)
+
+
+class DirectUploadCompleteRequest(BaseModel):
+    """Schema para completar una subida directa"""
+    upload_token: str = Field(..., description="Token devuelto por /upload/initiate")
+    parts: List[DirectUploadCompletedPart] = Field(..., min_length=1, description="Partes subidas")
+
+
 class VideoResponse(BaseModel):
     """Schema para la respuesta de información de un video"""
     video_id: str = Field(..., description="ID único del video")
@@ -54,6 +98,26 @@ class VideoResponse(BaseModel):
         }
 
 
+class VideoStatusResponse(BaseModel):
+    """Schema para el estado de procesamiento de un video (long-poll)"""
+    video_id: str = Field(..., description="ID único del video")
+    status: VideoStatus = Field(..., description="Estado del video")
+    progress_percent: Optional[int] = Field(None, description="Avance del procesamiento (0-100)")
+    processed_at: Optional[datetime] = Field(None, description="Fecha de procesamiento")
+    processed_url: Optional[str] = Field(None, description="URL del video procesado")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "video_id": "a1b2c3d4",
+                "status": "processing",
+                "progress_percent": 42,
+                "processed_at": None,
+                "processed_url": None
+            }
+        }
+
+
 class VideoListItemResponse(BaseModel):
     """Schema para un item en la lista de videos"""
     video_id: str = Field(..., description="ID único del video")
@@ -20,6 +20,7 @@ class QueuePublisher:
         Espera un dict con al menos `input_path`. Opcionalmente `video_id` y
         `correlation_id`. Construye los args posicionales de la task
         `tasks.process_video.run` en orden: [video_id?, input_path, correlation_id?].
+        Si trae `content_sha256` se envía como kwarg para la deduplicación en el worker.
         """
         input_path = None
         if isinstance(payload, dict):
@@ -38,10 +39,15 @@ class QueuePublisher:
         if isinstance(payload, dict) and 'correlation_id' in payload:
             args_list.append(payload.get('correlation_id'))
 
+        # Opcional: hash del contenido para que el worker pueda reutilizar un output ya procesado
+        task_kwargs = {}
+        if isinstance(payload, dict) and payload.get('content_sha256'):
+            task_kwargs['content_sha256'] = payload.get('content_sha256')
+
         self._celery.send_task(
             'tasks.process_video.run',
             args=args_list,
-            kwargs={},
+            kwargs=task_kwargs,
             queue='video_tasks',  # debe coincidir con SQS_QUEUE_NAME
             serializer='json',
             headers=headers or None,
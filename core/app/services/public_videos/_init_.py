@@ -1,9 +1,46 @@
 from functools import lru_cache
 
+from app.config import settings
+from app.database import SessionLocal
 from app.services.public_videos.base import PublicVideoServicePort
+from app.services.public_videos.cache import CachedPublicVideoService, PublicCache
 from app.services.public_videos.local import PublicVideoService
+from app.services.public_videos.vote_buffer import BufferedVoteService, VoteBuffer
+
+
+@lru_cache(maxsize=1)
+def get_public_cache() -> PublicCache:
+    return PublicCache(
+        ttl=settings.PUBLIC_CACHE_TTL_SECONDS,
+        stale_ttl=settings.PUBLIC_CACHE_STALE_SECONDS,
+        max_entries=settings.PUBLIC_CACHE_MAX_ENTRIES,
+    )
+
+
+def _votes_flushed(video_ids) -> None:
+    # Los contadores cambian recién cuando el flush llega a la DB
+    if settings.PUBLIC_CACHE_ENABLED:
+        cache = get_public_cache()
+        for video_id in video_ids:
+            cache.video_changed(video_id)
+
+
+@lru_cache(maxsize=1)
+def get_vote_buffer() -> VoteBuffer:
+    return VoteBuffer(
+        settings.VOTE_BUFFER_DIR,
+        SessionLocal,
+        flush_interval=settings.VOTE_BUFFER_FLUSH_INTERVAL_SECONDS,
+        max_batch=settings.VOTE_BUFFER_MAX_BATCH,
+        on_flushed=_votes_flushed,
+    )
 
 
 @lru_cache(maxsize=1)
 def get_public_video_service() -> PublicVideoServicePort:
-    return PublicVideoService()
+    service: PublicVideoServicePort = PublicVideoService()
+    if settings.VOTE_BUFFER_ENABLED:
+        service = BufferedVoteService(service, get_vote_buffer())
+    if settings.PUBLIC_CACHE_ENABLED:
+        service = CachedPublicVideoService(service, get_public_cache(), SessionLocal)
+    return service
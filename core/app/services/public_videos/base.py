@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Protocol, Optional
+from datetime import datetime
+from typing import List, Protocol, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -25,6 +26,8 @@ class RankingRecord:
     username: str
     city: Optional[str]
     votes: int
+    # Momento del último refresh del ranking materializado (None si se calculó en vivo)
+    refreshed_at: Optional[datetime] = None
 
 
 class PublicVideoServicePort(Protocol):
@@ -35,7 +38,9 @@ class PublicVideoServicePort(Protocol):
         limit: int,
         offset: int,
         db: AsyncSession,
+        after: Optional[Tuple[int, str]] = None,
     ) -> List[PublicVideoRecord]:
+        """`after` = (votes, video_id) de la última fila de la página anterior (reemplaza a offset)."""
         ...
 
     async def get_video(
@@ -0,0 +1,292 @@
+"""Cache en proceso para los endpoints públicos (anónimos e iguales para todos).
+
+`CachedPublicVideoService` envuelve a `PublicVideoService` y guarda los
+resultados por `(endpoint, city, limit, offset[, cursor])`:
+
+- TTL corto (PUBLIC_CACHE_TTL_SECONDS) y tamaño acotado con desalojo LRU;
+- single-flight: ante un miss, los requests concurrentes con la misma clave
+  esperan la misma consulta en lugar de lanzar una cada uno. La consulta
+  corre en su propia tarea y sesión de DB, así cancelar el request que la
+  inició no la cancela para los demás;
+- stale-while-revalidate: vencido el TTL, la entrada se sigue sirviendo
+  hasta PUBLIC_CACHE_STALE_SECONDS mientras una sola tarea en background la
+  recalcula.
+
+Invalidación: `register_vote` descarta el detalle del video votado y marca
+como vencidos los listados. Cuando el worker termina un video, emite
+NOTIFY en el canal PUBLIC_CACHE_NOTIFY_CHANNEL, y `listen_for_invalidations`
+hace lo mismo en cada réplica. Los errores (p. ej. 404) no se cachean.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.public_videos.base import (
+    PublicVideoRecord,
+    PublicVideoServicePort,
+    RankingRecord,
+)
+
+logger = logging.getLogger("anb.public.cache")
+
+try:
+    from prometheus_client import Counter, Gauge
+
+    CACHE_REQUESTS = Counter(
+        "anb_public_cache_requests",
+        "Consultas al cache de endpoints públicos por resultado (hit, stale, miss, coalesced)",
+        ["endpoint", "result"],
+    )
+    CACHE_ENTRIES = Gauge("anb_public_cache_entries", "Entradas en el cache de endpoints públicos")
+except (ImportError, ValueError):
+    CACHE_REQUESTS = CACHE_ENTRIES = None
+
+CacheKey = Tuple[Hashable, ...]
+Loader = Callable[[], Awaitable]
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value, fresh_until: float, stale_until: float) -> None:
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class PublicCache:
+    """Cache TTL + LRU con single-flight y stale-while-revalidate (un solo event loop)."""
+
+    def __init__(
+        self,
+        *,
+        ttl: float,
+        stale_ttl: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.stale_ttl = max(0.0, stale_ttl)
+        self.max_entries = max(1, max_entries)
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+        # Se incrementa en cada invalidación: una carga que empezó antes no se guarda como fresca
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(self, key: CacheKey, load: Loader):
+        """Devuelve el valor cacheado o lo carga con `load`.
+
+        `load` corre en una tarea propia (misses y revalidaciones), que puede seguir
+        después del request que la disparó: debe abrir su propia sesión de DB.
+        """
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None and now < entry.fresh_until:
+            self._entries.move_to_end(key)
+            self._count(key, "hit")
+            return entry.value
+        if entry is not None and now < entry.stale_until:
+            self._entries.move_to_end(key)
+            self._count(key, "stale")
+            if key not in self._inflight:
+                self._spawn_load(key, load, background=True)
+            return entry.value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._count(key, "coalesced")
+            return await asyncio.shield(pending)
+        self._count(key, "miss")
+        # shield: si este request se cancela, la carga sigue para los que la esperan
+        return await asyncio.shield(self._spawn_load(key, load))
+
+    def _claim(self, key: CacheKey) -> asyncio.Future:
+        """Registra la carga en vuelo antes de que empiece (coalesce desde ya)."""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    async def _run_load(self, key: CacheKey, load: Loader, future: asyncio.Future):
+        generation = self._generation
+        try:
+            value = await load()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # evita "exception was never retrieved" si nadie esperaba
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._store(key, value, fresh=generation == self._generation)
+        future.set_result(value)
+        return value
+
+    def _spawn_load(self, key: CacheKey, load: Loader, *, background: bool = False) -> asyncio.Future:
+        """Corre la carga en una tarea desacoplada de quien la pidió; el future lleva el resultado.
+
+        En un miss los errores llegan a los requests por el future; en una
+        revalidación (`background`) nadie espera, así que se registran acá.
+        """
+        future = self._claim(key)
+
+        async def _run():
+            try:
+                await self._run_load(key, load, future)
+            except Exception as e:
+                if background:
+                    logger.warning("cache:revalidate_failed key=%s err=%s", key, e)
+
+        task = asyncio.create_task(_run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return future
+
+    def _store(self, key: CacheKey, value, *, fresh: bool) -> None:
+        now = self._clock()
+        fresh_until = now + self.ttl if fresh else now
+        self._entries[key] = _Entry(value, fresh_until, now + self.ttl + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # --- Invalidación ---
+
+    def invalidate(self, key: CacheKey) -> None:
+        """Descarta la entrada: el próximo request consulta la DB."""
+        self._generation += 1
+        self._entries.pop(key, None)
+
+    def expire(self, endpoint: str) -> None:
+        """Marca como vencidas las entradas del endpoint: se sirven stale y se revalidan una vez."""
+        self._generation += 1
+        now = self._clock()
+        for key, entry in self._entries.items():
+            if key[0] == endpoint:
+                entry.fresh_until = min(entry.fresh_until, now)
+                entry.stale_until = max(entry.stale_until, now + self.stale_ttl)
+
+    def video_changed(self, video_id: str) -> None:
+        """Un video cambió (voto o procesamiento terminado)."""
+        self.invalidate(("video", str(video_id)))
+        self.expire("videos")
+        self.expire("rankings")
+
+    def _count(self, key: CacheKey, result: str) -> None:
+        if CACHE_REQUESTS is not None:
+            CACHE_REQUESTS.labels(endpoint=key[0], result=result).inc()
+
+
+class CachedPublicVideoService(PublicVideoServicePort):
+    """Decorador de PublicVideoServicePort que cachea las lecturas públicas."""
+
+    def __init__(
+        self,
+        inner: PublicVideoServicePort,
+        cache: PublicCache,
+        session_factory: Callable[[], AsyncSession],
+    ) -> None:
+        self.inner = inner
+        self.cache = cache
+        self.session_factory = session_factory
+        if CACHE_ENTRIES is not None:
+            CACHE_ENTRIES.set_function(lambda: len(cache))
+
+    def _in_new_session(self, call: Callable[[AsyncSession], Awaitable]) -> Loader:
+        async def _run():
+            async with self.session_factory() as db:
+                return await call(db)
+
+        return _run
+
+    async def list_videos(
+        self,
+        *,
+        city: Optional[str],
+        limit: int,
+        offset: int,
+        db: AsyncSession,
+        after: Optional[Tuple[int, str]] = None,
+    ) -> List[PublicVideoRecord]:
+        def call(session):
+            return self.inner.list_videos(city=city, limit=limit, offset=offset, after=after, db=session)
+
+        return await self.cache.get_or_load(("videos", city, limit, offset, after), self._in_new_session(call))
+
+    async def get_video(
+        self,
+        *,
+        video_id: str,
+        db: AsyncSession,
+    ) -> PublicVideoRecord:
+        def call(session):
+            return self.inner.get_video(video_id=video_id, db=session)
+
+        return await self.cache.get_or_load(("video", str(video_id)), self._in_new_session(call))
+
+    async def register_vote(
+        self,
+        *,
+        video_id: str,
+        user_id: str,
+        db: AsyncSession,
+    ) -> None:
+        await self.inner.register_vote(video_id=video_id, user_id=user_id, db=db)
+        self.cache.video_changed(video_id)
+
+    async def get_rankings(
+        self,
+        *,
+        city: Optional[str],
+        limit: int,
+        db: AsyncSession,
+    ) -> List[RankingRecord]:
+        def call(session):
+            return self.inner.get_rankings(city=city, limit=limit, db=session)
+
+        return await self.cache.get_or_load(("rankings", city, limit, None), self._in_new_session(call))
+
+
+async def listen_for_invalidations(dsn: str, channel: str, cache: PublicCache, retry_seconds: float = 5.0) -> None:
+    """LISTEN en Postgres: cada NOTIFY (payload = video_id) invalida el cache de esta réplica.
+
+    Se reconecta si la conexión se pierde; corre hasta ser cancelado.
+    """
+    import asyncpg  # type: ignore
+
+    dsn = dsn.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    def _on_notify(_conn, _pid, _channel, payload):
+        cache.video_changed(payload)
+
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn)
+            closed = asyncio.get_running_loop().create_future()
+            conn.add_termination_listener(lambda _c: closed.done() or closed.set_result(None))
+            await conn.add_listener(channel, _on_notify)
+            logger.info("cache:listen channel=%s", channel)
+            await closed
+            logger.warning("cache:listen:connection_lost channel=%s", channel)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("cache:listen:failed channel=%s err=%s", channel, e)
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(retry_seconds)
@@ -0,0 +1,31 @@
+"""Jobs periódicos de los endpoints públicos (corren en el lifespan de la API)."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("anb.public.jobs")
+
+
+async def run_periodic(
+    name: str,
+    job: Callable[[AsyncSession], Awaitable[int]],
+    session_factory: Callable[[], AsyncSession],
+    interval_seconds: float,
+) -> None:
+    """Ejecuta `job` al arrancar y luego cada `interval_seconds` hasta ser cancelado.
+
+    Cada corrida usa su propia sesión; los errores se registran y no detienen el loop.
+    """
+    while True:
+        try:
+            async with session_factory() as db:
+                result = await job(db)
+            logger.info("jobs:%s:done result=%s", name, result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("jobs:%s:failed err=%s", name, e)
+        await asyncio.sleep(interval_seconds)
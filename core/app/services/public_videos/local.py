@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 from fastapi import HTTPException
-from sqlalchemy import select, func
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, func, literal, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.models.base import generate_uuid
+from app.models.ranking import PlayerRanking
 from app.models.video import Video, VideoStatus
 from app.models.vote import Vote
 from app.services.public_videos.base import (
@@ -16,6 +20,43 @@ from app.services.public_videos.base import (
 )
 
 
+def _vote_statement(video_id: str, user_id: str):
+    """WITH target / ins (INSERT ... ON CONFLICT DO NOTHING) / upd (votes_count + 1).
+
+    Devuelve una fila (status, inserted): status NULL si el video no existe e
+    inserted = 0 si no estaba processed o el usuario ya había votado.
+    """
+    now = datetime.utcnow()
+    target = select(Video.id, Video.status).where(Video.id == video_id).cte("target")
+    ins = (
+        pg_insert(Vote)
+        .from_select(
+            ["id", "user_id", "video_id", "created_at", "updated_at"],
+            select(
+                literal(generate_uuid(), Vote.id.type),
+                literal(user_id, Vote.user_id.type),
+                target.c.id,
+                literal(now, Vote.created_at.type),
+                literal(now, Vote.updated_at.type),
+            ).where(target.c.status == VideoStatus.processed),
+        )
+        .on_conflict_do_nothing(constraint="unique_user_video_vote")
+        .returning(Vote.video_id)
+        .cte("ins")
+    )
+    upd = (
+        update(Video)
+        .where(Video.id.in_(select(ins.c.video_id)))
+        .values(votes_count=Video.votes_count + 1)
+        .returning(Video.id)
+        .cte("upd")
+    )
+    return select(
+        select(target.c.status).scalar_subquery().label("status"),
+        select(func.count()).select_from(upd).scalar_subquery().label("inserted"),
+    )
+
+
 class PublicVideoService(PublicVideoServicePort):
     async def list_videos(
         self,
@@ -24,7 +65,9 @@ class PublicVideoService(PublicVideoServicePort):
         limit: int,
         offset: int,
         db: AsyncSession,
+        after: Optional[Tuple[int, str]] = None,
     ) -> List[PublicVideoRecord]:
+        # votes_count desnormalizado: recorrido por idx_video_status_votes_id, sin agregar votos
         stmt = (
             select(
                 Video.id,
@@ -33,22 +76,17 @@ class PublicVideoService(PublicVideoServicePort):
                 Video.player_last_name,
                 Video.player_city,
                 Video.processed_path,
-                func.count(Vote.id).label("votes_count"),
+                Video.votes_count,
             )
-            .outerjoin(Vote, Vote.video_id == Video.id)
             .where(Video.status == VideoStatus.processed)
-            .group_by(
-                Video.id,
-                Video.title,
-                Video.player_first_name,
-                Video.player_last_name,
-                Video.player_city,
-                Video.processed_path,
-            )
-            .order_by(func.count(Vote.id).desc())
+            .order_by(Video.votes_count.desc(), Video.id.desc())
             .limit(limit)
-            .offset(offset)
         )
+        if after is not None:
+            # Keyset: continúa después de la última fila vista
+            stmt = stmt.where(tuple_(Video.votes_count, Video.id) < after)
+        else:
+            stmt = stmt.offset(offset)
 
         if city:
             stmt = stmt.where(Video.player_city.ilike(f"%{city}%"))
@@ -83,19 +121,10 @@ class PublicVideoService(PublicVideoServicePort):
                 Video.player_last_name,
                 Video.player_city,
                 Video.processed_path,
-                func.count(Vote.id).label("votes_count"),
+                Video.votes_count,
             )
-            .outerjoin(Vote, Vote.video_id == Video.id)
             .where(Video.id == video_id)
             .where(Video.status == VideoStatus.processed)
-            .group_by(
-                Video.id,
-                Video.title,
-                Video.player_first_name,
-                Video.player_last_name,
-                Video.player_city,
-                Video.processed_path,
-            )
         )
 
         result = await db.execute(stmt)
@@ -124,36 +153,21 @@ class PublicVideoService(PublicVideoServicePort):
         user_id: str,
         db: AsyncSession,
     ) -> None:
-        result = await db.execute(select(Video).where(Video.id == video_id))
-        video = result.scalar_one_or_none()
+        # Un solo round trip: la fila del video, el INSERT del voto (solo si está processed,
+        # ON CONFLICT por el unique user/video) y el +1 del contador en la misma sentencia
+        row = (await db.execute(_vote_statement(video_id, user_id))).one()
+        await db.commit()
 
-        if not video:
+        if row.status is None:
             raise HTTPException(status_code=404, detail="Video no encontrado")
-
-        if video.status != VideoStatus.processed:
+        if row.status != VideoStatus.processed:
             raise HTTPException(
                 status_code=400,
                 detail="Solo se puede votar por videos procesados",
             )
-
-        existing = await db.execute(
-            select(Vote).where(
-                Vote.user_id == user_id,
-                Vote.video_id == video_id,
-            )
-        )
-
-        if existing.scalar_one_or_none():
+        if not row.inserted:
             raise HTTPException(status_code=400, detail="Ya has votado por este video")
 
-        try:
-            vote = Vote(user_id=user_id, video_id=video_id)
-            db.add(vote)
-            await db.commit()
-        except IntegrityError:
-            await db.rollback()
-            raise HTTPException(status_code=400, detail="Ya has votado por este video") from None
-
     async def get_rankings(
         self,
         *,
@@ -161,26 +175,43 @@ class PublicVideoService(PublicVideoServicePort):
         limit: int,
         db: AsyncSession,
     ) -> List[RankingRecord]:
-        stmt = (
-            select(
-                Video.player_first_name,
-                Video.player_last_name,
-                Video.player_city,
-                func.count(Vote.id).label("total_votes"),
+        if settings.RANKINGS_REFRESH_INTERVAL_SECONDS > 0:
+            # Ranking materializado (ver services/public_videos/rankings.py)
+            stmt = (
+                select(
+                    PlayerRanking.player_first_name,
+                    PlayerRanking.player_last_name,
+                    PlayerRanking.player_city,
+                    PlayerRanking.total_votes,
+                    PlayerRanking.refreshed_at,
+                )
+                .order_by(PlayerRanking.total_votes.desc())
+                .limit(limit)
             )
-            .join(Vote, Vote.video_id == Video.id)
-            .where(Video.status == VideoStatus.processed)
-            .group_by(
-                Video.player_first_name,
-                Video.player_last_name,
-                Video.player_city,
+            if city:
+                stmt = stmt.where(PlayerRanking.player_city == city)
+        else:
+            total_votes = func.sum(Video.votes_count)
+            stmt = (
+                select(
+                    Video.player_first_name,
+                    Video.player_last_name,
+                    Video.player_city,
+                    total_votes.label("total_votes"),
+                    literal(None).label("refreshed_at"),
+                )
+                .where(Video.status == VideoStatus.processed)
+                .group_by(
+                    Video.player_first_name,
+                    Video.player_last_name,
+                    Video.player_city,
+                )
+                .having(total_votes > 0)
+                .order_by(total_votes.desc())
+                .limit(limit)
             )
-            .order_by(func.count(Vote.id).desc())
-            .limit(limit)
-        )
-
-        if city:
-            stmt = stmt.where(Video.player_city == city)
+            if city:
+                stmt = stmt.where(Video.player_city == city)
 
         result = await db.execute(stmt)
         rows = result.all()
@@ -190,6 +221,7 @@ class PublicVideoService(PublicVideoServicePort):
                 username=f"{row.player_first_name or ''} {row.player_last_name or ''}".strip(),
                 city=row.player_city,
                 votes=row.total_votes or 0,
+                refreshed_at=row.refreshed_at,
             )
             for row in rows
         ]
@@ -0,0 +1,62 @@
+"""Ranking de jugadores materializado en `player_rankings`.
+
+`/public/rankings` lee el top-N de la tabla por índice en lugar de agregar
+todos los videos en cada request. La tabla se reconstruye completa cada
+RANKINGS_REFRESH_INTERVAL_SECONDS a partir de `videos.votes_count` (ya
+desnormalizado, sin recorrer `votes`). El refresh es un DELETE + INSERT ...
+SELECT en una sola transacción: los lectores ven el ranking anterior hasta el
+commit.
+
+Con varias réplicas de la API, un advisory lock de Postgres deja que refresque
+una sola a la vez; las demás saltean esa corrida.
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, func, insert, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.ranking import PlayerRanking
+from app.models.video import Video, VideoStatus
+
+# Clave arbitraria y estable para pg_try_advisory_xact_lock
+REFRESH_LOCK_KEY = 0x414E4252  # "ANBR"
+
+
+async def _try_lock(db: AsyncSession) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return True
+    result = await db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REFRESH_LOCK_KEY})
+    return bool(result.scalar())
+
+
+async def refresh_rankings(db: AsyncSession) -> int:
+    """Reconstruye player_rankings; devuelve la cantidad de jugadores (-1 si otra réplica refresca)."""
+    if not await _try_lock(db):
+        await db.rollback()
+        return -1
+
+    refreshed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    total_votes = func.sum(Video.votes_count)
+    source = (
+        select(
+            Video.player_first_name,
+            Video.player_last_name,
+            Video.player_city,
+            total_votes,
+            literal(refreshed_at),
+        )
+        .where(Video.status == VideoStatus.processed)
+        .group_by(Video.player_first_name, Video.player_last_name, Video.player_city)
+        .having(total_votes > 0)
+    )
+    await db.execute(delete(PlayerRanking))
+    result = await db.execute(
+        insert(PlayerRanking).from_select(
+            ["player_first_name", "player_last_name", "player_city", "total_votes", "refreshed_at"],
+            source,
+        )
+    )
+    await db.commit()
+    return result.rowcount or 0
@@ -0,0 +1,428 @@
+"""Ingesta de votos write-behind (opcional, VOTE_BUFFER_ENABLED).
+
+En un pico de votación cada voto hace su propio commit sobre la misma fila de
+`videos`. En este modo el endpoint:
+
+1. descarta en memoria el voto repetido por `(user_id, video_id)` que todavía
+   no llegó a la DB;
+2. valida video y voto previo con una sola lectura (sin transacción de escritura);
+3. agrega el voto a un log local (JSON lines, fsync) y responde cuando quedó
+   en disco. Las escrituras concurrentes comparten un mismo fsync.
+
+Cada VOTE_BUFFER_FLUSH_INTERVAL_SECONDS un flusher inserta los pendientes con
+un `INSERT ... SELECT FROM (VALUES ...) JOIN videos ON CONFLICT DO NOTHING`
+multi-fila y suma los contadores agregados por video en la misma sentencia,
+contando solo las filas que de verdad se insertaron. El JOIN descarta los
+votos de videos borrados (o que dejaron de estar procesados) desde que se
+aceptaron. El UNIQUE (user_id, video_id) de `votes` sigue garantizando un voto
+por usuario aunque dos réplicas acepten el mismo voto, y hace idempotente
+reprocesar el log tras un reinicio.
+
+Si la DB rechaza un lote por sus datos (IntegrityError/DataError), se repite
+fila por fila y las filas que fallan solas van a un segmento `.votes.failed`
+en vez de reintentarse para siempre y trabar a las demás. Los errores de
+conexión se siguen reintentando en el próximo flush.
+
+El log se rota en cada flush y los segmentos se borran cuando su contenido
+ya está en la DB. Al arrancar se adoptan los segmentos que no tienen dueño
+(`flock`), incluidos los de otros procesos que murieron.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, String, and_, cast, column, exists, func, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.base import generate_uuid
+from app.models.video import Video, VideoStatus
+from app.models.vote import Vote
+from app.services.public_videos.base import (
+    PublicVideoRecord,
+    PublicVideoServicePort,
+    RankingRecord,
+)
+
+logger = logging.getLogger("anb.public.votes")
+
+try:
+    from prometheus_client import Counter, Gauge
+
+    VOTE_BUFFER_PENDING = Gauge("anb_vote_buffer_pending", "Votos aceptados que todavía no están en la DB")
+    VOTE_BUFFER_FLUSHED = Counter(
+        "anb_vote_buffer_flushed",
+        "Votos volcados a la DB por el flusher por resultado (inserted, duplicate, rejected)",
+        ["result"],
+    )
+except (ImportError, ValueError):
+    VOTE_BUFFER_PENDING = VOTE_BUFFER_FLUSHED = None
+
+LOG_SUFFIX = ".votes.log"
+# Votos que la DB rechazó por sus datos; no se adoptan al arrancar
+FAILED_SUFFIX = ".votes.failed"
+
+VoteKey = Tuple[str, str]
+
+
+def _vote_key(user_id: str, video_id: str) -> VoteKey:
+    return (str(user_id), str(video_id))
+
+
+def _precheck_statement(video_id: str, user_id: str):
+    """(status, voted) del video en una lectura; status NULL si no existe."""
+    voted = exists().where(Vote.user_id == user_id, Vote.video_id == Video.id)
+    return select(Video.status, voted.label("voted")).where(Video.id == video_id)
+
+
+def _flush_statement(rows: List[Dict]):
+    """INSERT multi-fila ON CONFLICT DO NOTHING + votes_count += votos insertados por video.
+
+    Las filas pasan por un JOIN con `videos`: un voto cuyo video se borró (o ya
+    no está procesado) se descarta en lugar de violar la FK y tumbar el lote.
+    """
+    v = values(
+        column("id", String),
+        column("user_id", String),
+        column("video_id", String),
+        column("created_at", DateTime),
+        column("updated_at", DateTime),
+        name="v",
+    ).data([(r["id"], r["user_id"], r["video_id"], r["created_at"], r["updated_at"]) for r in rows])
+    video_id = cast(v.c.video_id, Vote.video_id.type)
+    source = select(
+        cast(v.c.id, Vote.id.type), v.c.user_id, video_id, v.c.created_at, v.c.updated_at
+    ).join_from(v, Video, and_(Video.id == video_id, Video.status == VideoStatus.processed))
+    ins = (
+        pg_insert(Vote)
+        .from_select(["id", "user_id", "video_id", "created_at", "updated_at"], source)
+        .on_conflict_do_nothing()
+        .returning(Vote.video_id)
+        .cte("ins")
+    )
+    agg = select(ins.c.video_id, func.count().label("n")).group_by(ins.c.video_id).cte("agg")
+    return (
+        update(Video)
+        .where(Video.id == agg.c.video_id)
+        .values(votes_count=Video.votes_count + agg.c.n)
+        .returning(Video.id, agg.c.n)
+    )
+
+
+class VoteBuffer:
+    """Votos pendientes en memoria, respaldados por un log local con fsync."""
+
+    def __init__(
+        self,
+        directory: str,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        flush_interval: float = 1.0,
+        max_batch: int = 1000,
+        on_flushed: Optional[Callable[[Iterable[str]], None]] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_batch = max(1, max_batch)
+        self.on_flushed = on_flushed
+        # Aceptados y en disco, a la espera del flush
+        self._pending: Dict[VoteKey, Dict] = {}
+        # Lote que el flush en curso está insertando: la DB todavía no lo ve
+        self._flushing: Dict[VoteKey, Dict] = {}
+        # Aceptados esperando el próximo fsync del log
+        self._unsynced: List[Tuple[VoteKey, Dict, asyncio.Future]] = []
+        self._syncing: Optional[asyncio.Task] = None
+        # Serializa la escritura del log con su rotación
+        self._io_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._active: Optional[Path] = None
+        self._fd: Optional[int] = None
+        # Segmentos cuyo contenido está en _pending (se borran tras un flush exitoso)
+        self._segments: List[Path] = []
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._flushing) + len(self._unsynced)
+
+    def contains(self, user_id: str, video_id: str) -> bool:
+        key = _vote_key(user_id, video_id)
+        return (
+            key in self._pending
+            or key in self._flushing
+            or any(k == key for k, _, _ in self._unsynced)
+        )
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> int:
+        """Abre el log activo y adopta los segmentos huérfanos; devuelve cuántos votos recuperó."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        recovered = 0
+        for path in sorted(self.directory.glob(f"*{LOG_SUFFIX}")):
+            records = self._adopt(path)
+            if records is None:
+                continue
+            for record in records:
+                self._pending.setdefault(_vote_key(record["user_id"], record["video_id"]), record)
+            self._segments.append(path)
+            recovered += len(records)
+        if recovered:
+            logger.info("votes:recovered pending=%s dir=%s", recovered, self.directory)
+        self._open_active()
+        if VOTE_BUFFER_PENDING is not None:
+            VOTE_BUFFER_PENDING.set_function(lambda: len(self))
+        return recovered
+
+    def _adopt(self, path: Path) -> Optional[List[Dict]]:
+        """Lee un segmento si nadie lo tiene abierto (flock); None si pertenece a un proceso vivo."""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            records = []
+            with os.fdopen(os.dup(fd), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # Última línea cortada por un crash a mitad de escritura: ese voto no se confirmó
+                        logger.warning("votes:skip_corrupt_line segment=%s", path.name)
+            return records
+        finally:
+            os.close(fd)
+
+    def _open_active(self) -> None:
+        path = self.directory / f"{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}{LOG_SUFFIX}"
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        self._active, self._fd = path, fd
+
+    def _quarantine(self, records: List[Dict]) -> Path:
+        """Guarda (con fsync) los votos rechazados por la DB fuera del log que se reprocesa."""
+        path = self.directory / f"{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}{FAILED_SUFFIX}"
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            self._write(fd, b"".join(json.dumps(record).encode() + b"\n" for record in records))
+        finally:
+            os.close(fd)
+        return path
+
+    def _rotate(self) -> None:
+        """Cierra el log activo (pasa a ser un segmento) y abre uno nuevo."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._segments.append(self._active)
+        self._open_active()
+
+    async def run(self) -> None:
+        """Flusher periódico; corre hasta ser cancelado."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("votes:flush_failed pending=%s err=%s", len(self._pending), e)
+
+    async def close(self) -> None:
+        """Último flush al apagar; lo que no llegue a la DB queda en disco para el próximo arranque."""
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning("votes:final_flush_failed pending=%s err=%s", len(self._pending), e)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # --- Ingesta ---
+
+    async def submit(self, user_id: str, video_id: str) -> bool:
+        """Acepta el voto y espera a que esté en disco; False si ya había uno pendiente."""
+        if self.contains(user_id, video_id):
+            return False
+        now = datetime.utcnow().isoformat()
+        record = {"id": generate_uuid(), "user_id": str(user_id), "video_id": str(video_id), "at": now}
+        future = asyncio.get_running_loop().create_future()
+        self._unsynced.append((_vote_key(user_id, video_id), record, future))
+        if self._syncing is None or self._syncing.done():
+            self._syncing = asyncio.create_task(self._sync())
+        await future
+        return True
+
+    async def _sync(self) -> None:
+        """Group commit: escribe y hace fsync de todo lo acumulado desde la última vez."""
+        while self._unsynced:
+            batch, self._unsynced = self._unsynced, []
+            data = b"".join(json.dumps(record).encode() + b"\n" for _, record, _ in batch)
+            try:
+                async with self._io_lock:
+                    await asyncio.to_thread(self._write, self._fd, data)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for key, record, future in batch:
+                self._pending.setdefault(key, record)
+                if not future.done():
+                    future.set_result(None)
+
+    @staticmethod
+    def _write(fd: int, data: bytes) -> None:
+        os.write(fd, data)
+        os.fsync(fd)
+
+    # --- Flush ---
+
+    async def flush(self) -> int:
+        """Vuelca los pendientes a la DB; devuelve cuántos votos nuevos se insertaron."""
+        async with self._flush_lock:
+            async with self._io_lock:
+                if not self._pending:
+                    return 0
+                self._rotate()
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+                segments, self._segments = self._segments, []
+            try:
+                inserted, videos, rejected = await self._insert(list(batch.values()))
+                if rejected:
+                    path = await asyncio.to_thread(self._quarantine, rejected)
+                    logger.error("votes:rejected count=%s segment=%s", len(rejected), path.name)
+            except BaseException:
+                # Se reintenta en el próximo flush; los segmentos siguen en disco
+                for key, record in batch.items():
+                    self._pending.setdefault(key, record)
+                self._segments = segments + self._segments
+                raise
+            finally:
+                self._flushing = {}
+            for path in segments:
+                path.unlink(missing_ok=True)
+            if VOTE_BUFFER_FLUSHED is not None:
+                VOTE_BUFFER_FLUSHED.labels(result="inserted").inc(inserted)
+                VOTE_BUFFER_FLUSHED.labels(result="duplicate").inc(len(batch) - inserted - len(rejected))
+                VOTE_BUFFER_FLUSHED.labels(result="rejected").inc(len(rejected))
+            if videos and self.on_flushed is not None:
+                self.on_flushed(videos)
+            logger.info("votes:flushed accepted=%s inserted=%s videos=%s", len(batch), inserted, len(videos))
+            return inserted
+
+    async def _insert(self, records: List[Dict]) -> Tuple[int, List[str], List[Dict]]:
+        """Inserta en lotes de max_batch; devuelve (insertados, videos tocados, registros rechazados)."""
+        inserted = 0
+        videos: set[str] = set()
+        rejected: List[Dict] = []
+        async with self.session_factory() as db:
+            for i in range(0, len(records), self.max_batch):
+                chunk = records[i:i + self.max_batch]
+                try:
+                    counts = await self._insert_chunk(db, chunk)
+                except (IntegrityError, DataError) as e:
+                    # Algún registro envenena el lote: se aíslan fila por fila
+                    logger.warning("votes:batch_rejected rows=%s err=%s", len(chunk), e)
+                    counts = []
+                    for record in chunk:
+                        try:
+                            counts.extend(await self._insert_chunk(db, [record]))
+                        except (IntegrityError, DataError):
+                            rejected.append(record)
+                for video_id, n in counts:
+                    videos.add(str(video_id))
+                    inserted += n
+            await db.commit()
+        return inserted, sorted(videos), rejected
+
+    @staticmethod
+    async def _insert_chunk(db: AsyncSession, records: List[Dict]) -> List[Tuple[str, int]]:
+        rows = [
+            {
+                "id": r["id"],
+                "user_id": r["user_id"],
+                "video_id": r["video_id"],
+                "created_at": datetime.fromisoformat(r["at"]),
+                "updated_at": datetime.fromisoformat(r["at"]),
+            }
+            for r in records
+        ]
+        # Savepoint: un lote rechazado no aborta la transacción de los anteriores
+        async with db.begin_nested():
+            return list((await db.execute(_flush_statement(rows))).all())
+
+
+class BufferedVoteService(PublicVideoServicePort):
+    """Decorador de PublicVideoServicePort que registra los votos vía VoteBuffer."""
+
+    def __init__(self, inner: PublicVideoServicePort, buffer: VoteBuffer) -> None:
+        self.inner = inner
+        self.buffer = buffer
+
+    async def list_videos(
+        self,
+        *,
+        city: Optional[str],
+        limit: int,
+        offset: int,
+        db: AsyncSession,
+        after: Optional[Tuple[int, str]] = None,
+    ) -> List[PublicVideoRecord]:
+        return await self.inner.list_videos(city=city, limit=limit, offset=offset, after=after, db=db)
+
+    async def get_video(
+        self,
+        *,
+        video_id: str,
+        db: AsyncSession,
+    ) -> PublicVideoRecord:
+        return await self.inner.get_video(video_id=video_id, db=db)
+
+    async def register_vote(
+        self,
+        *,
+        video_id: str,
+        user_id: str,
+        db: AsyncSession,
+    ) -> None:
+        if self.buffer.contains(user_id, video_id):
+            raise HTTPException(status_code=400, detail="Ya has votado por este video")
+
+        row = (await db.execute(_precheck_statement(video_id, user_id))).one_or_none()
+        # Devuelve la conexión al pool antes de esperar el fsync
+        await db.rollback()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Video no encontrado")
+        if row.status != VideoStatus.processed:
+            raise HTTPException(
+                status_code=400,
+                detail="Solo se puede votar por videos procesados",
+            )
+        if row.voted or not await self.buffer.submit(user_id, video_id):
+            raise HTTPException(status_code=400, detail="Ya has votado por este video")
+
+    async def get_rankings(
+        self,
+        *,
+        city: Optional[str],
+        limit: int,
+        db: AsyncSession,
+    ) -> List[RankingRecord]:
+        return await self.inner.get_rankings(city=city, limit=limit, db=db)
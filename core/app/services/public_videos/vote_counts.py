@@ -0,0 +1,32 @@
+"""Reconciliación de `videos.votes_count` contra la tabla `votes`.
+
+El contador se mantiene en `register_vote`, pero puede desviarse si se borran
+o insertan votos por fuera de la API (seeds, scripts, restauraciones). El job
+recalcula los conteos y solo escribe las filas que difieren, así que correrlo
+seguido es barato cuando todo está en orden.
+"""
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.video import Video
+from app.models.vote import Vote
+
+
+async def reconcile_vote_counts(db: AsyncSession) -> int:
+    """Recalcula votes_count para todos los videos; devuelve cuántas filas corrigió."""
+    actual = (
+        select(func.count(Vote.id))
+        .where(Vote.video_id == Video.id)
+        .correlate(Video)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(Video)
+        .where(Video.votes_count != actual)
+        .values(votes_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount or 0
+
@@ -0,0 +1,81 @@
+"""Puerto async sobre el adapter S3 síncrono.
+
+boto3 es bloqueante; cada llamada se ejecuta en el executor de I/O compartido
+(`get_io_executor`) para no frenar el event loop. Encima se agregan:
+
+- un límite de llamadas en vuelo por proceso (semáforo), para que una ráfaga
+  de requests no acapare todos los threads del executor;
+- un timeout por llamada: el request deja de esperar y recibe
+  `asyncio.TimeoutError`. El thread no puede cancelarse, así que su lugar en
+  el semáforo se libera recién cuando la llamada a boto3 termina de verdad.
+
+El adapter se resuelve en cada llamada (`resolve()`), así se respeta la
+instancia perezosa de `uploads.local.STORAGE` y los tests pueden reemplazarla.
+"""
+
+import asyncio
+import functools
+from typing import Any, BinaryIO, Callable, Optional
+
+from app.services.storage.executors import get_io_executor
+
+
+class AsyncS3Storage:
+    """Variante async de las operaciones S3 que se usan desde endpoints."""
+
+    def __init__(
+        self,
+        resolve: Callable[[], Any],
+        *,
+        max_concurrency: int = 32,
+        timeout: float = 30.0,
+        upload_timeout: float = 900.0,
+    ) -> None:
+        self._resolve = resolve
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.upload_timeout = upload_timeout
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def _call(self, method: str, *args, timeout: Optional[float] = None) -> Any:
+        fn = getattr(self._resolve(), method)
+        await self._slots.acquire()
+        try:
+            fut = asyncio.get_running_loop().run_in_executor(get_io_executor(), functools.partial(fn, *args))
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        # shield: ante un timeout se deja de esperar, pero el future sigue hasta que boto3 vuelva
+        return await asyncio.wait_for(asyncio.shield(fut), self.timeout if timeout is None else timeout)
+
+    def in_flight(self) -> int:
+        return self.max_concurrency - self._slots._value
+
+    # --- Objetos ---
+
+    async def save_with_key(self, fileobj: BinaryIO, key: str, content_type: str) -> str:
+        return await self._call("save_with_key", fileobj, key, content_type, timeout=self.upload_timeout)
+
+    async def head(self, key: str) -> dict | None:
+        return await self._call("head", key)
+
+    async def delete(self, key: str) -> None:
+        await self._call("delete", key)
+
+    async def presign(self, key: str, expires_in: int) -> str:
+        return await self._call("presign", key, expires_in)
+
+    # --- Multipart ---
+
+    async def create_multipart_upload(self, key: str, content_type: str) -> str:
+        return await self._call("create_multipart_upload", key, content_type)
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, body) -> str:
+        return await self._call("upload_part", key, upload_id, part_number, body, timeout=self.upload_timeout)
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]) -> None:
+        await self._call("complete_multipart_upload", key, upload_id, parts)
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await self._call("abort_multipart_upload", key, upload_id)
@@ -110,4 +110,64 @@ class S3StorageAdapter:
         )
         return f"/{key}"
 
-    # Nota: ruta única optimizada -> save() síncrono con boto3; no se expone variante async.
+    # --- Multipart directo (el cliente sube las partes a S3 con URLs prefirmadas) ---
+
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        """Inicia un multipart upload para la key y devuelve su UploadId."""
+        resp = self._s3.create_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            ContentType=content_type or "application/octet-stream",
+        )
+        return resp["UploadId"]
+
+    def presign_upload_part(self, key: str, upload_id: str, part_number: int, expires_in: int) -> str:
+        """URL prefirmada para que el cliente haga PUT de una parte."""
+        return self._s3.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": self.bucket, "Key": key, "UploadId": upload_id, "PartNumber": part_number},
+            ExpiresIn=expires_in,
+        )
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, body) -> str:
+        """Sube una parte desde la API (streaming) y devuelve su ETag."""
+        resp = self._s3.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body,
+        )
+        return resp["ETag"]
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]) -> None:
+        """Ensambla el objeto a partir de [{'PartNumber': n, 'ETag': '...'}]."""
+        self._s3.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(parts, key=lambda p: p["PartNumber"])},
+        )
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        self._s3.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    def head(self, key: str) -> dict | None:
+        """Metadatos del objeto (ContentLength, ContentType, ETag) o None si no existe."""
+        from botocore.exceptions import ClientError  # type: ignore
+
+        try:
+            return self._s3.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def delete(self, key: str) -> None:
+        self._s3.delete_object(Bucket=self.bucket, Key=key)
+
+    def presign(self, key: str, expires_in: int) -> str:
+        """URL prefirmada de lectura (GET) para el objeto."""
+        return self._s3.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in,
+        )
+
+    # Nota: el adapter es síncrono; la variante async vive en storage.async_s3 (executor de I/O).
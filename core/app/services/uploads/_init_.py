@@ -1,5 +1,7 @@
 from app.services.uploads.base import UploadServicePort
+from app.services.uploads.direct import DirectUploadService
 from app.services.uploads.local import LocalUploadService
+from app.services.uploads.streaming import StreamingUploadService
 
 
 def get_upload_service() -> UploadServicePort:
@@ -8,3 +10,11 @@ def get_upload_service() -> UploadServicePort:
     # if settings.UPLOADS_BACKEND == "s3":
     #     return S3UploadService(...)
     return LocalUploadService()
+
+
+def get_direct_upload_service() -> DirectUploadService:
+    return DirectUploadService()
+
+
+def get_streaming_upload_service() -> StreamingUploadService:
+    return StreamingUploadService()
@@ -0,0 +1,246 @@
+"""Subida directa a S3 con multipart upload y URLs prefirmadas.
+
+Flujo en dos pasos, sin que los bytes del video pasen por la API:
+
+1. `initiate`: valida formato y tamaño declarado, precomputa la key S3, abre
+   el multipart upload y devuelve una URL prefirmada por parte junto con un
+   token firmado (HS256) que describe la subida.
+2. `complete`: verifica el token, ensambla el objeto con los ETags que S3
+   devolvió al cliente, comprueba que el tamaño coincide con lo declarado,
+   persiste el Video y, ya confirmado el commit, entrega la tarea
+   `process_video` a la cola durable de subidas (o la publica directo si la
+   cola está deshabilitada). Las llamadas concurrentes para la misma key se
+   serializan con un advisory lock de Postgres.
+
+El token evita guardar estado de la subida en la DB antes de que exista el
+objeto: el Video solo se crea cuando el original ya está completo en S3.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import math
+import os
+import time
+from typing import Dict, List, Tuple
+
+import jwt
+from fastapi import HTTPException
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.video import Video, VideoStatus
+from app.services.mq.publisher import QueuePublisher
+from app.services.uploads import local as uploads_local
+
+logger = logging.getLogger("anb.uploads.direct")
+
+# Límites de S3 para multipart upload
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+S3_MAX_PARTS = 10000
+
+TOKEN_AUDIENCE = "anb-direct-upload"
+
+
+def _token_secret() -> str:
+    """Clave del token de subida; nunca la misma que la de los access tokens.
+
+    Sin DIRECT_UPLOAD_TOKEN_SECRET se deriva una (HMAC de la clave de acceso con
+    la audience), así un token de subida no verifica como access token.
+    """
+    if settings.DIRECT_UPLOAD_TOKEN_SECRET:
+        return settings.DIRECT_UPLOAD_TOKEN_SECRET
+    access_key = os.getenv("ACCESS_TOKEN_SECRET_KEY", "")
+    if not access_key:
+        raise HTTPException(status_code=500, detail="Subida directa no configurada")
+    return hmac.new(access_key.encode(), TOKEN_AUDIENCE.encode(), hashlib.sha256).hexdigest()
+
+
+def _part_size(size_bytes: int) -> int:
+    """Tamaño de parte configurado, ajustado a los límites de S3."""
+    part_size = max(S3_MIN_PART_SIZE, settings.DIRECT_UPLOAD_PART_SIZE_MB * 1024 * 1024)
+    return max(part_size, math.ceil(size_bytes / S3_MAX_PARTS))
+
+
+async def _lock_upload(db: AsyncSession, key: str) -> None:
+    """Serializa `complete` por key hasta el fin de la transacción (solo Postgres)."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": key})
+
+
+def _publish(payload: dict) -> None:
+    pub = QueuePublisher()
+    try:
+        pub.publish_video(payload)
+    finally:
+        close_fn = getattr(pub, "close", None)
+        if close_fn:
+            try:
+                close_fn()
+            except Exception:
+                pass
+
+
+class DirectUploadService:
+    """Orquesta la subida directa a S3 (initiate/complete)."""
+
+    async def initiate(
+        self,
+        *,
+        user_id: str,
+        title: str,
+        filename: str,
+        size_bytes: int,
+        content_type: str,
+        correlation_id: str,
+    ) -> Dict:
+        ext = uploads_local._validate_ext(filename)
+        uploads_local._validate_size(size_bytes)
+
+        s3_key = uploads_local._new_s3_key(ext)
+        content_type = content_type or "application/octet-stream"
+        upload_id = await uploads_local.ASYNC_STORAGE.create_multipart_upload(s3_key, content_type)
+
+        part_size = _part_size(size_bytes)
+        expires_in = settings.DIRECT_UPLOAD_URL_EXPIRES_SECONDS
+        parts = []
+        for part_number in range(1, math.ceil(size_bytes / part_size) + 1):
+            # La firma es local (sin llamadas a S3)
+            url = uploads_local.STORAGE.presign_upload_part(s3_key, upload_id, part_number, expires_in)
+            parts.append({"part_number": part_number, "url": url})
+
+        now = int(time.time())
+        token = jwt.encode(
+            {
+                "sub": user_id,
+                "aud": TOKEN_AUDIENCE,
+                "iat": now,
+                "exp": now + expires_in,
+                "key": s3_key,
+                "upload_id": upload_id,
+                "title": title,
+                "filename": filename,
+                "size": size_bytes,
+                "content_type": content_type,
+                "corr": correlation_id,
+            },
+            _token_secret(),
+            algorithm="HS256",
+        )
+        logger.info(
+            "direct:initiated corr=%s user=%s key=%s parts=%s size_bytes=%s",
+            correlation_id,
+            user_id,
+            s3_key,
+            len(parts),
+            size_bytes,
+        )
+        return {"upload_token": token, "part_size": part_size, "parts": parts, "expires_in": expires_in}
+
+    def _decode_token(self, token: str, user_id: str) -> Dict:
+        try:
+            claims = jwt.decode(token, _token_secret(), algorithms=["HS256"], audience=TOKEN_AUDIENCE)
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=400, detail="La subida expiró; iníciala de nuevo")
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=400, detail="Token de subida inválido")
+        if str(claims.get("sub")) != str(user_id):
+            raise HTTPException(status_code=403, detail="La subida pertenece a otro usuario")
+        return claims
+
+    async def _assemble(self, key: str, upload_id: str, parts: List[Tuple[int, str]]) -> None:
+        """Completa el multipart; si ya se había completado (reintento) basta con que exista."""
+        from botocore.exceptions import ClientError  # type: ignore
+
+        s3_parts = [{"PartNumber": n, "ETag": etag} for n, etag in parts]
+        try:
+            await uploads_local.ASYNC_STORAGE.complete_multipart_upload(key, upload_id, s3_parts)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code == "NoSuchUpload":
+                return
+            logger.warning("direct:complete:rejected key=%s code=%s", key, code)
+            raise HTTPException(status_code=400, detail=f"No se pudo completar la subida: {code}")
+
+    async def complete(
+        self,
+        *,
+        user_id: str,
+        upload_token: str,
+        parts: List[Tuple[int, str]],
+        user_info: Dict[str, str],
+        db: AsyncSession,
+    ) -> Tuple[Video, str]:
+        claims = self._decode_token(upload_token, user_id)
+        s3_key = claims["key"]
+        saved_rel_path = f"/{s3_key}"
+        correlation_id = claims.get("corr") or ""
+
+        # Idempotente: un reintento de complete devuelve el video ya creado. El lock hace
+        # que un complete concurrente espere el commit del primero y vea su video
+        await _lock_upload(db, s3_key)
+        existing = (
+            await db.execute(select(Video).where(Video.original_path == saved_rel_path).limit(1))
+        ).scalar_one_or_none()
+        if existing is not None:
+            return existing, existing.correlation_id or correlation_id
+
+        await self._assemble(s3_key, claims["upload_id"], parts)
+
+        head = await uploads_local.ASYNC_STORAGE.head(s3_key)
+        if head is None:
+            raise HTTPException(status_code=400, detail="La subida no está completa en S3")
+        size_bytes = int(head.get("ContentLength", 0))
+        if size_bytes != int(claims["size"]):
+            # El objeto no corresponde a lo validado en initiate: se descarta
+            await uploads_local.ASYNC_STORAGE.delete(s3_key)
+            logger.warning(
+                "direct:size_mismatch corr=%s key=%s declared=%s actual=%s",
+                correlation_id,
+                s3_key,
+                claims["size"],
+                size_bytes,
+            )
+            raise HTTPException(status_code=400, detail="El tamaño subido no coincide con el declarado")
+
+        video = Video(
+            user_id=user_id,
+            title=claims["title"],
+            original_filename=claims["filename"],
+            original_path=saved_rel_path,
+            status=VideoStatus.uploaded,
+            file_size_mb=round(size_bytes / (1024 * 1024), 2),
+            player_first_name=user_info.get("first_name", ""),
+            player_last_name=user_info.get("last_name", ""),
+            player_city=user_info.get("city", ""),
+            correlation_id=correlation_id,
+        )
+        db.add(video)
+        await db.flush()
+        # Commit antes de publicar: el worker debe encontrar la fila al tomar la tarea
+        await db.commit()
+
+        payload = {
+            "video_id": str(video.id),
+            "input_path": f"s3://{settings.S3_BUCKET}/{s3_key}",
+            "correlation_id": correlation_id,
+        }
+        if settings.UPLOAD_QUEUE_ENABLED:
+            # Cola durable: un fallo de publicación se reintenta ahí, sin devolver error al cliente
+            job = dict(payload, s3_key=s3_key, content_type=claims["content_type"], skip_s3_upload=True)
+            await asyncio.to_thread(uploads_local.get_upload_queue().submit, job, reserved=False)
+        else:
+            try:
+                await asyncio.to_thread(_publish, payload)
+            except Exception as e:
+                # Nadie tomó la tarea: se borra el video para que el cliente pueda reintentar complete
+                logger.exception("direct:publish_failed corr=%s err=%s", correlation_id, e)
+                await db.delete(video)
+                await db.commit()
+                raise HTTPException(status_code=503, detail="No se pudo encolar el procesamiento; reintenta")
+        logger.info("direct:completed corr=%s video_id=%s key=%s", correlation_id, video.id, s3_key)
+        return video, correlation_id
@@ -0,0 +1,264 @@
+"""Cola local durable para el trabajo posterior a la subida (S3 + publicación de la tarea).
+
+Cada trabajo es un archivo JSON en UPLOAD_QUEUE_DIR, escrito de forma atómica
+antes de responder al cliente. Un pool dedicado de threads (no el threadpool
+del event loop) los procesa. El archivo se borra solo cuando el trabajo
+terminó bien. Si el proceso se reinicia, `start()` vuelve a encolar los que
+quedaron pendientes.
+
+Varios procesos de la API pueden compartir el directorio: el trabajo se
+reclama con `flock` y, tras obtener el lock, se verifica que el archivo siga
+existiendo, así nunca se procesa dos veces.
+
+La cola es acotada por proceso: `try_reserve()` falla cuando hay
+`max_items` trabajos en vuelo y el endpoint responde 503 con Retry-After.
+
+Un trabajo que agota `max_attempts` pasa a `failed/` junto con su archivo
+temporal (`tmp_path`) y se notifica a `on_failed`, que deja el video en un
+estado terminal.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("anb.uploads.queue")
+
+try:
+    from prometheus_client import Counter, Gauge
+
+    QUEUE_DEPTH = Gauge("anb_upload_queue_depth", "Trabajos de subida pendientes en este proceso")
+    QUEUE_OLDEST_AGE = Gauge(
+        "anb_upload_queue_oldest_age_seconds", "Antigüedad del trabajo de subida pendiente más viejo"
+    )
+    QUEUE_REJECTED = Counter("anb_upload_queue_rejected", "Subidas rechazadas con 503 por cola llena")
+    QUEUE_FAILED = Counter("anb_upload_queue_failed", "Trabajos de subida descartados tras agotar reintentos")
+except (ImportError, ValueError):
+    QUEUE_DEPTH = QUEUE_OLDEST_AGE = QUEUE_REJECTED = QUEUE_FAILED = None
+
+JOB_SUFFIX = ".job.json"
+FAILED_DIR = "failed"
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class UploadHandoffQueue:
+    """Cola acotada y persistente en disco con un pool propio de threads."""
+
+    def __init__(
+        self,
+        directory: str,
+        process_fn: Callable[[Dict], None],
+        *,
+        max_items: int = 64,
+        workers: int = 4,
+        max_attempts: int = 10,
+        on_failed: Optional[Callable[[Dict], None]] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.process_fn = process_fn
+        self.on_failed = on_failed
+        self.max_items = max(1, max_items)
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self._queue: "queue.Queue[Path | None]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._pending: Dict[Path, float] = {}
+        self._threads: list[threading.Thread] = []
+        self._stopping = threading.Event()
+
+    # --- Backpressure ---
+
+    def try_reserve(self) -> bool:
+        """Reserva un lugar para un trabajo; False si la cola está llena."""
+        with self._lock:
+            if self._reserved + len(self._pending) >= self.max_items:
+                if QUEUE_REJECTED is not None:
+                    QUEUE_REJECTED.inc()
+                return False
+            self._reserved += 1
+            return True
+
+    def cancel_reservation(self) -> None:
+        with self._lock:
+            self._reserved = max(0, self._reserved - 1)
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def oldest_age(self) -> float:
+        with self._lock:
+            oldest = min(self._pending.values(), default=None)
+        return 0.0 if oldest is None else max(0.0, time.time() - oldest)
+
+    # --- Encolado ---
+
+    def data_dir(self) -> Path:
+        """Directorio para los archivos de datos de los trabajos (mismo volumen durable)."""
+        path = self.directory / "data"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def submit(self, job: Dict, *, reserved: bool = True) -> Path:
+        """Persiste el trabajo (consume la reserva, si la hay) y lo entrega al pool."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        job = dict(job, enqueued_at=job.get("enqueued_at") or time.time(), attempts=job.get("attempts", 0))
+        path = self.directory / f"{time.time_ns()}-{uuid.uuid4().hex}{JOB_SUFFIX}"
+        self._write_job(path, job)
+        with self._lock:
+            if reserved:
+                self._reserved = max(0, self._reserved - 1)
+            self._pending[path] = job["enqueued_at"]
+        self._queue.put(path)
+        return path
+
+    def _write_job(self, path: Path, job: Dict) -> None:
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> int:
+        """Inicia el pool y reencola los trabajos pendientes en disco; devuelve cuántos se reencolaron."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stopping.clear()
+        if QUEUE_DEPTH is not None:
+            QUEUE_DEPTH.set_function(self.depth)
+            QUEUE_OLDEST_AGE.set_function(self.oldest_age)
+        replayed = 0
+        for path in sorted(self.directory.glob(f"*{JOB_SUFFIX}")):
+            with self._lock:
+                if path in self._pending:
+                    continue
+                try:
+                    enqueued_at = json.loads(path.read_text(encoding="utf-8")).get("enqueued_at") or time.time()
+                except (OSError, ValueError):
+                    enqueued_at = time.time()
+                self._pending[path] = enqueued_at
+            self._queue.put(path)
+            replayed += 1
+        if replayed:
+            logger.info("queue:replay pending=%s dir=%s", replayed, self.directory)
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"upload-queue-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return replayed
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detiene el pool; lo pendiente queda en disco para el próximo arranque."""
+        self._stopping.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    # --- Procesamiento ---
+
+    def _worker(self) -> None:
+        while True:
+            path = self._queue.get()
+            if path is None or self._stopping.is_set():
+                return
+            try:
+                self._run(path)
+            except Exception:
+                logger.exception("queue:worker_error job=%s", path.name)
+
+    def _forget(self, path: Path) -> None:
+        with self._lock:
+            self._pending.pop(path, None)
+
+    def _run(self, path: Path) -> None:
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            # Otro proceso ya lo completó
+            self._forget(path)
+            return
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Otro proceso lo está procesando
+                self._forget(path)
+                return
+            if not path.exists() or os.stat(path).st_ino != os.fstat(fd).st_ino:
+                self._forget(path)
+                return
+            job = json.loads(path.read_text(encoding="utf-8"))
+            try:
+                self.process_fn(job)
+            except Exception as e:
+                self._retry_or_fail(path, job, e)
+                return
+            path.unlink(missing_ok=True)
+            self._forget(path)
+        finally:
+            os.close(fd)
+
+    def _retry_or_fail(self, path: Path, job: Dict, error: Exception) -> None:
+        job["attempts"] = int(job.get("attempts", 0)) + 1
+        job["last_error"] = str(error)
+        if job["attempts"] >= self.max_attempts:
+            failed = self.directory / FAILED_DIR
+            failed.mkdir(parents=True, exist_ok=True)
+            self._quarantine_data(job, failed)
+            self._write_job(failed / path.name, job)
+            path.unlink(missing_ok=True)
+            self._forget(path)
+            if QUEUE_FAILED is not None:
+                QUEUE_FAILED.inc()
+            logger.error(
+                "queue:failed job=%s attempts=%s corr=%s err=%s",
+                path.name,
+                job["attempts"],
+                job.get("correlation_id"),
+                error,
+            )
+            if self.on_failed is not None:
+                try:
+                    self.on_failed(job)
+                except Exception:
+                    logger.exception("queue:on_failed_error job=%s corr=%s", path.name, job.get("correlation_id"))
+            return
+        self._write_job(path, job)
+        delay = min(MAX_BACKOFF_SECONDS, 2.0 ** (job["attempts"] - 1))
+        logger.warning(
+            "queue:retry job=%s attempt=%s delay_s=%.1f corr=%s err=%s",
+            path.name,
+            job["attempts"],
+            delay,
+            job.get("correlation_id"),
+            error,
+        )
+        timer = threading.Timer(delay, self._queue.put, args=(path,))
+        timer.daemon = True
+        timer.start()
+
+    @staticmethod
+    def _quarantine_data(job: Dict, failed: Path) -> None:
+        """Mueve el temporal del trabajo a failed/ (el job queda apuntando a la copia)."""
+        tmp_path = job.get("tmp_path")
+        if not tmp_path or not os.path.exists(tmp_path):
+            return
+        target = failed / Path(tmp_path).name
+        try:
+            shutil.move(tmp_path, target)
+            job["tmp_path"] = str(target)
+        except OSError as e:
+            logger.warning("queue:quarantine_failed path=%s err=%s", tmp_path, e)
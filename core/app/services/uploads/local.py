@@ -6,18 +6,72 @@ from typing import Dict, Tuple
 import time
 import asyncio
 import tempfile
-import shutil
+import hashlib
 
 from fastapi import HTTPException, UploadFile, BackgroundTasks
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
 
 from app.config import settings
 from app.models.video import Video, VideoStatus
+from app.services.storage.async_s3 import AsyncS3Storage
 from app.services.storage.s3 import S3StorageAdapter
 from app.services.mq.publisher import QueuePublisher
+from app.services.uploads.handoff import UploadHandoffQueue
 
 logger = logging.getLogger("anb.uploads")
 
+# Tamaño de bloque para copiar el upload a disco mientras se calcula el SHA-256
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _write_temp(fobj, ext: str, directory: str | None = None) -> Tuple[str, str]:
+    """Copia el upload a un NamedTemporaryFile calculando su SHA-256 en la misma pasada.
+
+    Retorna (ruta_temporal, sha256_hex). Bloqueante: ejecutar en un hilo.
+    """
+    fobj.seek(0)
+    digest = hashlib.sha256()
+    tmpf = tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext}", dir=directory)
+    try:
+        for chunk in iter(lambda: fobj.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            tmpf.write(chunk)
+    finally:
+        tmpf.close()
+    return tmpf.name, digest.hexdigest()
+
+
+def _new_s3_key(ext: str) -> str:
+    """Key S3 única para un original nuevo: <prefix>/YYYY/MM/DD/<uuid>-<uuid>.<ext>."""
+    today = datetime.now(timezone.utc)
+    day_dir = f"{today:%Y}/{today:%m}/{today:%d}"
+    basename = f"{uuid.uuid4().hex}.{ext}"
+    return f"{settings.S3_PREFIX.strip('/')}/{day_dir}/{uuid.uuid4().hex}-{basename}"
+
+
+def _validate_ext(filename: str | None) -> str:
+    """Extensión normalizada del archivo; 400 si no está permitida."""
+    _, ext = os.path.splitext(filename or "")
+    ext = (ext or "").lower().lstrip(".")
+    allowed = {x.lower() for x in settings.ALLOWED_VIDEO_FORMATS}
+    if ext not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato no permitido. Usa: {', '.join(sorted(allowed)).upper()}.",
+        )
+    return ext
+
+
+def _validate_size(size_bytes: int) -> None:
+    """413 si el tamaño supera MAX_UPLOAD_SIZE_MB."""
+    if size_bytes > settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El archivo supera {settings.MAX_UPLOAD_SIZE_MB} MB.",
+        )
+
 
 class _LazyS3Storage:
     """Instancia perezosa de S3 para evitar inicializar en import.
@@ -50,10 +104,167 @@ class _LazyS3Storage:
     def save_with_key(self, fileobj, key: str, content_type) -> str:  # type: ignore[override]
         return self._ensure().save_with_key(fileobj, key, content_type)
 
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        return self._ensure().create_multipart_upload(key, content_type)
+
+    def presign_upload_part(self, key: str, upload_id: str, part_number: int, expires_in: int) -> str:
+        return self._ensure().presign_upload_part(key, upload_id, part_number, expires_in)
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, body) -> str:
+        return self._ensure().upload_part(key, upload_id, part_number, body)
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]) -> None:
+        return self._ensure().complete_multipart_upload(key, upload_id, parts)
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        return self._ensure().abort_multipart_upload(key, upload_id)
+
+    def head(self, key: str) -> dict | None:
+        return self._ensure().head(key)
+
+    def delete(self, key: str) -> None:
+        return self._ensure().delete(key)
+
+    def presign(self, key: str, expires_in: int) -> str:
+        return self._ensure().presign(key, expires_in)
+
 
 # S3 como backend fijo (perezoso para no fallar al importar si faltan vars)
 STORAGE = _LazyS3Storage()
 
+# Puerto async para usar S3 desde el event loop (executor de I/O, timeouts y límite de concurrencia)
+ASYNC_STORAGE = AsyncS3Storage(
+    lambda: STORAGE,
+    max_concurrency=settings.S3_ASYNC_MAX_CONCURRENCY,
+    timeout=settings.S3_ASYNC_TIMEOUT_SECONDS,
+    upload_timeout=settings.S3_ASYNC_UPLOAD_TIMEOUT_SECONDS,
+)
+
+
+def _upload_and_publish(
+    tmp_path: str | None,
+    s3_key: str,
+    video_id: str,
+    input_path: str,
+    correlation_id: str,
+    content_type: str,
+    *,
+    content_sha256: str | None = None,
+    skip_s3_upload: bool = False,
+) -> None:
+    """Sube el original a S3 (salvo dedup) y publica la tarea del worker. Propaga errores."""
+    bg_t0 = time.perf_counter()
+    logger.info(
+        "bg:start corr=%s video_id=%s key=%s",
+        correlation_id,
+        video_id,
+        s3_key,
+    )
+    # Subir a S3 (salvo que el contenido ya exista como original de otro video)
+    s3_t0 = time.perf_counter()
+    if not skip_s3_upload:
+        with open(tmp_path, "rb") as f:
+            STORAGE.save_with_key(f, s3_key, content_type)
+    s3_ms = (time.perf_counter() - s3_t0) * 1000.0
+    logger.info(
+        "bg:s3:uploaded corr=%s key=%s skipped=%s elapsed_ms=%.1f",
+        correlation_id,
+        s3_key,
+        skip_s3_upload,
+        s3_ms,
+    )
+    # Publicar en MQ
+    mq_t0 = time.perf_counter()
+    pub = QueuePublisher()
+    payload = {
+        "video_id": video_id,
+        "input_path": input_path,
+        "correlation_id": correlation_id,
+    }
+    if content_sha256:
+        payload["content_sha256"] = content_sha256
+    try:
+        pub.publish_video(payload)
+    finally:
+        close_fn = getattr(pub, "close", None)
+        if close_fn:
+            try:
+                close_fn()
+            except Exception:
+                pass
+    mq_ms = (time.perf_counter() - mq_t0) * 1000.0
+    total_ms = (time.perf_counter() - bg_t0) * 1000.0
+    logger.info(
+        "bg:done corr=%s video_id=%s s3_ms=%.1f mq_ms=%.1f total_ms=%.1f",
+        correlation_id,
+        video_id,
+        s3_ms,
+        mq_ms,
+        total_ms,
+    )
+
+
+def _remove_temp(tmp_path: str, correlation_id: str) -> None:
+    try:
+        os.remove(tmp_path)
+        logger.info("bg:temp:removed corr=%s path=%s", correlation_id, tmp_path)
+    except Exception:
+        logger.warning("bg:temp:remove_failed corr=%s path=%s", correlation_id, tmp_path)
+
+
+def _deliver_queued_upload(job: Dict) -> None:
+    """Procesa un trabajo de la cola durable; el temporal se borra solo si todo salió bien."""
+    _upload_and_publish(
+        job.get("tmp_path"),
+        job["s3_key"],
+        job["video_id"],
+        job["input_path"],
+        job["correlation_id"],
+        job["content_type"],
+        content_sha256=job.get("content_sha256"),
+        skip_s3_upload=bool(job.get("skip_s3_upload")),
+    )
+    if job.get("tmp_path"):
+        _remove_temp(job["tmp_path"], job["correlation_id"])
+
+
+async def _mark_upload_failed(video_id: str) -> None:
+    # Engine propio sin pool: corre en un thread de la cola, fuera del event loop de la API
+    engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(Video)
+                .where(Video.id == video_id, Video.status == VideoStatus.uploaded)
+                .values(status=VideoStatus.failed)
+            )
+    finally:
+        await engine.dispose()
+
+
+def _fail_queued_upload(job: Dict) -> None:
+    """Hook de la cola al descartar un trabajo: la tarea nunca se publicó, el video queda `failed`."""
+    asyncio.run(_mark_upload_failed(job["video_id"]))
+    logger.error("upload:queue:video_failed corr=%s video_id=%s", job.get("correlation_id"), job["video_id"])
+
+
+_UPLOAD_QUEUE: UploadHandoffQueue | None = None
+
+
+def get_upload_queue() -> UploadHandoffQueue:
+    """Cola durable del proceso (se inicia en el lifespan de la app)."""
+    global _UPLOAD_QUEUE
+    if _UPLOAD_QUEUE is None:
+        _UPLOAD_QUEUE = UploadHandoffQueue(
+            settings.UPLOAD_QUEUE_DIR,
+            _deliver_queued_upload,
+            max_items=settings.UPLOAD_QUEUE_MAX_ITEMS,
+            workers=settings.UPLOAD_QUEUE_WORKERS,
+            max_attempts=settings.UPLOAD_QUEUE_MAX_ATTEMPTS,
+            on_failed=_fail_queued_upload,
+        )
+    return _UPLOAD_QUEUE
+
 
 class LocalUploadService:
     """Implementación del servicio de subida de videos con S3-only y pipeline en background."""
@@ -90,12 +301,77 @@ class LocalUploadService:
             size_bytes,
         )
 
-    # Precomputar key S3 para responder sin esperar el upload
-        today = datetime.now(timezone.utc)
-        day_dir = f"{today:%Y}/{today:%m}/{today:%d}"
-        basename = f"{uuid.uuid4().hex}.{ext}"
-        s3_key = f"{settings.S3_PREFIX.strip('/')}/{day_dir}/{uuid.uuid4().hex}-{basename}"
-        saved_rel_path = f"/{s3_key}"  # ruta lógica
+        # Backpressure: reservar lugar en la cola durable antes de copiar el archivo
+        handoff = get_upload_queue() if settings.UPLOAD_QUEUE_ENABLED else None
+        if handoff is not None and not handoff.try_reserve():
+            logger.warning("upload:queue:full corr=%s", correlation_id)
+            raise HTTPException(
+                status_code=503,
+                detail="Hay demasiadas subidas en curso. Intenta de nuevo en unos segundos.",
+                headers={"Retry-After": str(settings.UPLOAD_QUEUE_RETRY_AFTER_SECONDS)},
+            )
+        try:
+            return await self._persist_and_schedule(
+                user_id=user_id,
+                title=title,
+                upload_file=upload_file,
+                user_info=user_info,
+                db=db,
+                correlation_id=correlation_id,
+                background_tasks=background_tasks,
+                handoff=handoff,
+                ext=ext,
+                size_bytes=size_bytes,
+                req_t0=req_t0,
+            )
+        except BaseException:
+            if handoff is not None:
+                handoff.cancel_reservation()
+            raise
+
+    async def _persist_and_schedule(
+        self,
+        *,
+        user_id: str,
+        title: str,
+        upload_file: UploadFile,
+        user_info: Dict[str, str],
+        db: AsyncSession,
+        correlation_id: str,
+        background_tasks: BackgroundTasks | None,
+        handoff: UploadHandoffQueue | None,
+        ext: str,
+        size_bytes: int,
+        req_t0: float,
+    ) -> Tuple[Video, str]:
+        # Copiar contenido a un archivo temporal para evitar 'seek of closed file' en background,
+        # calculando el SHA-256 en la misma pasada (IO bloqueante en un hilo). Con la cola
+        # durable el temporal vive en su directorio para sobrevivir a un reinicio.
+        tmp_dir = str(handoff.data_dir()) if handoff is not None else None
+        tmp_t0 = time.perf_counter()
+        tmp_path, content_sha256 = await asyncio.to_thread(_write_temp, upload_file.file, ext, tmp_dir)
+        tmp_ms = (time.perf_counter() - tmp_t0) * 1000.0
+        logger.info(
+            "upload:temp:copied corr=%s path=%s size_bytes=%s sha256=%s elapsed_ms=%.1f",
+            correlation_id,
+            tmp_path,
+            size_bytes,
+            content_sha256,
+            tmp_ms,
+        )
+
+        # Si el mismo contenido ya fue procesado, reutilizar su original en S3 (sin volver a subirlo)
+        saved_rel_path = await self._find_duplicate_original(db, content_sha256)
+        skip_s3_upload = saved_rel_path is not None
+        if skip_s3_upload:
+            s3_key = saved_rel_path.lstrip("/")
+            basename = os.path.basename(s3_key)
+            logger.info("upload:dedup:hit corr=%s sha256=%s key=%s", correlation_id, content_sha256, s3_key)
+        else:
+            # Precomputar key S3 para responder sin esperar el upload
+            s3_key = _new_s3_key(ext)
+            basename = os.path.basename(s3_key)
+            saved_rel_path = f"/{s3_key}"  # ruta lógica
 
         # Persistir Video (commit temprano)
         video = Video(
@@ -109,6 +385,7 @@ class LocalUploadService:
             player_last_name=user_info.get("last_name", ""),
             player_city=user_info.get("city", ""),
             correlation_id=correlation_id,
+            content_sha256=content_sha256,
         )
         logger.info("upload:db:persist corr=%s", correlation_id)
         db.add(video)
@@ -124,29 +401,29 @@ class LocalUploadService:
 
         input_path = f"s3://{settings.S3_BUCKET}/{s3_key}"  # pasado al worker
 
-        # Copiar contenido a un archivo temporal para evitar 'seek of closed file' en background
-        # Ejecutar IO bloqueante en un hilo para no bloquear el event loop
-        tmp_t0 = time.perf_counter()
-
-        def _write_temp(fobj, ext_local):
-            # run in thread
-            fobj.seek(0)
-            tmpf = tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext_local}")
-            try:
-                shutil.copyfileobj(fobj, tmpf)
-            finally:
-                tmpf.close()
-            return tmpf.name
-
-        tmp_path = await asyncio.to_thread(_write_temp, upload_file.file, ext)
-        tmp_ms = (time.perf_counter() - tmp_t0) * 1000.0
-        logger.info(
-            "upload:temp:copied corr=%s path=%s size_bytes=%s elapsed_ms=%.1f",
-            correlation_id,
-            tmp_path,
-            size_bytes,
-            tmp_ms,
-        )
+        if handoff is not None:
+            # Entregar a la cola durable: lo procesa su propio pool, fuera del threadpool del request
+            await asyncio.to_thread(
+                handoff.submit,
+                {
+                    "tmp_path": tmp_path,
+                    "s3_key": s3_key,
+                    "video_id": str(video.id),
+                    "input_path": input_path,
+                    "correlation_id": correlation_id,
+                    "content_type": upload_file.content_type or "application/octet-stream",
+                    "content_sha256": content_sha256,
+                    "skip_s3_upload": skip_s3_upload,
+                },
+            )
+            logger.info(
+                "upload:queue:submitted corr=%s video_id=%s key=%s input=%s",
+                correlation_id,
+                video.id,
+                s3_key,
+                input_path,
+            )
+            return video, correlation_id
 
         # Programar procesamiento en background (obligatorio)
         if background_tasks is None:
@@ -164,6 +441,8 @@ class LocalUploadService:
             input_path,
             correlation_id,
             upload_file.content_type or "application/octet-stream",
+            content_sha256=content_sha256,
+            skip_s3_upload=skip_s3_upload,
         )
         logger.info(
             "upload:bg:scheduled corr=%s video_id=%s key=%s input=%s",
@@ -175,24 +454,35 @@ class LocalUploadService:
         return video, correlation_id
 
     def _validate_ext_and_size(self, file: UploadFile):
-        _, ext = os.path.splitext(file.filename or "")
-        ext = (ext or "").lower().lstrip(".")
-        allowed = {x.lower() for x in settings.ALLOWED_VIDEO_FORMATS}
-        if ext not in allowed:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Formato no permitido. Usa: {', '.join(sorted(allowed)).upper()}.",
-            )
+        ext = _validate_ext(file.filename)
         file.file.seek(0, os.SEEK_END)
         size_bytes = file.file.tell()
         file.file.seek(0)
-        if size_bytes > settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024:
-            raise HTTPException(
-                status_code=413,
-                detail=f"El archivo supera {settings.MAX_UPLOAD_SIZE_MB} MB.",
-            )
+        _validate_size(size_bytes)
         return ext, size_bytes
 
+    async def _find_duplicate_original(self, db: AsyncSession, content_sha256: str) -> str | None:
+        """Retorna el original_path de un video ya procesado con el mismo contenido, si existe.
+
+        Solo se consideran videos `processed`: su original está garantizado en S3.
+        """
+        if not settings.UPLOAD_DEDUP_ENABLED:
+            return None
+        stmt = (
+            select(Video.original_path)
+            .where(Video.content_sha256 == content_sha256)
+            .where(Video.status == VideoStatus.processed)
+            .limit(1)
+        )
+        try:
+            result = await db.execute(stmt)
+            return result.scalar_one_or_none()
+        except Exception as e:
+            # La deduplicación es una optimización: ante errores se sube normalmente
+            logger.warning("upload:dedup:lookup_failed sha256=%s err=%s", content_sha256, e)
+            await db.rollback()
+            return None
+
     def _background_pipeline(
         self,
         tmp_path: str,
@@ -201,59 +491,23 @@ class LocalUploadService:
         input_path: str,
         correlation_id: str,
         content_type: str,
+        *,
+        content_sha256: str | None = None,
+        skip_s3_upload: bool = False,
     ) -> None:
         """Pipeline ejecutada después de enviar la respuesta (no async-await)."""
         try:
-            bg_t0 = time.perf_counter()
-            logger.info(
-                "bg:start corr=%s video_id=%s key=%s",
-                correlation_id,
-                video_id,
+            _upload_and_publish(
+                tmp_path,
                 s3_key,
-            )
-            # Subir a S3
-            s3_t0 = time.perf_counter()
-            with open(tmp_path, "rb") as f:
-                STORAGE.save_with_key(f, s3_key, content_type)
-            s3_ms = (time.perf_counter() - s3_t0) * 1000.0
-            logger.info(
-                "bg:s3:uploaded corr=%s key=%s elapsed_ms=%.1f",
-                correlation_id,
-                s3_key,
-                s3_ms,
-            )
-            # Publicar en MQ
-            mq_t0 = time.perf_counter()
-            pub = QueuePublisher()
-            payload = {
-                "video_id": video_id,
-                "input_path": input_path,
-                "correlation_id": correlation_id,
-            }
-            try:
-                pub.publish_video(payload)
-            finally:
-                close_fn = getattr(pub, "close", None)
-                if close_fn:
-                    try:
-                        close_fn()
-                    except Exception:
-                        pass
-            mq_ms = (time.perf_counter() - mq_t0) * 1000.0
-            total_ms = (time.perf_counter() - bg_t0) * 1000.0
-            logger.info(
-                "bg:done corr=%s video_id=%s s3_ms=%.1f mq_ms=%.1f total_ms=%.1f",
-                correlation_id,
                 video_id,
-                s3_ms,
-                mq_ms,
-                total_ms,
+                input_path,
+                correlation_id,
+                content_type,
+                content_sha256=content_sha256,
+                skip_s3_upload=skip_s3_upload,
             )
         except Exception as e:
             logger.exception("bg:error corr=%s err=%s", correlation_id, e)
         finally:
-            try:
-                os.remove(tmp_path)
-                logger.info("bg:temp:removed corr=%s path=%s", correlation_id, tmp_path)
-            except Exception:
-                logger.warning("bg:temp:remove_failed corr=%s path=%s", correlation_id, tmp_path)
+            _remove_temp(tmp_path, correlation_id)
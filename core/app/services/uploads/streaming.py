@@ -0,0 +1,363 @@
+"""Subida en streaming: del body multipart del request a S3 sin archivo temporal.
+
+El body se parsea por chunks con el parser de python-multipart (el mismo que
+usa Starlette para `UploadFile`, pero sin spool a disco). Los bytes del
+archivo se copian una vez a buffers de tamaño de parte tomados de un pool
+acotado y compartido por el proceso; cada buffer lleno se sube como parte de
+un multipart upload en el executor de I/O y vuelve al pool al terminar. Si el
+pool se agota, el request deja de leer el body hasta que se libere un buffer
+(backpressure hacia el cliente en lugar de crecer en memoria).
+
+Mientras se lee se calcula el SHA-256 y se corta con 413 al superar
+MAX_UPLOAD_SIZE_MB, abortando el multipart upload.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import time
+from typing import Dict, List, Tuple
+
+from fastapi import BackgroundTasks, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.video import Video, VideoStatus
+from app.services.uploads import local as uploads_local
+from app.services.uploads.direct import S3_MIN_PART_SIZE, _publish
+
+try:
+    import multipart
+    from multipart.multipart import parse_options_header
+except ImportError:  # pragma: no cover - python-multipart es dependencia de la API
+    multipart = None
+
+logger = logging.getLogger("anb.uploads.streaming")
+
+FILE_FIELD = "video_file"
+TITLE_FIELD = "title"
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class BufferPool:
+    """Pool acotado de bytearrays de tamaño fijo, reutilizados entre uploads."""
+
+    def __init__(self, buffer_size: int, max_buffers: int) -> None:
+        self.buffer_size = buffer_size
+        self._slots = asyncio.Semaphore(max_buffers)
+        self._free: List[bytearray] = []
+
+    async def acquire(self) -> bytearray:
+        await self._slots.acquire()
+        return self._free.pop() if self._free else bytearray(self.buffer_size)
+
+    def release(self, buf: bytearray) -> None:
+        self._free.append(buf)
+        self._slots.release()
+
+
+_BUFFER_POOL: BufferPool | None = None
+
+
+def get_buffer_pool() -> BufferPool:
+    global _BUFFER_POOL
+    if _BUFFER_POOL is None:
+        part_size = max(S3_MIN_PART_SIZE, settings.UPLOAD_STREAM_PART_SIZE_MB * 1024 * 1024)
+        _BUFFER_POOL = BufferPool(part_size, max(2, settings.UPLOAD_STREAM_BUFFERS))
+    return _BUFFER_POOL
+
+
+class _BufferReader(io.RawIOBase):
+    """File-like de solo lectura sobre un memoryview (Body de upload_part sin copiar el buffer)."""
+
+    def __init__(self, view: memoryview) -> None:
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, min(len(self._view), base + offset))
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+
+class _MultipartToS3:
+    """Sube a S3, por partes, los bytes del archivo que entrega el parser."""
+
+    def __init__(self, pool: BufferPool, max_bytes: int) -> None:
+        self.key: str | None = None
+        self.content_type = "application/octet-stream"
+        self.upload_id: str | None = None
+        self.pool = pool
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self._buf: bytearray | None = None
+        self._fill = 0
+        self._pending: List[memoryview] = []
+        self._uploads: List[asyncio.Future] = []
+
+    def feed(self, data: memoryview) -> None:
+        """Callback síncrono del parser: solo encola la vista; se copia en `drain`."""
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"El archivo supera {settings.MAX_UPLOAD_SIZE_MB} MB.")
+        self.digest.update(data)
+        self._pending.append(data)
+
+    def start(self, ext: str, content_type: str | None) -> None:
+        """Fija la key S3 al conocer el archivo; el multipart se abre en el próximo `drain`."""
+        self.key = uploads_local._new_s3_key(ext)
+        self.content_type = content_type or self.content_type
+
+    async def drain(self) -> None:
+        """Copia lo pendiente a buffers del pool y despacha cada parte llena."""
+        if self.key is not None and self.upload_id is None:
+            self.upload_id = await uploads_local.ASYNC_STORAGE.create_multipart_upload(self.key, self.content_type)
+        for view in self._pending:
+            while view:
+                if self._buf is None:
+                    self._buf = await self.pool.acquire()
+                    self._fill = 0
+                n = min(len(view), len(self._buf) - self._fill)
+                self._buf[self._fill:self._fill + n] = view[:n]
+                self._fill += n
+                view = view[n:]
+                if self._fill == len(self._buf):
+                    self._dispatch()
+        self._pending.clear()
+
+    def _dispatch(self) -> None:
+        buf, fill = self._buf, self._fill
+        self._buf, self._fill = None, 0
+        part_number = len(self._uploads) + 1
+        fut = asyncio.ensure_future(
+            uploads_local.ASYNC_STORAGE.upload_part(
+                self.key, self.upload_id, part_number, _BufferReader(memoryview(buf)[:fill])
+            )
+        )
+        fut.add_done_callback(lambda _: self.pool.release(buf))
+        self._uploads.append(fut)
+
+    async def finish(self) -> List[dict]:
+        """Sube la última parte (puede ser menor) y devuelve las partes para completar."""
+        await self.drain()
+        if self._buf is not None and self._fill:
+            self._dispatch()
+        elif self._buf is not None:
+            self.pool.release(self._buf)
+            self._buf = None
+        etags = await asyncio.gather(*self._uploads)
+        parts = [{"PartNumber": i, "ETag": etag} for i, etag in enumerate(etags, start=1)]
+        await uploads_local.ASYNC_STORAGE.complete_multipart_upload(self.key, self.upload_id, parts)
+        return parts
+
+    async def abort(self) -> None:
+        if self._buf is not None:
+            self.pool.release(self._buf)
+            self._buf = None
+        # Esperar las partes en vuelo para devolver sus buffers antes de abortar
+        await asyncio.gather(*self._uploads, return_exceptions=True)
+        if self.upload_id is None:
+            return
+        try:
+            await uploads_local.ASYNC_STORAGE.abort_multipart_upload(self.key, self.upload_id)
+        except Exception as e:
+            logger.warning("stream:abort_failed key=%s err=%s", self.key, e)
+
+
+class _FormStream:
+    """Callbacks del parser multipart: campos en memoria, el archivo hacia `_MultipartToS3`."""
+
+    def __init__(self, sink: _MultipartToS3) -> None:
+        self.sink = sink
+        self.fields: Dict[str, str] = {}
+        self.filename: str | None = None
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._part_type = b""
+        self._name: str | None = None
+        self._is_file = False
+        self._data = bytearray()
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+        self._part_type = b""
+        self._name = None
+        self._is_file = False
+        self._data = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        name = self._header_name.lower()
+        if name == b"content-disposition":
+            self._disposition = self._header_value
+        elif name == b"content-type":
+            self._part_type = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        if self._name == FILE_FIELD:
+            if self.filename is not None:
+                raise HTTPException(status_code=400, detail="Solo se permite un archivo por subida")
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+            # Validar la extensión antes de recibir los bytes
+            ext = uploads_local._validate_ext(self.filename)
+            self.sink.start(ext, self._part_type.decode("latin-1"))
+            self._is_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._is_file:
+            # Vista sobre el chunk recibido: se copia una sola vez, al buffer de la parte
+            self.sink.feed(memoryview(data)[start:end])
+            return
+        self._data += data[start:end]
+        if len(self._data) > MAX_FIELD_BYTES:
+            raise HTTPException(status_code=400, detail="Campo de formulario demasiado grande")
+
+    def on_part_end(self) -> None:
+        if not self._is_file and self._name:
+            self.fields[self._name] = self._data.decode("utf-8", "replace")
+
+
+class StreamingUploadService:
+    """Subida en streaming: request -> partes multipart en S3, sin disco ni spool."""
+
+    async def upload(
+        self,
+        *,
+        request: Request,
+        user_id: str,
+        user_info: Dict[str, str],
+        db: AsyncSession,
+        correlation_id: str,
+        background_tasks: BackgroundTasks | None = None,
+    ) -> Tuple[Video, str]:
+        req_t0 = time.perf_counter()
+        max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > max_bytes + MAX_FIELD_BYTES:
+            # Rechazo temprano sin leer el body
+            raise HTTPException(status_code=413, detail=f"El archivo supera {settings.MAX_UPLOAD_SIZE_MB} MB.")
+
+        _, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if multipart is None or not boundary:
+            raise HTTPException(status_code=400, detail="Se esperaba multipart/form-data")
+
+        sink = _MultipartToS3(get_buffer_pool(), max_bytes)
+        form = _FormStream(sink)
+        parser = multipart.MultipartParser(
+            boundary,
+            {
+                "on_part_begin": form.on_part_begin,
+                "on_part_data": form.on_part_data,
+                "on_part_end": form.on_part_end,
+                "on_header_field": form.on_header_field,
+                "on_header_value": form.on_header_value,
+                "on_header_end": form.on_header_end,
+                "on_headers_finished": form.on_headers_finished,
+            },
+        )
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                await sink.drain()
+            parser.finalize()
+            if form.filename is None or sink.size == 0:
+                raise HTTPException(status_code=400, detail="Falta el archivo 'video_file'")
+            title = form.fields.get(TITLE_FIELD, "").strip()
+            if not title:
+                raise HTTPException(status_code=400, detail="Falta el campo 'title'")
+            parts = await sink.finish()
+        except BaseException:
+            await sink.abort()
+            raise
+
+        s3_key = sink.key
+        content_sha256 = sink.digest.hexdigest()
+        stream_ms = (time.perf_counter() - req_t0) * 1000.0
+        logger.info(
+            "stream:uploaded corr=%s key=%s size_bytes=%s parts=%s sha256=%s elapsed_ms=%.1f",
+            correlation_id,
+            s3_key,
+            sink.size,
+            len(parts),
+            content_sha256,
+            stream_ms,
+        )
+
+        # Si el contenido ya fue procesado, reutilizar ese original y borrar la copia recién subida
+        saved_rel_path = await uploads_local.LocalUploadService()._find_duplicate_original(db, content_sha256)
+        if saved_rel_path is not None:
+            await uploads_local.ASYNC_STORAGE.delete(s3_key)
+            s3_key = saved_rel_path.lstrip("/")
+            logger.info("stream:dedup:hit corr=%s sha256=%s key=%s", correlation_id, content_sha256, s3_key)
+        else:
+            saved_rel_path = f"/{s3_key}"
+
+        video = Video(
+            user_id=user_id,
+            title=title,
+            original_filename=form.filename,
+            original_path=saved_rel_path,
+            status=VideoStatus.uploaded,
+            file_size_mb=round(sink.size / (1024 * 1024), 2),
+            player_first_name=user_info.get("first_name", ""),
+            player_last_name=user_info.get("last_name", ""),
+            player_city=user_info.get("city", ""),
+            correlation_id=correlation_id,
+            content_sha256=content_sha256,
+        )
+        db.add(video)
+        await db.flush()
+        await db.commit()
+
+        payload = {
+            "video_id": str(video.id),
+            "input_path": f"s3://{settings.S3_BUCKET}/{s3_key}",
+            "correlation_id": correlation_id,
+            "content_sha256": content_sha256,
+        }
+        # El archivo ya está en S3: solo queda publicar la tarea, después de responder
+        if settings.UPLOAD_QUEUE_ENABLED:
+            job = dict(payload, s3_key=s3_key, content_type=sink.content_type, skip_s3_upload=True)
+            await asyncio.to_thread(uploads_local.get_upload_queue().submit, job, reserved=False)
+        elif background_tasks is not None:
+            background_tasks.add_task(_publish, payload)
+        else:
+            await asyncio.to_thread(_publish, payload)
+        logger.info(
+            "stream:done corr=%s video_id=%s elapsed_ms=%.1f",
+            correlation_id,
+            video.id,
+            (time.perf_counter() - req_t0) * 1000.0,
+        )
+        return video, correlation_id
@@ -1,6 +1,7 @@
 """Interfaces para operaciones de consulta de videos."""
 
-from typing import Protocol, List
+from datetime import datetime
+from typing import Protocol, List, Optional, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -17,8 +18,12 @@ class VideoQueryServicePort(Protocol):
         limit: int,
         offset: int,
         db: AsyncSession,
+        after: Optional[Tuple[datetime, str]] = None,
     ) -> List[Video]:
-        """Obtiene los videos del usuario aplicando paginación."""
+        """Obtiene los videos del usuario aplicando paginación.
+
+        `after` = (created_at, id) de la última fila de la página anterior (keyset; reemplaza a offset).
+        """
         ...
 
     async def get_user_video(
@@ -31,6 +36,19 @@ class VideoQueryServicePort(Protocol):
         """Obtiene un video del usuario o lanza HTTPException."""
         ...
 
+    async def wait_for_status_change(
+        self,
+        *,
+        user_id: str,
+        video_id: str,
+        known_status: Optional[str],
+        known_progress: Optional[int],
+        timeout: float,
+        db: AsyncSession,
+    ) -> Video:
+        """Espera hasta `timeout` segundos a que cambie el estado o el avance conocido."""
+        ...
+
     async def delete_user_video(
         self,
         *,
@@ -1,15 +1,53 @@
 """Implementaciones concretas del servicio de videos."""
 
-from typing import List
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models.video import Video, VideoStatus
 from app.services.storage.utils import abs_storage_path
+from app.services.uploads import local as uploads_local
 from app.services.videos.base import VideoQueryServicePort
 
+logger = logging.getLogger("anb.videos")
+
+# Estados en los que el worker ya no va a cambiar el video
+TERMINAL_STATUSES = {VideoStatus.processed.value, VideoStatus.failed.value}
+
+
+def _status_value(status) -> str:
+    return getattr(status, "value", status)
+
+
+def _remove_local_files(*paths: Optional[str]) -> None:
+    """Borra copias locales heredadas (previas a S3), si existen."""
+    for path in paths:
+        if not path:
+            continue
+        try:
+            p = abs_storage_path(path)
+            if p.is_file():
+                p.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+
+def _s3_key(path: Optional[str]) -> Optional[str]:
+    """Key S3 del bucket propio para una ruta persistida ('/uploads/...' o s3://bucket/key)."""
+    if not path:
+        return None
+    if path.startswith("s3://"):
+        bucket, _, key = path.removeprefix("s3://").partition("/")
+        return key if bucket == settings.S3_BUCKET and key else None
+    return path.lstrip("/") or None
+
 
 class VideoQueryService(VideoQueryServicePort):
     """Servicio que consulta y gestiona videos usando SQLAlchemy."""
@@ -21,14 +59,18 @@ class VideoQueryService(VideoQueryServicePort):
         limit: int,
         offset: int,
         db: AsyncSession,
+        after: Optional[Tuple[datetime, str]] = None,
     ) -> List[Video]:
         stmt = (
             select(Video)
             .where(Video.user_id == user_id)
-            .order_by(Video.created_at.desc())
+            .order_by(Video.created_at.desc(), Video.id.desc())
             .limit(limit)
-            .offset(offset)
         )
+        if after is not None:
+            stmt = stmt.where(tuple_(Video.created_at, Video.id) < after)
+        else:
+            stmt = stmt.offset(offset)
         result = await db.execute(stmt)
         return list(result.scalars().all())
 
@@ -48,6 +90,29 @@ class VideoQueryService(VideoQueryServicePort):
             raise HTTPException(status_code=403, detail="El video no pertenece al usuario")
         return video
 
+    async def wait_for_status_change(
+        self,
+        *,
+        user_id: str,
+        video_id: str,
+        known_status: Optional[str],
+        known_progress: Optional[int],
+        timeout: float,
+        db: AsyncSession,
+    ) -> Video:
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            video = await self.get_user_video(user_id=user_id, video_id=video_id, db=db)
+            status = _status_value(video.status)
+            changed = status != known_status or video.progress_percent != known_progress
+            remaining = deadline - time.monotonic()
+            if changed or status in TERMINAL_STATUSES or remaining <= 0:
+                return video
+            # Cerrar la transacción libera la conexión del pool mientras se espera y
+            # expira el objeto, así la siguiente vuelta lee el valor escrito por el worker
+            await db.rollback()
+            await asyncio.sleep(min(settings.VIDEO_STATUS_POLL_INTERVAL_SECONDS, remaining))
+
     async def delete_user_video(
         self,
         *,
@@ -64,19 +129,57 @@ class VideoQueryService(VideoQueryServicePort):
                 detail="El video ya está listo para votación; no puede eliminarse.",
             )
 
+        # Con deduplicación varios videos comparten original (y procesado): solo se
+        # borran los archivos que ningún otro video referencia
+        original_path = await self._unshared_path(video, Video.original_path, db)
+        processed_path = await self._unshared_path(video, Video.processed_path, db)
+
         # Eliminar archivos asociados (si existen). Ignorar errores individuales.
-        try:
-            if video.original_path:
-                p = abs_storage_path(video.original_path)
-                if p.is_file():
-                    p.unlink(missing_ok=True)
-            if video.processed_path:
-                p = abs_storage_path(video.processed_path)
-                if p.is_file():
-                    p.unlink(missing_ok=True)
-        except Exception:
-            pass
+        await asyncio.to_thread(_remove_local_files, original_path, processed_path)
+        await self._delete_s3_objects(video, original_path, processed_path)
 
         await db.delete(video)
         await db.commit()
         return video_id_str
+
+    @staticmethod
+    async def _unshared_path(video: Video, column, db: AsyncSession) -> Optional[str]:
+        """El path de `column` del video, o None si está vacío o otro video también lo usa."""
+        path = getattr(video, column.key)
+        if not path:
+            return None
+        shared = (
+            await db.execute(
+                select(Video.id)
+                .where(column == path)
+                .where(Video.id != video.id)
+                .limit(1)
+            )
+        ).scalar_one_or_none()
+        return None if shared is not None else path
+
+    async def _delete_s3_objects(
+        self,
+        video: Video,
+        original_path: Optional[str],
+        processed_path: Optional[str],
+    ) -> None:
+        """Borra de S3 el original y el procesado sin bloquear el event loop.
+
+        Recibe solo los paths que ningún otro video comparte (deduplicación por contenido).
+        """
+        keys = []
+        original_key = _s3_key(original_path)
+        if original_key:
+            keys.append(original_key)
+        # El procesado solo vive en S3 cuando el worker guardó una URL s3://
+        if (processed_path or "").startswith("s3://"):
+            processed_key = _s3_key(processed_path)
+            if processed_key:
+                keys.append(processed_key)
+        if not keys:
+            return
+        results = await asyncio.gather(*(uploads_local.ASYNC_STORAGE.delete(k) for k in keys), return_exceptions=True)
+        for key, result in zip(keys, results):
+            if isinstance(result, BaseException):
+                logger.warning("videos:delete:s3_failed video_id=%s key=%s err=%s", video.id, key, result)
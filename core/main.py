@@ -1,4 +1,6 @@
 from fastapi import FastAPI
+import asyncio
+import contextlib
 import logging
 from logging import StreamHandler
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,7 +12,13 @@ from prometheus_fastapi_instrumentator import Instrumentator
 from app.core.auth_middleware import AuthMiddleware
 from app.core.metrics import MetricsMiddleware
 from app.config import settings
-from app.database import Base, engine
+from app.database import Base, SessionLocal, engine
+from app.services.public_videos._init_ import get_public_cache, get_vote_buffer
+from app.services.public_videos.cache import listen_for_invalidations
+from app.services.public_videos.jobs import run_periodic
+from app.services.public_videos.rankings import refresh_rankings
+from app.services.public_videos.vote_counts import reconcile_vote_counts
+from app.services.uploads.local import get_upload_queue
 from app.exceptions import (
     APIException,
     api_exception_handler,
@@ -25,9 +33,45 @@ async def lifespan(app: FastAPI):
     """Gestiona el ciclo de vida de la aplicación"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Cola durable de subidas: arranca su pool y reencola lo que quedó pendiente en disco
+    upload_queue = get_upload_queue() if settings.UPLOAD_QUEUE_ENABLED else None
+    if upload_queue is not None:
+        upload_queue.start()
+    # Jobs periódicos en background (no bloquean el arranque)
+    jobs = []
+    # Votos write-behind: recupera lo que quedó en el log local y arranca el flusher
+    vote_buffer = get_vote_buffer() if settings.VOTE_BUFFER_ENABLED else None
+    if vote_buffer is not None:
+        vote_buffer.start()
+        jobs.append(asyncio.create_task(vote_buffer.run()))
+    if settings.VOTE_COUNT_RECONCILE_INTERVAL_SECONDS > 0:
+        jobs.append(asyncio.create_task(run_periodic(
+            "reconcile_votes", reconcile_vote_counts, SessionLocal, settings.VOTE_COUNT_RECONCILE_INTERVAL_SECONDS
+        )))
+    if settings.RANKINGS_REFRESH_INTERVAL_SECONDS > 0:
+        jobs.append(asyncio.create_task(run_periodic(
+            "refresh_rankings", refresh_rankings, SessionLocal, settings.RANKINGS_REFRESH_INTERVAL_SECONDS
+        )))
+    # Invalidación del cache público cuando el worker termina un video (NOTIFY desde el worker)
+    if (
+        settings.PUBLIC_CACHE_ENABLED
+        and settings.PUBLIC_CACHE_NOTIFY_CHANNEL
+        and (settings.DATABASE_URL or "").startswith("postgresql")
+    ):
+        jobs.append(asyncio.create_task(listen_for_invalidations(
+            settings.DATABASE_URL, settings.PUBLIC_CACHE_NOTIFY_CHANNEL, get_public_cache()
+        )))
     try:
         yield
     finally:
+        for job in jobs:
+            job.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await job
+        if vote_buffer is not None:
+            await vote_buffer.close()
+        if upload_queue is not None:
+            upload_queue.stop()
         await engine.dispose()
 
 # Instala un filtro para suprimir logs de acceso de /health y /metrics
@@ -61,6 +105,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.add_middleware(AuthMiddleware)
@@ -0,0 +1,126 @@
+"""Micro-benchmark del overhead por request del stack de middlewares.
+
+Compara, con un cliente ASGI en proceso (httpx.ASGITransport, sin red ni
+servidor), la misma app mínima con:
+
+- ``none``: sin middlewares (línea base);
+- ``base_http``: AuthMiddleware + MetricsMiddleware como BaseHTTPMiddleware
+  (la implementación anterior, reproducida acá como referencia);
+- ``asgi``: los middlewares ASGI puros de ``app.core``.
+
+Uso (desde core/):
+
+    python -m scripts.bench_middleware --requests 5000
+
+Imprime media y p95 por request y el overhead sobre la línea base, para una
+ruta pública (solo exclusión por path) y una autenticada (verificación del token).
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("ACCESS_TOKEN_SECRET_KEY", "bench-secret-key-with-at-least-32-bytes")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import httpx  # noqa: E402
+import jwt  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+from app.core.auth_middleware import EXCLUDED_PATHS, PUBLIC_PREFIXES, AuthMiddleware  # noqa: E402
+from app.core.metrics import REQUEST_HISTOGRAM, MetricsMiddleware  # noqa: E402
+from app.core.tokens import get_token_verifier  # noqa: E402
+
+
+class _BaseHTTPAuth(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        path = request.url.path
+        if path in EXCLUDED_PATHS or path.startswith(PUBLIC_PREFIXES):
+            return await call_next(request)
+        auth_header = request.headers.get("Authorization")
+        if not auth_header or not auth_header.startswith("Bearer "):
+            return JSONResponse(status_code=401, content={"detail": "Missing or invalid Authorization header"})
+        try:
+            request.state.user = get_token_verifier().verify(auth_header[len("Bearer "):])
+        except jwt.InvalidTokenError:
+            return JSONResponse(status_code=401, content={"detail": "Invalid or expired token"})
+        return await call_next(request)
+
+
+class _BaseHTTPMetrics(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        start = time.time()
+        response = await call_next(request)
+        REQUEST_HISTOGRAM.labels(
+            handler=request.url.path, method=request.method, status=str(response.status_code)
+        ).observe(time.time() - start)
+        return response
+
+
+def _build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/public/videos")
+    async def public_videos():
+        return [{"video_id": str(i), "votes": i} for i in range(20)]
+
+    @app.get("/videos")
+    async def my_videos(request: Request):
+        return [{"video_id": "1", "user": getattr(request.state, "user", None) is not None}]
+
+    if stack == "base_http":
+        app.add_middleware(_BaseHTTPAuth)
+        app.add_middleware(_BaseHTTPMetrics)
+    elif stack == "asgi":
+        app.add_middleware(AuthMiddleware)
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def _measure(app, path: str, headers: dict, requests: int, warmup: int) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(warmup):
+            (await client.get(path, headers=headers)).raise_for_status()
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            samples.append(time.perf_counter() - start)
+            response.raise_for_status()
+    return samples
+
+
+def _p95(samples: list[float]) -> float:
+    return statistics.quantiles(samples, n=20)[-1]
+
+
+async def main(requests: int, warmup: int) -> None:
+    now = int(time.time())
+    token = jwt.encode(
+        {"sub": "bench", "user_id": "bench", "iat": now, "exp": now + 3600},
+        os.environ["ACCESS_TOKEN_SECRET_KEY"],
+        algorithm=os.environ["ALGORITHM"],
+    )
+    routes = [("/public/videos", {}), ("/videos", {"Authorization": f"Bearer {token}"})]
+    for path, headers in routes:
+        print(f"\n{path} ({requests} requests)")
+        print(f"{'stack':<10} {'mean_us':>9} {'p95_us':>9} {'overhead_us':>12}")
+        baseline = None
+        for stack in ("none", "base_http", "asgi"):
+            samples = await _measure(_build_app(stack), path, headers, requests, warmup)
+            mean = statistics.fmean(samples)
+            baseline = mean if baseline is None else baseline
+            print(f"{stack:<10} {mean * 1e6:>9.1f} {_p95(samples) * 1e6:>9.1f} {(mean - baseline) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.warmup))
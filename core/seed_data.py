@@ -14,6 +14,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from app.database import get_session, engine, Base, SessionLocal
 from app.models.video import Video, VideoStatus
 from app.models.vote import Vote
+from app.services.public_videos.vote_counts import reconcile_vote_counts
 
 logger = logging.getLogger(__name__)
 
@@ -154,6 +155,8 @@ async def seed_videos():
             session.add(vote)
 
         await session.commit()
+        # Los votos se insertaron directo: recalcular el contador desnormalizado
+        await reconcile_vote_counts(session)
 
         logger.info("  ✅ %s votos creados", len(votes_data))
 
@@ -41,6 +41,7 @@ if "prometheus_client" not in sys.modules:
     sys.modules["prometheus_client"] = types.SimpleNamespace(Histogram=_StubHistogram)
 
 from main import app
+from app.core.tokens import get_token_verifier
 
 sys.path.append(str(Path(__file__).parent.parent))
 
@@ -65,10 +66,12 @@ def bypass_jwt_verify(monkeypatch):
     devolvemos claims sin validar firma/audience/issuer.
     Los tests que NECESITAN error ya hacen su propio patch.
     """
-    def _fake_decode(token, key, algorithms=None, audience=None, issuer=None, options=None):
+    def _fake_decode(token):
         # jose permite leer claims sin verificar:
         return jwt.get_unverified_claims(token)
-    monkeypatch.setattr("app.core.auth_middleware.jwt.decode", _fake_decode)
+    monkeypatch.setattr("app.core.tokens._decode", _fake_decode)
+    # El cache de tokens verificados es global: cada test arranca vacío
+    get_token_verifier().clear()
 
 # ------------------ FIXTURE make_token ------------------
 @pytest.fixture
@@ -1,6 +1,7 @@
 # tests/test_api_videos.py
 import io
 import uuid
+from datetime import datetime
 
 from fastapi import HTTPException, status
 
@@ -48,6 +49,10 @@ class TestVideoEndpoints:
                 raise self.get_exception
             return self.get_result
 
+        async def wait_for_status_change(self, **kwargs):
+            self.get_calls.append(kwargs)
+            return self.get_result
+
         async def delete_user_video(self, **kwargs):
             self.delete_calls.append(kwargs)
             if self.delete_exception:
@@ -101,6 +106,48 @@ class TestVideoEndpoints:
         assert resp.json()["detail"] == "Formato no permitido"
         client.app.dependency_overrides.pop(videos_mod.get_session, None)
 
+    def test_direct_upload_initiate_and_complete(self, client, monkeypatch, make_token):
+        """POST /api/videos/upload/initiate y /upload/complete delegan en el servicio directo."""
+        calls = {}
+
+        class _StubDirect:
+            async def initiate(self, **kwargs):
+                calls["initiate"] = kwargs
+                return {
+                    "upload_token": "tok",
+                    "part_size": 8,
+                    "parts": [{"part_number": 1, "url": "https://s3/part1"}],
+                    "expires_in": 60,
+                }
+
+            async def complete(self, **kwargs):
+                calls["complete"] = kwargs
+                return type("Video", (), {"id": uuid.uuid4()})(), "corr-x"
+
+        monkeypatch.setattr(videos_mod, "get_direct_upload_service", lambda: _StubDirect())
+        client.app.dependency_overrides[videos_mod.get_session] = lambda: object()
+
+        resp = client.post(
+            "/api/videos/upload/initiate",
+            headers=self._auth(make_token),
+            json={"title": "Mi video", "filename": "a.mp4", "size_bytes": 10, "content_type": "video/mp4"},
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+        assert resp.json()["parts"][0]["url"] == "https://s3/part1"
+        assert calls["initiate"]["user_id"] == "test-user-1"
+
+        resp = client.post(
+            "/api/videos/upload/complete",
+            headers=self._auth(make_token),
+            json={"upload_token": "tok", "parts": [{"part_number": 1, "etag": '"abc"'}]},
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+        assert resp.json()["task_id"] == "corr-x"
+        assert resp.headers["Location"].startswith("/api/videos/")
+        assert calls["complete"]["parts"] == [(1, '"abc"')]
+
+        client.app.dependency_overrides.pop(videos_mod.get_session, None)
+
     def test_list_videos_ok(self, client, monkeypatch, make_token):
         """GET /api/videos: lista propia -> 200 y mapea schema."""
         v = type(
@@ -142,6 +189,38 @@ class TestVideoEndpoints:
         client.app.dependency_overrides.pop(videos_mod.get_session, None)
         client.app.dependency_overrides.pop(videos_mod.get_video_query_service, None)
 
+    def test_list_videos_cursor_pagination(self, client, make_token):
+        """GET /api/videos: página llena -> X-Next-Cursor; el cursor vuelve como clave keyset."""
+        created = datetime(2025, 3, 10, 14, 30)
+        v = type(
+            "V",
+            (),
+            {
+                "id": uuid.uuid4(),
+                "title": "Triple",
+                "status": "processed",
+                "created_at": created,
+                "processed_at": None,
+                "processed_path": None,
+            },
+        )()
+        stub_service = self._StubVideoService(list_result=[v])
+        client.app.dependency_overrides[videos_mod.get_session] = lambda: object()
+        client.app.dependency_overrides[videos_mod.get_video_query_service] = lambda: stub_service
+
+        resp = client.get("/api/videos?limit=1", headers=self._auth(make_token))
+        cursor = resp.headers["X-Next-Cursor"]
+        resp = client.get(f"/api/videos?limit=1&cursor={cursor}", headers=self._auth(make_token))
+        bad = client.get("/api/videos?cursor=nope", headers=self._auth(make_token))
+
+        assert resp.status_code == status.HTTP_200_OK
+        assert stub_service.list_calls[0]["after"] is None
+        assert stub_service.list_calls[1]["after"] == (created, str(v.id))
+        assert bad.status_code == status.HTTP_400_BAD_REQUEST
+
+        client.app.dependency_overrides.pop(videos_mod.get_session, None)
+        client.app.dependency_overrides.pop(videos_mod.get_video_query_service, None)
+
     def test_get_video_detail_404(self, client, make_token):
         """GET detail: no existe -> 404."""
         stub_service = self._StubVideoService(
@@ -206,6 +285,37 @@ class TestVideoEndpoints:
         client.app.dependency_overrides.pop(videos_mod.get_session, None)
         client.app.dependency_overrides.pop(videos_mod.get_video_query_service, None)
 
+    def test_wait_video_status_long_poll(self, client, make_token, monkeypatch):
+        """GET status: delega en el servicio con la espera acotada por configuración."""
+        monkeypatch.setattr(videos_mod.settings, "VIDEO_STATUS_MAX_WAIT_SECONDS", 20)
+        vid = type(
+            "V",
+            (),
+            {
+                "id": uuid.uuid4(),
+                "status": "processing",
+                "progress_percent": 42,
+                "processed_at": None,
+                "processed_path": None,
+            },
+        )()
+        stub_service = self._StubVideoService(get_result=vid)
+        client.app.dependency_overrides[videos_mod.get_session] = lambda: object()
+        client.app.dependency_overrides[videos_mod.get_video_query_service] = lambda: stub_service
+
+        resp = client.get(
+            f"/api/videos/{vid.id}/status?wait=60&status=processing&progress=10",
+            headers=self._auth(make_token),
+        )
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.json()["progress_percent"] == 42
+        call = stub_service.get_calls[0]
+        assert call["timeout"] == 20
+        assert call["known_status"] == "processing" and call["known_progress"] == 10
+
+        client.app.dependency_overrides.pop(videos_mod.get_session, None)
+        client.app.dependency_overrides.pop(videos_mod.get_video_query_service, None)
+
     def test_delete_video_ya_procesado(self, client, make_token):
         """DELETE: status=processed -> 400."""
         error = HTTPException(status_code=400, detail="El video ya está listo para votación; no puede eliminarse.")
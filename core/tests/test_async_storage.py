@@ -0,0 +1,158 @@
+"""Tests del puerto async sobre el adapter S3 (executor de I/O, timeout y límite)."""
+
+import asyncio
+import threading
+import uuid
+
+import pytest
+
+from app.models.video import Video, VideoStatus
+from app.services.storage.async_s3 import AsyncS3Storage
+from app.services.uploads import local as uploads_local
+from app.services.videos.local import VideoQueryService
+
+
+class _BlockingStorage:
+    def __init__(self):
+        self.release = threading.Event()
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        self.deleted = []
+
+    def head(self, key):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        self.release.wait(5)
+        with self._lock:
+            self.active -= 1
+        return {"ContentLength": 1}
+
+    def delete(self, key):
+        self.deleted.append(key)
+
+    def presign(self, key, expires_in):
+        return f"https://s3/{key}?expires={expires_in}"
+
+
+@pytest.mark.asyncio
+async def test_limits_concurrent_calls():
+    storage = _BlockingStorage()
+    port = AsyncS3Storage(lambda: storage, max_concurrency=2)
+
+    calls = [asyncio.ensure_future(port.head(f"k{i}")) for i in range(5)]
+    await asyncio.sleep(0.1)
+    assert port.in_flight() == 2
+    storage.release.set()
+    results = await asyncio.gather(*calls)
+
+    assert results == [{"ContentLength": 1}] * 5
+    assert storage.peak == 2
+    assert port.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_timeout_keeps_slot_until_thread_finishes():
+    storage = _BlockingStorage()
+    port = AsyncS3Storage(lambda: storage, max_concurrency=1, timeout=0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await port.head("slow")
+    # boto3 sigue trabajando en el thread: el lugar no se libera todavía
+    assert port.in_flight() == 1
+
+    storage.release.set()
+    assert await port.head("fast") == {"ContentLength": 1}
+    assert port.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_resolves_storage_on_each_call(monkeypatch):
+    storage = _BlockingStorage()
+    monkeypatch.setattr(uploads_local, "STORAGE", storage)
+
+    assert await uploads_local.ASYNC_STORAGE.presign("a.mp4", 60) == "https://s3/a.mp4?expires=60"
+    await uploads_local.ASYNC_STORAGE.delete("a.mp4")
+    assert storage.deleted == ["a.mp4"]
+
+
+class _Result:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+
+class _DeleteSession:
+    def __init__(self, video, shared=None, shared_processed=None):
+        # get_user_video, original compartido, procesado compartido
+        self.results = [video, shared, shared_processed]
+        self.deleted = None
+
+    async def execute(self, stmt):
+        return _Result(self.results.pop(0) if self.results else None)
+
+    async def delete(self, obj):
+        self.deleted = obj
+
+    async def commit(self):
+        pass
+
+
+def _video(**kwargs):
+    return Video(
+        id=uuid.uuid4(),
+        user_id="user",
+        title="Delete",
+        original_filename="del.mp4",
+        status=VideoStatus.failed,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_delete_user_video_removes_s3_objects(monkeypatch):
+    storage = _BlockingStorage()
+    monkeypatch.setattr(uploads_local, "STORAGE", storage)
+    monkeypatch.setattr(uploads_local.settings, "S3_BUCKET", "test-bucket")
+    video = _video(
+        original_path="/uploads/2025/01/01/del.mp4",
+        processed_path="s3://test-bucket/processed/2025/01/01/del.mp4",
+    )
+
+    await VideoQueryService().delete_user_video(user_id="user", video_id=str(video.id), db=_DeleteSession(video))
+
+    assert sorted(storage.deleted) == ["processed/2025/01/01/del.mp4", "uploads/2025/01/01/del.mp4"]
+
+
+@pytest.mark.asyncio
+async def test_delete_user_video_keeps_shared_original(monkeypatch):
+    storage = _BlockingStorage()
+    monkeypatch.setattr(uploads_local, "STORAGE", storage)
+    video = _video(original_path="/uploads/2025/01/01/shared.mp4")
+
+    session = _DeleteSession(video, shared=uuid.uuid4())
+    await VideoQueryService().delete_user_video(user_id="user", video_id=str(video.id), db=session)
+
+    assert storage.deleted == []
+    assert session.deleted is video
+
+
+@pytest.mark.asyncio
+async def test_delete_user_video_keeps_shared_processed(monkeypatch):
+    storage = _BlockingStorage()
+    monkeypatch.setattr(uploads_local, "STORAGE", storage)
+    monkeypatch.setattr(uploads_local.settings, "S3_BUCKET", "test-bucket")
+    # Duplicado sin copia: comparte original y procesado con otro video
+    video = _video(
+        original_path="/uploads/2025/01/01/shared.mp4",
+        processed_path="s3://test-bucket/processed/2025/01/01/shared.mp4",
+    )
+
+    session = _DeleteSession(video, shared=uuid.uuid4(), shared_processed=uuid.uuid4())
+    await VideoQueryService().delete_user_video(user_id="user", video_id=str(video.id), db=session)
+
+    assert storage.deleted == []
+    assert session.deleted is video
@@ -5,7 +5,7 @@ Valida exclusiones, rutas públicas, 401 y propagación de usuario
 
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
-from jose import JWTError
+from jwt import ExpiredSignatureError, InvalidSignatureError
 from tests.conftest import make_token
 
 
@@ -72,20 +72,20 @@ class TestAuthMiddlewareTokenValidation:
         data = response.json()
         assert "Missing or invalid Authorization header" in data["detail"]
     
-    @patch("app.core.auth_middleware.jwt.decode")
+    @patch("app.core.tokens._decode")
     def test_invalid_token_signature(self, mock_decode, client):
         """Token con firma inválida retorna 401"""
-        mock_decode.side_effect = JWTError("Invalid signature")
+        mock_decode.side_effect = InvalidSignatureError("Invalid signature")
         
         response = client.get("/api/videos", headers={"Authorization": "Bearer invalid-token"})
         assert response.status_code == 401
         data = response.json()
         assert "Invalid or expired token" in data["detail"]
     
-    @patch("app.core.auth_middleware.jwt.decode")
+    @patch("app.core.tokens._decode")
     def test_expired_token(self, mock_decode, client):
         """Token expirado retorna 401"""
-        mock_decode.side_effect = JWTError("Signature has expired")
+        mock_decode.side_effect = ExpiredSignatureError("Signature has expired")
         
         response = client.get("/api/videos", headers={"Authorization": "Bearer expired-token"})
         assert response.status_code == 401
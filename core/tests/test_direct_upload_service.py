@@ -0,0 +1,277 @@
+"""Tests unitarios para DirectUploadService (subida multipart directa a S3)."""
+
+import uuid
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+
+from app.models.video import VideoStatus
+from app.services.uploads import direct as uploads_direct
+from app.services.uploads import local as uploads_local
+from app.services.uploads.direct import DirectUploadService
+
+
+class _StubResult:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+
+class _StubSession:
+    def __init__(self, existing=None, dialect="sqlite"):
+        self.existing = existing
+        self.dialect = dialect
+        self.added = None
+        self.deleted = None
+        self.statements = []
+        self.events = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name=self.dialect))
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(str(stmt))
+        return _StubResult(self.existing)
+
+    def add(self, obj):
+        self.added = obj
+
+    async def delete(self, obj):
+        self.deleted = obj
+
+    async def flush(self):
+        if getattr(self.added, "id", None) is None:
+            self.added.id = uuid.uuid4()
+
+    async def commit(self):
+        self.commits += 1
+        self.events.append("commit")
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+class _StubMultipartStorage:
+    def __init__(self, *, content_length=None, complete_error=None):
+        self.content_length = content_length
+        self.complete_error = complete_error
+        self.calls = []
+
+    def create_multipart_upload(self, key, content_type):
+        self.calls.append(("create", key, content_type))
+        return "upload-1"
+
+    def presign_upload_part(self, key, upload_id, part_number, expires_in):
+        return f"https://s3/{key}?uploadId={upload_id}&partNumber={part_number}"
+
+    def complete_multipart_upload(self, key, upload_id, parts):
+        self.calls.append(("complete", key, upload_id, parts))
+        if self.complete_error:
+            raise self.complete_error
+
+    def head(self, key):
+        if self.content_length is None:
+            return None
+        return {"ContentLength": self.content_length}
+
+    def delete(self, key):
+        self.calls.append(("delete", key))
+
+
+class _StubPublisher:
+    def __init__(self, *, should_fail=None):
+        self.should_fail = should_fail
+        self.payload = None
+
+    def publish_video(self, payload):
+        if self.should_fail:
+            raise self.should_fail
+        self.payload = payload
+
+
+class _StubQueue:
+    def __init__(self, db):
+        self.db = db
+        self.jobs = []
+
+    def submit(self, job, *, reserved=True):
+        self.db.events.append("submit")
+        self.jobs.append((job, reserved))
+
+
+MB = 1024 * 1024
+SECRET = "direct-upload-test-secret-0123456789"
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    stub = _StubMultipartStorage(content_length=12 * MB)
+    monkeypatch.setattr(uploads_local, "STORAGE", stub)
+    monkeypatch.setattr(uploads_local.settings, "ALLOWED_VIDEO_FORMATS", {"mp4"})
+    monkeypatch.setattr(uploads_local.settings, "MAX_UPLOAD_SIZE_MB", 100)
+    monkeypatch.setattr(uploads_local.settings, "S3_BUCKET", "test-bucket")
+    monkeypatch.setattr(uploads_local.settings, "DIRECT_UPLOAD_PART_SIZE_MB", 8)
+    monkeypatch.setattr(uploads_local.settings, "DIRECT_UPLOAD_TOKEN_SECRET", SECRET)
+    monkeypatch.setattr(uploads_local.settings, "UPLOAD_QUEUE_ENABLED", False)
+    return stub
+
+
+async def _initiate(size_bytes=12 * MB, user_id="user-1"):
+    return await DirectUploadService().initiate(
+        user_id=user_id,
+        title="Triple",
+        filename="triple.mp4",
+        size_bytes=size_bytes,
+        content_type="video/mp4",
+        correlation_id="corr-d1",
+    )
+
+
+@pytest.mark.asyncio
+async def test_initiate_returns_one_presigned_url_per_part(storage):
+    result = await _initiate()
+
+    assert result["part_size"] == 8 * MB
+    assert [p["part_number"] for p in result["parts"]] == [1, 2]
+    assert "partNumber=2" in result["parts"][1]["url"]
+    claims = jwt.decode(
+        result["upload_token"], SECRET, algorithms=["HS256"], audience=uploads_direct.TOKEN_AUDIENCE
+    )
+    assert claims["sub"] == "user-1"
+    assert claims["upload_id"] == "upload-1"
+    assert claims["key"].endswith(".mp4")
+
+
+@pytest.mark.asyncio
+async def test_initiate_rejects_oversized_and_bad_extension(storage):
+    with pytest.raises(HTTPException) as exc:
+        await _initiate(size_bytes=101 * MB)
+    assert exc.value.status_code == 413
+
+    with pytest.raises(HTTPException) as exc:
+        await DirectUploadService().initiate(
+            user_id="user-1", title="t", filename="clip.avi", size_bytes=MB,
+            content_type="video/avi", correlation_id="c",
+        )
+    assert exc.value.status_code == 400
+    assert storage.calls == []
+
+
+@pytest.mark.asyncio
+async def test_complete_verifies_object_persists_and_publishes(storage, monkeypatch):
+    publisher = _StubPublisher()
+    monkeypatch.setattr(uploads_direct, "QueuePublisher", lambda: publisher)
+    token = (await _initiate())["upload_token"]
+    db = _StubSession()
+
+    video, correlation = await DirectUploadService().complete(
+        user_id="user-1",
+        upload_token=token,
+        parts=[(2, '"b"'), (1, '"a"')],
+        user_info={"first_name": "Ana"},
+        db=db,
+    )
+
+    complete_call = [c for c in storage.calls if c[0] == "complete"][0]
+    assert complete_call[3] == [{"PartNumber": 2, "ETag": '"b"'}, {"PartNumber": 1, "ETag": '"a"'}]
+    assert video.status is VideoStatus.uploaded
+    assert video.file_size_mb == 12.0
+    assert correlation == "corr-d1"
+    assert db.commits == 1
+    assert publisher.payload == {
+        "video_id": str(video.id),
+        "input_path": f"s3://test-bucket/{video.original_path.lstrip('/')}",
+        "correlation_id": "corr-d1",
+    }
+
+
+@pytest.mark.asyncio
+async def test_complete_deletes_object_when_size_differs(storage, monkeypatch):
+    monkeypatch.setattr(uploads_direct, "QueuePublisher", lambda: _StubPublisher())
+    token = (await _initiate(size_bytes=10 * MB))["upload_token"]
+
+    with pytest.raises(HTTPException) as exc:
+        await DirectUploadService().complete(
+            user_id="user-1", upload_token=token, parts=[(1, '"a"')], user_info={}, db=_StubSession(),
+        )
+
+    assert exc.value.status_code == 400
+    assert storage.calls[-1][0] == "delete"
+
+
+@pytest.mark.asyncio
+async def test_complete_rejects_foreign_or_tampered_token(storage):
+    token = (await _initiate())["upload_token"]
+
+    with pytest.raises(HTTPException) as exc:
+        await DirectUploadService().complete(
+            user_id="intruder", upload_token=token, parts=[(1, '"a"')], user_info={}, db=_StubSession(),
+        )
+    assert exc.value.status_code == 403
+
+    with pytest.raises(HTTPException) as exc:
+        await DirectUploadService().complete(
+            user_id="user-1", upload_token=token + "x", parts=[(1, '"a"')], user_info={}, db=_StubSession(),
+        )
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_complete_retry_is_idempotent(storage, monkeypatch):
+    token = (await _initiate())["upload_token"]
+    existing = type("Video", (), {"id": uuid.uuid4(), "correlation_id": "corr-d1"})()
+
+    video, correlation = await DirectUploadService().complete(
+        user_id="user-1", upload_token=token, parts=[(1, '"a"')], user_info={}, db=_StubSession(existing=existing),
+    )
+
+    assert video is existing
+    assert not [c for c in storage.calls if c[0] == "complete"]
+
+
+@pytest.mark.asyncio
+async def test_complete_commits_before_handing_off_to_durable_queue(storage, monkeypatch):
+    monkeypatch.setattr(uploads_local.settings, "UPLOAD_QUEUE_ENABLED", True)
+    monkeypatch.setattr(uploads_direct, "QueuePublisher", lambda: pytest.fail("debe publicar la cola durable"))
+    token = (await _initiate())["upload_token"]
+    db = _StubSession(dialect="postgresql")
+    queue = _StubQueue(db)
+    monkeypatch.setattr(uploads_local, "get_upload_queue", lambda: queue)
+
+    video, _ = await DirectUploadService().complete(
+        user_id="user-1", upload_token=token, parts=[(1, '"a"')], user_info={}, db=db,
+    )
+
+    # El worker nunca ve una tarea cuya fila aún no es visible
+    assert db.events == ["commit", "submit"]
+    (job, reserved), = queue.jobs
+    assert reserved is False
+    assert job["video_id"] == str(video.id) and job["skip_s3_upload"] is True
+    assert job["s3_key"] == video.original_path.lstrip("/") and job["content_type"] == "video/mp4"
+    # Dos complete concurrentes de la misma key se serializan antes del chequeo de idempotencia
+    assert "pg_advisory_xact_lock" in db.statements[0]
+
+
+@pytest.mark.asyncio
+async def test_complete_publish_failure_removes_the_video(storage, monkeypatch):
+    monkeypatch.setattr(uploads_direct, "QueuePublisher", lambda: _StubPublisher(should_fail=RuntimeError("down")))
+    storage.complete_error = ClientError({"Error": {"Code": "NoSuchUpload"}}, "CompleteMultipartUpload")
+    token = (await _initiate())["upload_token"]
+    db = _StubSession()
+
+    with pytest.raises(HTTPException) as exc:
+        await DirectUploadService().complete(
+            user_id="user-1", upload_token=token, parts=[(1, '"a"')], user_info={}, db=db,
+        )
+
+    # NoSuchUpload (ya completado) no es error; el fallo es la publicación. Ningún worker
+    # tomó la tarea, así que se borra el video y un reintento de complete lo vuelve a crear
+    assert exc.value.status_code == 503
+    assert db.deleted is db.added and db.commits == 2
@@ -0,0 +1,116 @@
+"""Paginación keyset de /public/videos y /videos contra SQLite en memoria."""
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql.asyncpg import PGDialect_asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.database import Base
+from app.models.video import Video, VideoStatus
+from app.services.public_videos.local import PublicVideoService
+from app.services.videos.local import VideoQueryService
+
+VOTES = [5, 3, 3, 3, 1, 0, 0]
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    base = datetime(2025, 1, 1)
+    async with async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)() as session:
+        session.add_all(
+            [
+                Video(
+                    user_id="owner",
+                    title=f"v{i}",
+                    original_filename="clip.mp4",
+                    original_path=f"/uploads/{i}.mp4",
+                    status=VideoStatus.processed,
+                    votes_count=votes,
+                    # Empates de created_at para ejercitar el desempate por id
+                    created_at=base + timedelta(minutes=i // 2),
+                )
+                for i, votes in enumerate(VOTES)
+            ]
+        )
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_public_keyset_pages_match_full_order(db):
+    service = PublicVideoService()
+    full = await service.list_videos(city=None, limit=100, offset=0, db=db)
+
+    pages, after = [], None
+    while True:
+        # Con cursor el offset se ignora
+        page = await service.list_videos(city=None, limit=3, offset=0 if after is None else 999, after=after, db=db)
+        pages.extend(page)
+        if len(page) < 3:
+            break
+        after = (page[-1].votes, page[-1].video_id)
+
+    assert [r.votes for r in full] == sorted(VOTES, reverse=True)
+    assert [r.video_id for r in pages] == [r.video_id for r in full]
+
+
+@pytest.mark.asyncio
+async def test_user_keyset_pages_match_full_order(db):
+    service = VideoQueryService()
+    full = await service.list_user_videos(user_id="owner", limit=100, offset=0, db=db)
+
+    pages, after = [], None
+    while True:
+        page = await service.list_user_videos(user_id="owner", limit=2, offset=0, after=after, db=db)
+        pages.extend(page)
+        if len(page) < 2:
+            break
+        after = (page[-1].created_at, page[-1].id)
+
+    assert [v.id for v in pages] == [v.id for v in full]
+    assert full[0].created_at >= full[-1].created_at
+
+
+def test_cursor_roundtrip_and_rejects_foreign_or_garbled():
+    when = datetime(2025, 3, 1, 12, 30)
+    cursor = encode_cursor("my_videos", when, "abc")
+
+    assert decode_cursor(cursor, "my_videos", (datetime.fromisoformat, str)) == (when, "abc")
+    for bad, kind in ((cursor, "public_videos"), ("%%%", "my_videos"), (cursor[:-3], "my_videos")):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(bad, kind, (datetime.fromisoformat, str))
+        assert exc.value.status_code == 400
+
+
+class _CapturingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return MagicMock()
+
+
+@pytest.mark.asyncio
+async def test_keyset_binds_take_column_types_under_asyncpg():
+    # En Postgres no existe uuid < varchar: el id del cursor debe ligarse como UUID
+    session = _CapturingSession()
+    await PublicVideoService().list_videos(city=None, limit=3, offset=0, after=(3, "abc"), db=session)
+    await VideoQueryService().list_user_videos(
+        user_id="owner", limit=3, offset=0, after=(datetime(2025, 1, 1), "abc"), db=session
+    )
+
+    for stmt in session.statements:
+        compiled = stmt.compile(dialect=PGDialect_asyncpg())
+        id_binds = [bind for bind in compiled.binds.values() if bind.value == "abc"]
+        assert id_binds and all(isinstance(bind.type, UUID) for bind in id_binds)
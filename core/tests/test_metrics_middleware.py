@@ -0,0 +1,84 @@
+"""Tests de MetricsMiddleware: labels por template de ruta y cardinalidad acotada."""
+
+import uuid
+from collections import defaultdict
+
+import pytest
+
+from app.core import metrics
+from app.core.metrics import UNMATCHED_ROUTE
+
+
+class _Recorder:
+    """Reemplazo de Histogram/Gauge que guarda las combinaciones de labels (series)."""
+
+    def __init__(self):
+        self.series = set()
+        self.observed = defaultdict(list)
+        self.values = defaultdict(int)
+        self._current = None
+
+    def labels(self, **labels):
+        self._current = tuple(sorted(labels.items()))
+        self.series.add(self._current)
+        return self
+
+    def observe(self, value):
+        self.observed[self._current].append(value)
+
+    def inc(self):
+        self.values[self._current] += 1
+
+    def dec(self):
+        self.values[self._current] -= 1
+
+
+@pytest.fixture
+def recorders(monkeypatch):
+    rec = {name: _Recorder() for name in ("duration", "request_size", "response_size", "in_flight")}
+    monkeypatch.setattr(metrics, "REQUEST_HISTOGRAM", rec["duration"])
+    monkeypatch.setattr(metrics, "REQUEST_SIZE_HISTOGRAM", rec["request_size"])
+    monkeypatch.setattr(metrics, "RESPONSE_SIZE_HISTOGRAM", rec["response_size"])
+    monkeypatch.setattr(metrics, "REQUESTS_IN_FLIGHT", rec["in_flight"])
+    return rec
+
+
+def _handlers(recorder):
+    return {dict(series)["handler"] for series in recorder.series}
+
+
+def test_series_stay_bounded_under_synthetic_traffic(client, recorders):
+    for _ in range(50):
+        video_id = uuid.uuid4()
+        client.get(f"/videos/{video_id}")
+        client.delete(f"/videos/{video_id}")
+        client.get(f"/videos/{video_id}/status")
+        client.post(f"/public/videos/{video_id}/vote")
+        client.get(f"/no-existe/{video_id}")
+
+    assert _handlers(recorders["duration"]) == {
+        "/videos/{video_id}",
+        "/videos/{video_id}/status",
+        "/public/videos/{video_id}/vote",
+        UNMATCHED_ROUTE,
+    }
+    # 250 requests con 50 UUIDs distintos, pero solo un puñado de series
+    assert len(recorders["duration"].series) <= 6
+    assert len(recorders["in_flight"].series) <= 5
+    assert all(v == 0 for v in recorders["in_flight"].values.values())
+
+
+def test_records_request_and_response_sizes(client, recorders):
+    body = b"x" * 1234
+    response = client.post(f"/public/videos/{uuid.uuid4()}/vote", content=body)
+
+    key = (("handler", "/public/videos/{video_id}/vote"), ("method", "POST"))
+    assert recorders["request_size"].observed[key] == [len(body)]
+    status_key = key + (("status", str(response.status_code)),)
+    assert recorders["response_size"].observed[status_key] == [len(response.content)]
+
+
+def test_method_not_allowed_uses_route_template(client, recorders):
+    client.put(f"/public/videos/{uuid.uuid4()}")
+
+    assert _handlers(recorders["duration"]) == {"/public/videos/{video_id}"}
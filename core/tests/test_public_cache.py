@@ -0,0 +1,174 @@
+"""Cache de endpoints públicos: TTL, LRU, single-flight, stale-while-revalidate e invalidación."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.public_videos.base import PublicVideoRecord
+from app.services.public_videos.cache import CachedPublicVideoService, PublicCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Inner:
+    """PublicVideoService falso que cuenta consultas y puede demorarlas."""
+
+    def __init__(self):
+        self.calls = []
+        self.votes = 0
+        self.gate = None
+
+    async def list_videos(self, *, city, limit, offset, db, after=None):
+        self.calls.append(("videos", city, db))
+        if self.gate is not None:
+            await self.gate.wait()
+        return [
+            PublicVideoRecord(
+                video_id="v1", title="T", first_name="A", last_name="B", city=city,
+                processed_path=None, votes=self.votes,
+            )
+        ]
+
+    async def get_video(self, *, video_id, db):
+        self.calls.append(("video", video_id, db))
+        if video_id == "missing":
+            raise HTTPException(status_code=404, detail="no")
+        return PublicVideoRecord(
+            video_id=video_id, title="T", first_name="A", last_name="B", city=None,
+            processed_path=None, votes=self.votes,
+        )
+
+    async def register_vote(self, *, video_id, user_id, db):
+        self.votes += 1
+
+    async def get_rankings(self, *, city, limit, db):
+        self.calls.append(("rankings", city, db))
+        return []
+
+
+@asynccontextmanager
+async def _session():
+    yield "bg-session"
+
+
+def _service(clock=None, **kwargs):
+    params = dict(ttl=5, stale_ttl=30, max_entries=100, clock=clock or _Clock())
+    params.update(kwargs)
+    inner = _Inner()
+    return CachedPublicVideoService(inner, PublicCache(**params), _session), inner
+
+
+@pytest.mark.asyncio
+async def test_hit_within_ttl_and_keys_by_params():
+    service, inner = _service()
+
+    await service.list_videos(city=None, limit=10, offset=0, db="req")
+    await service.list_videos(city=None, limit=10, offset=0, db="req")
+    await service.list_videos(city="Cali", limit=10, offset=0, db="req")
+
+    assert [c[:2] for c in inner.calls] == [("videos", None), ("videos", "Cali")]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_query():
+    service, inner = _service()
+    inner.gate = asyncio.Event()
+
+    pending = [
+        asyncio.ensure_future(service.list_videos(city=None, limit=10, offset=0, db="req")) for _ in range(10)
+    ]
+    await asyncio.sleep(0)
+    inner.gate.set()
+    results = await asyncio.gather(*pending)
+
+    assert len(inner.calls) == 1
+    assert all(r is results[0] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_requester_does_not_fail_coalesced_ones():
+    service, inner = _service()
+    inner.gate = asyncio.Event()
+
+    first = asyncio.ensure_future(service.list_videos(city=None, limit=10, offset=0, db="req"))
+    await asyncio.sleep(0)
+    others = [
+        asyncio.ensure_future(service.list_videos(city=None, limit=10, offset=0, db="req")) for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    first.cancel()  # el cliente que disparó la consulta se desconecta
+    await asyncio.sleep(0)
+    inner.gate.set()
+    results = await asyncio.gather(*others)
+
+    assert first.cancelled()
+    assert len(inner.calls) == 1
+    assert all(r is results[0] for r in results)
+    # El resultado quedó cacheado aunque quien lo pidió ya no estaba
+    assert await service.list_videos(city=None, limit=10, offset=0, db="req") is results[0]
+    assert len(inner.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_served_while_one_background_refresh_runs():
+    clock = _Clock()
+    service, inner = _service(clock)
+    first = await service.list_videos(city=None, limit=10, offset=0, db="req")
+
+    clock.now += 6  # vencido el TTL, dentro de la ventana stale
+    inner.votes = 3
+    stale = await service.list_videos(city=None, limit=10, offset=0, db="req")
+    again = await service.list_videos(city=None, limit=10, offset=0, db="req")
+    assert stale is first and again is first
+    await asyncio.sleep(0.01)
+
+    # Una sola revalidación, con su propia sesión
+    assert inner.calls[1:] == [("videos", None, "bg-session")]
+    fresh = await service.list_videos(city=None, limit=10, offset=0, db="req")
+    assert fresh[0].votes == 3
+
+    clock.now += 100  # fuera de la ventana stale: el request espera la carga
+    await service.list_videos(city=None, limit=10, offset=0, db="req")
+    assert inner.calls[-1] == ("videos", None, "bg-session")
+
+
+@pytest.mark.asyncio
+async def test_vote_drops_detail_and_expires_listings():
+    service, inner = _service()
+    await service.get_video(video_id="v1", db="req")
+    await service.list_videos(city=None, limit=10, offset=0, db="req")
+
+    await service.register_vote(video_id="v1", user_id="u1", db="req")
+
+    detail = await service.get_video(video_id="v1", db="req")
+    assert detail.votes == 1
+    assert inner.calls[-1] == ("video", "v1", "bg-session")
+    # El listado se sirve stale y se revalida en background
+    listing = await service.list_videos(city=None, limit=10, offset=0, db="req")
+    assert listing[0].votes == 0
+    await asyncio.sleep(0.01)
+    assert inner.calls[-1] == ("videos", None, "bg-session")
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached_and_size_is_bounded():
+    service, inner = _service(max_entries=2)
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await service.get_video(video_id="missing", db="req")
+    assert len(inner.calls) == 2
+
+    for city in ("A", "B", "C"):
+        await service.get_rankings(city=city, limit=10, db="req")
+    assert len(service.cache) == 2
+    await service.get_rankings(city="A", limit=10, db="req")  # desalojada (LRU)
+    assert inner.calls[-1] == ("rankings", "A", "bg-session")
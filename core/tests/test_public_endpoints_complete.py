@@ -1,7 +1,8 @@
 import pytest
+from datetime import datetime
 from types import SimpleNamespace
 
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Response, status
 from fastapi.security import HTTPAuthorizationCredentials
 
 import app.api.public as public_mod
@@ -63,6 +64,7 @@ async def test_list_public_videos_maps_response(monkeypatch, stub_service):
 
     fake_db = SimpleNamespace()
     result = await public_mod.list_public_videos(
+        response=Response(),
         db=fake_db,
         limit=10,
         offset=2,
@@ -114,11 +116,12 @@ async def test_get_public_video_returns_schema(monkeypatch, stub_service):
 @pytest.mark.asyncio
 async def test_vote_video_uses_service(monkeypatch, stub_service):
     creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials="token")
-    monkeypatch.setattr(public_mod, "_get_user_id_from_token", lambda c: "user-123")
+    monkeypatch.setattr(public_mod, "_get_user_id_from_token", lambda c, request=None: "user-123")
 
     fake_db = SimpleNamespace()
     response = await public_mod.vote_video(
-        "vid-55",
+        request=SimpleNamespace(),
+        video_id="vid-55",
         db=fake_db,
         creds=creds,
         service=stub_service,
@@ -139,6 +142,7 @@ async def test_get_rankings_returns_positions(stub_service):
 
     fake_db = SimpleNamespace()
     result = await public_mod.get_rankings(
+        response=Response(),
         db=fake_db,
         limit=5,
         service=stub_service,
@@ -150,3 +154,15 @@ async def test_get_rankings_returns_positions(stub_service):
     assert result.rankings[1].position == 2
     assert result.rankings[1].city == ""
     assert stub_service.rank_params["db"] is fake_db
+
+
+@pytest.mark.asyncio
+async def test_get_rankings_sets_last_modified_from_refresh(stub_service):
+    stub_service.rank_response = [
+        RankingRecord(username="John Doe", city="Bogotá", votes=10, refreshed_at=datetime(2025, 3, 1, 12, 0, 5)),
+    ]
+    response = Response()
+
+    await public_mod.get_rankings(db=SimpleNamespace(), limit=5, service=stub_service, response=response)
+
+    assert response.headers["Last-Modified"] == "Sat, 01 Mar 2025 12:00:05 GMT"
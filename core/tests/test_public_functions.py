@@ -21,7 +21,7 @@ class TestPublicFunctions:
         mock_token = "valid.jwt.token"
         mock_payload = {"user_id": "12345", "exp": 1234567890}
         
-        with patch('jwt.decode') as mock_decode, \
+        with patch('app.core.tokens._decode') as mock_decode, \
              patch.dict(os.environ, {'ACCESS_TOKEN_SECRET_KEY': 'test-secret', 'ALGORITHM': 'HS256'}):
             
             mock_decode.return_value = mock_payload
@@ -30,11 +30,7 @@ class TestPublicFunctions:
             result = _get_user_id_from_token(creds)
             
             assert result == "12345"
-            mock_decode.assert_called_once_with(
-                mock_token,
-                'test-secret',
-                algorithms=['HS256']
-            )
+            mock_decode.assert_called_once_with(mock_token)
 
     def test_get_user_id_from_token_no_creds(self):
         """Test que _get_user_id_from_token falla sin credenciales"""
@@ -48,7 +44,7 @@ class TestPublicFunctions:
         """Test que _get_user_id_from_token maneja JWT inválido"""
         mock_token = "invalid.jwt.token"
         
-        with patch('jwt.decode') as mock_decode, \
+        with patch('app.core.tokens._decode') as mock_decode, \
              patch.dict(os.environ, {'ACCESS_TOKEN_SECRET_KEY': 'test-secret', 'ALGORITHM': 'HS256'}):
             
             mock_decode.side_effect = jwt.InvalidTokenError("Invalid token")
@@ -66,7 +62,7 @@ class TestPublicFunctions:
         mock_token = "valid.jwt.token"
         mock_payload = {"exp": 1234567890}  # Sin user_id
         
-        with patch('jwt.decode') as mock_decode, \
+        with patch('app.core.tokens._decode') as mock_decode, \
              patch.dict(os.environ, {'ACCESS_TOKEN_SECRET_KEY': 'test-secret', 'ALGORITHM': 'HS256'}):
             
             mock_decode.return_value = mock_payload
@@ -84,7 +80,7 @@ class TestPublicFunctions:
         mock_token = "valid.jwt.token"
         mock_payload = {"user_id": "", "exp": 1234567890}
         
-        with patch('jwt.decode') as mock_decode, \
+        with patch('app.core.tokens._decode') as mock_decode, \
              patch.dict(os.environ, {'ACCESS_TOKEN_SECRET_KEY': 'test-secret', 'ALGORITHM': 'HS256'}):
             
             mock_decode.return_value = mock_payload
@@ -102,7 +98,7 @@ class TestPublicFunctions:
         mock_token = "valid.jwt.token"
         mock_payload = {"user_id": None, "exp": 1234567890}
         
-        with patch('jwt.decode') as mock_decode, \
+        with patch('app.core.tokens._decode') as mock_decode, \
              patch.dict(os.environ, {'ACCESS_TOKEN_SECRET_KEY': 'test-secret', 'ALGORITHM': 'HS256'}):
             
             mock_decode.return_value = mock_payload
@@ -120,7 +116,7 @@ class TestPublicFunctions:
         mock_token = "valid.jwt.token"
         mock_payload = {"user_id": 12345, "exp": 1234567890}  # user_id como int
         
-        with patch('jwt.decode') as mock_decode, \
+        with patch('app.core.tokens._decode') as mock_decode, \
              patch.dict(os.environ, {'ACCESS_TOKEN_SECRET_KEY': 'test-secret', 'ALGORITHM': 'HS256'}):
             
             mock_decode.return_value = mock_payload
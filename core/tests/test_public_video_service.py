@@ -2,9 +2,10 @@ import pytest
 from types import SimpleNamespace
 
 from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
 
 from app.models.video import VideoStatus
-from app.services.public_videos.local import PublicVideoService
+from app.services.public_videos.local import PublicVideoService, _vote_statement
 
 
 class _Result:
@@ -15,6 +16,9 @@ class _Result:
     def all(self):
         return list(self._rows)
 
+    def one(self):
+        return self._rows[0]
+
     def one_or_none(self):
         if self._rows:
             return self._rows[0]
@@ -85,31 +89,18 @@ async def test_get_video_not_found():
 @pytest.mark.asyncio
 async def test_register_vote_success():
     service = PublicVideoService()
-    video = SimpleNamespace(id="vid-1", status=VideoStatus.processed)
-    session = _SeqSession(
-        [
-            _Result(scalar=video),  # fetch video
-            _Result(scalar=None),  # existing vote
-        ]
-    )
+    session = _SeqSession([_Result(rows=[SimpleNamespace(status=VideoStatus.processed, inserted=1)])])
 
     await service.register_vote(video_id="vid-1", user_id="user-1", db=session)
 
-    assert session.added, "vote should be added to session"
     assert session.commits == 1
+    assert not session._results, "vote should take a single statement"
 
 
 @pytest.mark.asyncio
 async def test_register_vote_duplicate():
     service = PublicVideoService()
-    video = SimpleNamespace(id="vid-1", status=VideoStatus.processed)
-    existing_vote = object()
-    session = _SeqSession(
-        [
-            _Result(scalar=video),
-            _Result(scalar=existing_vote),
-        ]
-    )
+    session = _SeqSession([_Result(rows=[SimpleNamespace(status=VideoStatus.processed, inserted=0)])])
 
     with pytest.raises(HTTPException) as exc:
         await service.register_vote(video_id="vid-1", user_id="user-1", db=session)
@@ -118,12 +109,48 @@ async def test_register_vote_duplicate():
     assert "Ya has votado" in exc.value.detail
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "status, code, detail",
+    [
+        (None, 404, "Video no encontrado"),
+        (VideoStatus.uploaded, 400, "Solo se puede votar por videos procesados"),
+    ],
+)
+async def test_register_vote_rejects_missing_or_unprocessed(status, code, detail):
+    service = PublicVideoService()
+    session = _SeqSession([_Result(rows=[SimpleNamespace(status=status, inserted=0)])])
+
+    with pytest.raises(HTTPException) as exc:
+        await service.register_vote(video_id="vid-1", user_id="user-1", db=session)
+
+    assert exc.value.status_code == code
+    assert exc.value.detail == detail
+
+
+def test_vote_statement_inserts_and_counts_in_one_query():
+    sql = str(
+        _vote_statement("11111111-1111-1111-1111-111111111111", "user-1").compile(
+            dialect=postgresql.dialect()
+        )
+    )
+
+    assert "INSERT INTO votes" in sql
+    assert "ON CONFLICT ON CONSTRAINT unique_user_video_vote DO NOTHING" in sql
+    assert "UPDATE videos SET votes_count=(videos.votes_count +" in sql
+    assert "FROM ins" in sql and "FROM upd" in sql
+
+
 @pytest.mark.asyncio
 async def test_get_rankings_returns_ordered_records():
     service = PublicVideoService()
     rows = [
-        SimpleNamespace(player_first_name="Ana", player_last_name="Lopez", player_city="Cali", total_votes=10),
-        SimpleNamespace(player_first_name="John", player_last_name="Doe", player_city=None, total_votes=8),
+        SimpleNamespace(
+            player_first_name="Ana", player_last_name="Lopez", player_city="Cali", total_votes=10, refreshed_at=None
+        ),
+        SimpleNamespace(
+            player_first_name="John", player_last_name="Doe", player_city=None, total_votes=8, refreshed_at=None
+        ),
     ]
     session = _SeqSession([_Result(rows=rows)])
 
@@ -0,0 +1,70 @@
+"""Ranking materializado: refresh de player_rankings y lectura desde el servicio (SQLite en memoria)."""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models.video import Video, VideoStatus
+from app.services.public_videos import local as public_local
+from app.services.public_videos.local import PublicVideoService
+from app.services.public_videos.rankings import refresh_rankings
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)() as session:
+        session.add_all(
+            [
+                _video("Ana", "Cali", 3),
+                _video("Ana", "Cali", 2),
+                _video("Luis", "Bogotá", 4),
+                _video("Sin", "Bogotá", 0),
+                _video("Pend", "Cali", 9, status=VideoStatus.uploaded),
+            ]
+        )
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+def _video(first_name, city, votes, status=VideoStatus.processed):
+    return Video(
+        user_id=first_name,
+        title=f"{first_name} clip",
+        original_filename="clip.mp4",
+        original_path=f"/uploads/{first_name}-{votes}.mp4",
+        status=status,
+        player_first_name=first_name,
+        player_last_name="Test",
+        player_city=city,
+        votes_count=votes,
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_materializes_processed_players_with_votes(db, monkeypatch):
+    monkeypatch.setattr(public_local.settings, "RANKINGS_REFRESH_INTERVAL_SECONDS", 30)
+
+    assert await refresh_rankings(db) == 2
+    # Un segundo refresh reemplaza las filas en lugar de duplicarlas
+    assert await refresh_rankings(db) == 2
+
+    records = await PublicVideoService().get_rankings(city=None, limit=10, db=db)
+    assert [(r.username, r.votes) for r in records] == [("Ana Test", 5), ("Luis Test", 4)]
+    assert all(r.refreshed_at is not None for r in records)
+
+    bogota = await PublicVideoService().get_rankings(city="Bogotá", limit=10, db=db)
+    assert [r.username for r in bogota] == ["Luis Test"]
+
+
+@pytest.mark.asyncio
+async def test_live_rankings_when_materialization_disabled(db, monkeypatch):
+    monkeypatch.setattr(public_local.settings, "RANKINGS_REFRESH_INTERVAL_SECONDS", 0)
+
+    records = await PublicVideoService().get_rankings(city="Cali", limit=10, db=db)
+
+    assert [(r.username, r.votes, r.refreshed_at) for r in records] == [("Ana Test", 5, None)]
@@ -0,0 +1,189 @@
+"""Tests unitarios para StreamingUploadService (request multipart -> partes S3)."""
+
+import hashlib
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.uploads import local as uploads_local
+from app.services.uploads import streaming as uploads_streaming
+from app.services.uploads.streaming import BufferPool, StreamingUploadService, _BufferReader
+
+BOUNDARY = "xBOUNDARYx"
+
+
+class _StubResult:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+
+class _StubSession:
+    def __init__(self, duplicate_original=None):
+        self.duplicate_original = duplicate_original
+        self.added = None
+        self.commits = 0
+
+    async def execute(self, stmt):
+        return _StubResult(self.duplicate_original)
+
+    def add(self, obj):
+        self.added = obj
+
+    async def flush(self):
+        self.added.id = uuid.uuid4()
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+class _StubStorage:
+    def __init__(self):
+        self.calls = []
+        self.parts = {}
+
+    def create_multipart_upload(self, key, content_type):
+        self.calls.append(("create", key, content_type))
+        return "up-1"
+
+    def upload_part(self, key, upload_id, part_number, body):
+        self.parts[part_number] = body.read()
+        return f'"etag-{part_number}"'
+
+    def complete_multipart_upload(self, key, upload_id, parts):
+        self.calls.append(("complete", key, parts))
+
+    def abort_multipart_upload(self, key, upload_id):
+        self.calls.append(("abort", key))
+
+    def delete(self, key):
+        self.calls.append(("delete", key))
+
+
+class _StreamRequest:
+    """Request mínimo: headers y body entregado en chunks pequeños."""
+
+    def __init__(self, body: bytes, chunk_size: int = 7):
+        self.headers = {
+            "content-type": f"multipart/form-data; boundary={BOUNDARY}",
+            "content-length": str(len(body)),
+        }
+        self._body = body
+        self._chunk_size = chunk_size
+
+    async def stream(self):
+        for i in range(0, len(self._body), self._chunk_size):
+            yield self._body[i:i + self._chunk_size]
+
+
+def _multipart(data: bytes, *, filename="clip.mp4", title="Triple"):
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="video_file"; filename="{filename}"\r\n'
+        "Content-Type: video/mp4\r\n\r\n"
+    ).encode() + data + (
+        f"\r\n--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="title"\r\n\r\n'
+        f"{title}\r\n"
+        f"--{BOUNDARY}--\r\n"
+    ).encode()
+
+
+class _CollectingTasks:
+    def __init__(self):
+        self.tasks = []
+
+    def add_task(self, func, *args, **kwargs):
+        self.tasks.append((func, args, kwargs))
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    stub = _StubStorage()
+    monkeypatch.setattr(uploads_local, "STORAGE", stub)
+    monkeypatch.setattr(uploads_local.settings, "ALLOWED_VIDEO_FORMATS", {"mp4"})
+    monkeypatch.setattr(uploads_local.settings, "MAX_UPLOAD_SIZE_MB", 1)
+    monkeypatch.setattr(uploads_local.settings, "S3_BUCKET", "test-bucket")
+    monkeypatch.setattr(uploads_local.settings, "UPLOAD_QUEUE_ENABLED", False)
+    # Buffers diminutos para forzar varias partes
+    monkeypatch.setattr(uploads_streaming, "_BUFFER_POOL", BufferPool(16, 2))
+    return stub
+
+
+async def _upload(body, db=None, tasks=None, chunk_size=7):
+    return await StreamingUploadService().upload(
+        request=_StreamRequest(body, chunk_size),
+        user_id="user-1",
+        user_info={"first_name": "Ana"},
+        db=db or _StubSession(),
+        correlation_id="corr-s1",
+        background_tasks=tasks or _CollectingTasks(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_splits_parts_and_hashes(storage):
+    data = bytes(range(40))
+    tasks = _CollectingTasks()
+
+    video, correlation = await _upload(_multipart(data), tasks=tasks)
+
+    assert [len(storage.parts[n]) for n in sorted(storage.parts)] == [16, 16, 8]
+    assert b"".join(storage.parts[n] for n in sorted(storage.parts)) == data
+    create = storage.calls[0]
+    assert create[1].endswith(".mp4") and create[2] == "video/mp4"
+    assert storage.calls[-1][2] == [{"PartNumber": n, "ETag": f'"etag-{n}"'} for n in (1, 2, 3)]
+    assert video.title == "Triple"
+    assert video.content_sha256 == hashlib.sha256(data).hexdigest()
+    assert video.original_path == f"/{create[1]}"
+    _, (payload,), _ = tasks.tasks[0]
+    assert payload["input_path"] == f"s3://test-bucket/{create[1]}"
+    # Todos los buffers volvieron al pool
+    assert uploads_streaming._BUFFER_POOL._slots._value == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_aborts_when_exceeding_limit(storage, monkeypatch):
+    monkeypatch.setattr(uploads_streaming, "_BUFFER_POOL", BufferPool(256 * 1024, 2))
+    too_big = b"x" * (1024 * 1024 + 1)
+
+    with pytest.raises(HTTPException) as exc:
+        await _upload(_multipart(too_big), chunk_size=64 * 1024)
+
+    assert exc.value.status_code == 413
+    assert storage.calls[-1][0] == "abort"
+    assert not [c for c in storage.calls if c[0] == "complete"]
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_rejects_extension_before_reading_file(storage):
+    with pytest.raises(HTTPException) as exc:
+        await _upload(_multipart(b"data", filename="clip.avi"))
+
+    assert exc.value.status_code == 400
+    assert storage.calls == []
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_reuses_processed_duplicate(storage):
+    db = _StubSession(duplicate_original="/uploads/2025/01/01/old.mp4")
+
+    video, _ = await _upload(_multipart(b"same-content"), db=db)
+
+    assert video.original_path == "/uploads/2025/01/01/old.mp4"
+    assert storage.calls[-1][0] == "delete"
+
+
+def test_buffer_reader_reads_and_seeks_view():
+    reader = _BufferReader(memoryview(bytearray(b"abcdefgh"))[:5])
+    assert len(reader) == 5
+    assert reader.read() == b"abcde"
+    reader.seek(1)
+    assert reader.read(2) == b"bc"
+    assert reader.seek(0, 2) == 5
@@ -0,0 +1,127 @@
+"""Tests del cache de access tokens verificados (app.core.tokens)."""
+
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+
+from app.core import tokens
+from app.core.tokens import TokenVerifier, request_claims
+
+# conftest reemplaza _decode por uno sin verificación; estos tests usan el real
+_real_decode = tokens._decode
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    calls = []
+
+    def _counting(token):
+        calls.append(token)
+        return _real_decode(token)
+
+    monkeypatch.setattr(tokens, "_decode", _counting)
+    return calls
+
+
+def _token(sub="user-1", ttl=60, secret="test-secret-key-12345"):
+    now = int(time.time())
+    return jwt.encode({"sub": sub, "user_id": sub, "iat": now, "exp": now + ttl}, secret, algorithm="HS256")
+
+
+def test_verify_caches_claims_until_exp(decode_calls):
+    clock = _Clock(time.time())
+    verifier = TokenVerifier(clock=clock)
+    token = _token(ttl=60)
+
+    assert verifier.verify(token)["sub"] == "user-1"
+    assert verifier.verify(token)["sub"] == "user-1"
+    assert len(decode_calls) == 1
+
+    clock.now += 61
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(token)
+    assert len(verifier) == 0
+
+
+def test_invalid_tokens_are_not_cached(decode_calls):
+    verifier = TokenVerifier()
+    forged = _token(secret="other-secret")
+
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidSignatureError):
+            verifier.verify(forged)
+
+    assert len(decode_calls) == 2
+    assert len(verifier) == 0
+
+
+def test_tokens_without_exp_or_iat_are_rejected(decode_calls):
+    now = int(time.time())
+    for claims in ({"sub": "user-1", "exp": now + 60}, {"sub": "user-1", "iat": now}):
+        token = jwt.encode(claims, "test-secret-key-12345", algorithm="HS256")
+        with pytest.raises(jwt.MissingRequiredClaimError):
+            TokenVerifier().verify(token)
+
+
+def test_cache_is_bounded_lru(decode_calls):
+    verifier = TokenVerifier(max_entries=2)
+    first, second, third = (_token(sub=f"user-{i}") for i in range(3))
+
+    verifier.verify(first)
+    verifier.verify(second)
+    verifier.verify(first)  # first pasa a ser el más reciente
+    verifier.verify(third)  # desaloja second
+
+    assert len(verifier) == 2
+    decode_calls.clear()
+    verifier.verify(first)
+    verifier.verify(second)
+    assert decode_calls == [second]
+
+
+def test_request_claims_reuses_middleware_claims(decode_calls):
+    token = _token()
+    request = SimpleNamespace(state=SimpleNamespace(token=token, claims={"sub": "from-middleware"}))
+
+    assert request_claims(request, token) == {"sub": "from-middleware"}
+    assert decode_calls == []
+
+
+def test_request_claims_verifies_and_stores_when_missing(decode_calls):
+    tokens.get_token_verifier().clear()
+    token = _token(sub="voter")
+    request = SimpleNamespace(state=SimpleNamespace())
+
+    assert request_claims(request, token)["user_id"] == "voter"
+    assert request.state.claims["user_id"] == "voter"
+    assert request_claims(None, token)["user_id"] == "voter"
+    assert len(decode_calls) == 1
+
+
+def test_upload_token_is_not_an_access_token(client, monkeypatch):
+    from app.services.uploads import direct
+
+    monkeypatch.setattr(tokens, "_decode", _real_decode)
+    monkeypatch.setattr(direct.settings, "DIRECT_UPLOAD_TOKEN_SECRET", None)
+    now = int(time.time())
+    claims = {"sub": "user-1", "user_id": "user-1", "iat": now, "exp": now + 60}
+
+    upload_token = jwt.encode({**claims, "aud": direct.TOKEN_AUDIENCE}, direct._token_secret(), algorithm="HS256")
+    response = client.get("/api/videos", headers={"Authorization": f"Bearer {upload_token}"})
+    assert response.status_code == 401
+
+    # Aun firmado con la clave de acceso, un token con `aud` no pasa como access token
+    with_aud = jwt.encode({**claims, "aud": direct.TOKEN_AUDIENCE}, "test-secret-key-12345", algorithm="HS256")
+    with pytest.raises(jwt.InvalidAudienceError):
+        tokens.get_token_verifier().verify(with_aud)
+    assert direct._token_secret() != "test-secret-key-12345"
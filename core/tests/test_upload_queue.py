@@ -0,0 +1,103 @@
+"""Tests de la cola durable de subidas (app/services/uploads/handoff.py)."""
+
+import json
+import time
+
+from app.services.uploads.handoff import FAILED_DIR, UploadHandoffQueue
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_reservations_bound_the_queue(tmp_path):
+    queue = UploadHandoffQueue(str(tmp_path), lambda job: None, max_items=2)
+
+    assert queue.try_reserve()
+    queue.submit({"video_id": "v1"})
+    assert queue.try_reserve()
+    assert not queue.try_reserve()
+
+    queue.cancel_reservation()
+    assert queue.try_reserve()
+    assert queue.depth() == 1
+
+
+def test_start_replays_pending_jobs_from_disk(tmp_path):
+    # Un proceso anterior dejó un trabajo sin procesar
+    writer = UploadHandoffQueue(str(tmp_path), lambda job: None)
+    writer.submit({"video_id": "v-pending"}, reserved=False)
+
+    processed = []
+    queue = UploadHandoffQueue(str(tmp_path), lambda job: processed.append(job["video_id"]), workers=1)
+    try:
+        assert queue.start() == 1
+        assert _wait_for(lambda: processed == ["v-pending"] and queue.depth() == 0)
+    finally:
+        queue.stop()
+    assert list(tmp_path.glob("*.job.json")) == []
+
+
+def test_failures_are_retried_then_moved_aside(tmp_path):
+    def _fail(job):
+        raise RuntimeError("s3 down")
+
+    queue = UploadHandoffQueue(str(tmp_path), _fail, max_attempts=2)
+    path = queue.submit({"video_id": "v1"}, reserved=False)
+
+    queue._run(path)
+    job = json.loads(path.read_text())
+    assert job["attempts"] == 1 and job["last_error"] == "s3 down"
+    assert queue.depth() == 1
+
+    queue._run(path)
+    assert not path.exists()
+    assert (tmp_path / FAILED_DIR / path.name).exists()
+    assert queue.depth() == 0
+
+
+def test_exhausted_job_quarantines_its_data_and_notifies(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    tmp_file = data / "upload.mp4"
+    tmp_file.write_bytes(b"video")
+    failed_jobs = []
+
+    def _fail(job):
+        raise RuntimeError("s3 down")
+
+    queue = UploadHandoffQueue(str(tmp_path), _fail, max_attempts=1, on_failed=failed_jobs.append)
+    path = queue.submit({"video_id": "v1", "tmp_path": str(tmp_file)}, reserved=False)
+
+    queue._run(path)
+
+    quarantined = tmp_path / FAILED_DIR / "upload.mp4"
+    assert not tmp_file.exists() and quarantined.read_bytes() == b"video"
+    assert [job["video_id"] for job in failed_jobs] == ["v1"]
+    assert json.loads((tmp_path / FAILED_DIR / path.name).read_text())["tmp_path"] == str(quarantined)
+
+
+def test_failing_hook_does_not_break_the_worker(tmp_path):
+    def _fail(job):
+        raise RuntimeError("s3 down")
+
+    def _hook(job):
+        raise RuntimeError("db down")
+
+    queue = UploadHandoffQueue(str(tmp_path), _fail, max_attempts=1, on_failed=_hook)
+    path = queue.submit({"video_id": "v1"}, reserved=False)
+
+    queue._run(path)
+    assert (tmp_path / FAILED_DIR / path.name).exists() and queue.depth() == 0
+
+
+def test_oldest_age_tracks_pending_jobs(tmp_path):
+    queue = UploadHandoffQueue(str(tmp_path), lambda job: None)
+    assert queue.oldest_age() == 0.0
+    queue.submit({"video_id": "v1", "enqueued_at": time.time() - 30}, reserved=False)
+    assert queue.oldest_age() >= 30
@@ -1,5 +1,6 @@
 """Tests unitarios para LocalUploadService."""
 
+import hashlib
 import io
 import uuid
 
@@ -11,8 +12,18 @@ from app.services.uploads import local as uploads_local
 from app.services.uploads.local import LocalUploadService
 
 
+class _StubResult:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+
 class _StubSession:
-    def __init__(self):
+    def __init__(self, duplicate_original=None):
+        self.duplicate_original = duplicate_original
+        self.executed = []
         self.added = None
         self.commits = 0
         self.refresh_calls = 0
@@ -22,6 +33,10 @@ class _StubSession:
     def add(self, obj):
         self.added = obj
 
+    async def execute(self, stmt):
+        self.executed.append(stmt)
+        return _StubResult(self.duplicate_original)
+
     async def commit(self):
         self.commits += 1
 
@@ -98,6 +113,8 @@ def service(monkeypatch):
     # S3 config de pruebas (no se usa realmente porque se parchea STORAGE)
     monkeypatch.setattr(uploads_local.settings, "S3_BUCKET", "test-bucket")
     monkeypatch.setattr(uploads_local.settings, "S3_PREFIX", "uploads")
+    # Estos tests cubren el pipeline con BackgroundTasks; la cola durable tiene sus propios tests
+    monkeypatch.setattr(uploads_local.settings, "UPLOAD_QUEUE_ENABLED", False)
     return LocalUploadService()
 
 
@@ -140,8 +157,59 @@ async def test_upload_service_happy_path(service, monkeypatch):
         "video_id": str(video.id),
         "input_path": f"s3://{uploads_local.settings.S3_BUCKET}/{video.original_path.lstrip('/')}",
         "correlation_id": correlation,
+        "content_sha256": hashlib.sha256(b"video").hexdigest(),
     }
     assert publisher.closed is True
+    assert video.content_sha256 == hashlib.sha256(b"video").hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_upload_service_reuses_original_for_duplicate_content(service, monkeypatch):
+    storage = _StubStorage()
+    publisher = _StubPublisher()
+    monkeypatch.setattr(uploads_local, "STORAGE", storage)
+    monkeypatch.setattr(uploads_local, "QueuePublisher", lambda: publisher)
+
+    existing = "/uploads/2025/01/01/abc-def.mp4"
+    db = _StubSession(duplicate_original=existing)
+
+    video, correlation = await service.upload(
+        user_id="user-123",
+        title="Repetido",
+        upload_file=_make_file(),
+        user_info={},
+        db=db,
+        correlation_id="test-corr-dup",
+        background_tasks=_ImmediateBackgroundTasks(),
+    )
+
+    # No se vuelve a subir a S3: el Video apunta al original existente
+    assert storage.calls == []
+    assert video.original_path == existing
+    assert publisher.payload["input_path"] == f"s3://{uploads_local.settings.S3_BUCKET}/uploads/2025/01/01/abc-def.mp4"
+    assert publisher.payload["content_sha256"] == video.content_sha256
+
+
+@pytest.mark.asyncio
+async def test_upload_service_dedup_disabled_skips_lookup(service, monkeypatch):
+    storage = _StubStorage()
+    monkeypatch.setattr(uploads_local, "STORAGE", storage)
+    monkeypatch.setattr(uploads_local, "QueuePublisher", lambda: _StubPublisher())
+    monkeypatch.setattr(uploads_local.settings, "UPLOAD_DEDUP_ENABLED", False)
+
+    db = _StubSession(duplicate_original="/uploads/x.mp4")
+    await service.upload(
+        user_id="user-123",
+        title="Sin dedup",
+        upload_file=_make_file(),
+        user_info={},
+        db=db,
+        correlation_id="test-corr-nodup",
+        background_tasks=_ImmediateBackgroundTasks(),
+    )
+
+    assert db.executed == []
+    assert len(storage.calls) == 1
 
 
 @pytest.mark.asyncio
@@ -215,4 +283,103 @@ async def test_upload_service_bad_extension(service, monkeypatch):
 
     assert exc.value.status_code == 400
     assert "Formato no permitido" in exc.value.detail
-    assert storage.calls == []
\ No newline at end of file
+    assert storage.calls == []
+
+@pytest.fixture
+def queued_service(service, monkeypatch, tmp_path):
+    monkeypatch.setattr(uploads_local.settings, "UPLOAD_QUEUE_ENABLED", True)
+    queue = uploads_local.UploadHandoffQueue(
+        str(tmp_path / "queue"), uploads_local._deliver_queued_upload, max_items=1
+    )
+    monkeypatch.setattr(uploads_local, "_UPLOAD_QUEUE", queue)
+    return service, queue
+
+
+@pytest.mark.asyncio
+async def test_upload_service_hands_off_to_durable_queue(queued_service, monkeypatch):
+    service, queue = queued_service
+    storage = _StubStorage()
+    publisher = _StubPublisher()
+    monkeypatch.setattr(uploads_local, "STORAGE", storage)
+    monkeypatch.setattr(uploads_local, "QueuePublisher", lambda: publisher)
+
+    video, _ = await service.upload(
+        user_id="user-123",
+        title="En cola",
+        upload_file=_make_file(),
+        user_info={},
+        db=_StubSession(),
+        correlation_id="test-corr-q1",
+    )
+
+    # Persistido en disco y pendiente, sin tocar S3 durante el request
+    jobs = list(queue.directory.glob("*.job.json"))
+    assert len(jobs) == 1 and queue.depth() == 1
+    assert storage.calls == []
+
+    queue._run(jobs[0])
+
+    assert storage.calls[0][0] == "save_with_key"
+    assert publisher.payload["video_id"] == str(video.id)
+    assert queue.depth() == 0
+    assert list(queue.directory.glob("*.job.json")) == []
+    assert list(queue.data_dir().iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_upload_service_rejects_with_retry_after_when_queue_full(queued_service, monkeypatch):
+    service, queue = queued_service
+    monkeypatch.setattr(uploads_local, "STORAGE", _StubStorage())
+    assert queue.try_reserve()  # ocupa el único lugar
+
+    with pytest.raises(HTTPException) as exc:
+        await service.upload(
+            user_id="user-123",
+            title="Llena",
+            upload_file=_make_file(),
+            user_info={},
+            db=_StubSession(),
+            correlation_id="test-corr-q2",
+        )
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == str(uploads_local.settings.UPLOAD_QUEUE_RETRY_AFTER_SECONDS)
+    assert list(queue.data_dir().iterdir()) == []
+
+
+def test_queue_failure_hook_marks_video_failed(monkeypatch, tmp_path):
+    import asyncio
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.database import Base
+    from app.models.video import Video
+
+    url = f"sqlite+aiosqlite:///{tmp_path / 'hook.db'}"
+    monkeypatch.setattr(uploads_local.settings, "DATABASE_URL", url)
+
+    async def _seed():
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            for video_id, status in ((up, VideoStatus.uploaded), (done, VideoStatus.processed)):
+                await conn.execute(Video.__table__.insert().values(
+                    id=video_id, user_id="u1", title="t", original_filename="a.mp4",
+                    original_path=f"/{video_id}.mp4", status=status,
+                ))
+        await engine.dispose()
+
+    async def _statuses():
+        engine = create_async_engine(url)
+        async with engine.connect() as conn:
+            rows = (await conn.execute(Video.__table__.select())).all()
+        await engine.dispose()
+        return {row.id: row.status for row in rows}
+
+    up, done = str(uuid.uuid4()), str(uuid.uuid4())
+    asyncio.run(_seed())
+    # Corre en un thread de la cola, sin event loop propio
+    uploads_local._fail_queued_upload({"video_id": up, "correlation_id": "c"})
+    uploads_local._fail_queued_upload({"video_id": done, "correlation_id": "c"})
+
+    assert asyncio.run(_statuses()) == {up: VideoStatus.failed, done: VideoStatus.processed}
@@ -52,6 +52,15 @@ class _DummySession:
         self.committed = True
 
 
+class _UnsharedDeleteSession(_DummySession):
+    """Primera consulta: el video; las siguientes (¿otro video usa el path?): ninguno."""
+
+    async def execute(self, stmt):
+        result = await super().execute(stmt)
+        self.get_result = None
+        return result
+
+
 @pytest.mark.asyncio
 async def test_list_user_videos_returns_videos():
     service = VideoQueryService()
@@ -146,7 +155,7 @@ async def test_delete_user_video_removes_files(tmp_path, monkeypatch):
     orig.write_bytes(b"x")
     proc.write_bytes(b"y")
 
-    session = _DummySession(get_result=video)
+    session = _UnsharedDeleteSession(get_result=video)
 
     deleted_id = await service.delete_user_video(user_id="user", video_id=str(video.id), db=session)
 
@@ -155,3 +164,67 @@ async def test_delete_user_video_removes_files(tmp_path, monkeypatch):
     assert session.committed is True
     assert not orig.exists()
     assert not proc.exists()
+
+
+class _PollingSession(_DummySession):
+    """Sesión que devuelve una secuencia de estados (uno por consulta)."""
+
+    def __init__(self, video, states):
+        super().__init__(get_result=video)
+        self.video = video
+        self.states = list(states)
+        self.rollbacks = 0
+
+    async def execute(self, stmt):
+        if self.states:
+            self.video.status, self.video.progress_percent = self.states.pop(0)
+        return await super().execute(stmt)
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def _polled_video():
+    return Video(
+        id=uuid.uuid4(),
+        user_id="user",
+        title="Poll",
+        original_filename="poll.mp4",
+        original_path="/uploads/poll.mp4",
+        status=VideoStatus.uploaded,
+    )
+
+
+@pytest.mark.asyncio
+async def test_wait_for_status_change_returns_on_progress(monkeypatch):
+    monkeypatch.setattr("app.services.videos.local.settings.VIDEO_STATUS_POLL_INTERVAL_SECONDS", 0)
+    service = VideoQueryService()
+    session = _PollingSession(
+        _polled_video(),
+        [(VideoStatus.processing, 10), (VideoStatus.processing, 10), (VideoStatus.processing, 55)],
+    )
+
+    video = await service.wait_for_status_change(
+        user_id="user", video_id="v", known_status="processing", known_progress=10, timeout=5, db=session,
+    )
+
+    assert video.progress_percent == 55
+    assert session.rollbacks == 2
+
+
+@pytest.mark.asyncio
+async def test_wait_for_status_change_times_out_or_stops_on_terminal(monkeypatch):
+    monkeypatch.setattr("app.services.videos.local.settings.VIDEO_STATUS_POLL_INTERVAL_SECONDS", 0)
+    service = VideoQueryService()
+
+    session = _PollingSession(_polled_video(), [(VideoStatus.processing, 10)])
+    video = await service.wait_for_status_change(
+        user_id="user", video_id="v", known_status="processing", known_progress=10, timeout=0, db=session,
+    )
+    assert video.progress_percent == 10 and session.rollbacks == 0
+
+    session = _PollingSession(_polled_video(), [(VideoStatus.processed, 100)])
+    video = await service.wait_for_status_change(
+        user_id="user", video_id="v", known_status="processed", known_progress=100, timeout=5, db=session,
+    )
+    assert video.status == VideoStatus.processed and session.rollbacks == 0
@@ -24,7 +24,7 @@ class TestVideosFunctions:
         mock_token = "valid.jwt.token"
         mock_payload = {"sub": "user123", "exp": 1234567890, "iat": 1234567800}
 
-        with patch("jwt.decode") as mock_decode, patch.dict(
+        with patch("app.core.tokens._decode") as mock_decode, patch.dict(
             os.environ,
             {
                 "ACCESS_TOKEN_SECRET_KEY": "test-secret",
@@ -39,21 +39,14 @@ class TestVideosFunctions:
             result = _current_user_id(creds)
 
             assert result == "user123"
-            mock_decode.assert_called_once_with(
-                mock_token,
-                "test-secret",
-                algorithms=["HS256"],
-                options={"require": ["exp", "iat"], "verify_aud": False, "verify_iss": False},
-                audience="anb-api",
-                issuer="anb-auth",
-            )
+            mock_decode.assert_called_once_with(mock_token)
 
     def test_current_user_id_no_sub(self):
         """_current_user_id falla cuando el payload no trae sub"""
         mock_token = "valid.jwt.token"
         mock_payload = {"exp": 1234567890, "iat": 1234567800}
 
-        with patch("jwt.decode") as mock_decode, patch.dict(
+        with patch("app.core.tokens._decode") as mock_decode, patch.dict(
             os.environ,
             {
                 "ACCESS_TOKEN_SECRET_KEY": "test-secret",
@@ -76,7 +69,7 @@ class TestVideosFunctions:
         """_current_user_id propaga expiración de token"""
         mock_token = "expired.jwt.token"
 
-        with patch("jwt.decode") as mock_decode, patch.dict(
+        with patch("app.core.tokens._decode") as mock_decode, patch.dict(
             os.environ,
             {
                 "ACCESS_TOKEN_SECRET_KEY": "test-secret",
@@ -99,7 +92,7 @@ class TestVideosFunctions:
         """_current_user_id retorna 401 si el token es inválido"""
         mock_token = "invalid.jwt.token"
 
-        with patch("jwt.decode") as mock_decode, patch.dict(
+        with patch("app.core.tokens._decode") as mock_decode, patch.dict(
             os.environ,
             {
                 "ACCESS_TOKEN_SECRET_KEY": "test-secret",
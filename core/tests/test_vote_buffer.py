@@ -0,0 +1,296 @@
+"""Tests del buffer de votos write-behind (log local + flush por lotes)."""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app.models.video import VideoStatus
+from app.services.public_videos import vote_buffer as vb
+from app.services.public_videos.vote_buffer import BufferedVoteService, VoteBuffer
+
+
+class _FlushResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return list(self._rows)
+
+
+class _FlushSession:
+    """Sesión del flusher: cada execute recibe las filas del lote (vía _flush_statement parchado)."""
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+    async def execute(self, rows):
+        if self.owner.gate is not None:
+            self.owner.entered.set()
+            await self.owner.gate.wait()
+        if self.owner.fail:
+            raise RuntimeError("db down")
+        if any(r["user_id"] in self.owner.poison for r in rows):
+            raise IntegrityError("INSERT", {}, Exception("violates check constraint"))
+        self.owner.batches.append(rows)
+        # El JOIN con videos descarta los votos de videos borrados
+        inserted = [
+            r for r in rows
+            if (r["user_id"], str(r["video_id"])) not in self.owner.existing
+            and r["video_id"] not in self.owner.deleted
+        ]
+        counts = {}
+        for r in inserted:
+            counts[r["video_id"]] = counts.get(r["video_id"], 0) + 1
+        return _FlushResult(list(counts.items()))
+
+    async def commit(self):
+        self.owner.commits += 1
+
+
+class _FlushDB:
+    def __init__(self):
+        self.batches = []
+        self.commits = 0
+        self.existing = set()
+        self.deleted = set()
+        self.poison = set()
+        self.fail = False
+        self.gate = None
+        self.entered = asyncio.Event()
+
+    def __call__(self):
+        return _FlushSession(self)
+
+
+@pytest.fixture
+def flush_db(monkeypatch):
+    monkeypatch.setattr(vb, "_flush_statement", lambda rows: rows)
+    return _FlushDB()
+
+
+def _log_lines(directory):
+    lines = []
+    for path in sorted(directory.glob(f"*{vb.LOG_SUFFIX}")):
+        lines.extend(json.loads(line) for line in path.read_text().splitlines())
+    return lines
+
+
+@pytest.mark.asyncio
+async def test_submit_persists_and_deduplicates(tmp_path, flush_db):
+    buffer = VoteBuffer(str(tmp_path), flush_db)
+    buffer.start()
+
+    results = await asyncio.gather(
+        buffer.submit("u1", "v1"),
+        buffer.submit("u2", "v1"),
+        buffer.submit("u1", "v1"),
+    )
+
+    assert results == [True, True, False]
+    assert len(buffer) == 2
+    assert buffer.contains("u1", "v1")
+    assert [(r["user_id"], r["video_id"]) for r in _log_lines(tmp_path)] == [("u1", "v1"), ("u2", "v1")]
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_batches_counts_and_removes_segments(tmp_path, flush_db):
+    flushed = []
+    buffer = VoteBuffer(str(tmp_path), flush_db, max_batch=2, on_flushed=flushed.extend)
+    buffer.start()
+    for user in ("u1", "u2", "u3"):
+        await buffer.submit(user, "v1")
+    await buffer.submit("u1", "v2")
+    flush_db.existing.add(("u3", "v1"))  # otra réplica ya lo insertó
+
+    inserted = await buffer.flush()
+
+    assert inserted == 3
+    assert [len(b) for b in flush_db.batches] == [2, 2]
+    assert flush_db.commits == 1
+    assert flushed == ["v1", "v2"]
+    assert len(buffer) == 0 and not buffer.contains("u1", "v1")
+    assert _log_lines(tmp_path) == []
+    assert await buffer.flush() == 0
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_votes_for_retry(tmp_path, flush_db):
+    buffer = VoteBuffer(str(tmp_path), flush_db)
+    buffer.start()
+    await buffer.submit("u1", "v1")
+    flush_db.fail = True
+
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+
+    assert buffer.contains("u1", "v1")
+    assert len(_log_lines(tmp_path)) == 1
+    await buffer.submit("u2", "v1")
+
+    flush_db.fail = False
+    assert await buffer.flush() == 2
+    assert _log_lines(tmp_path) == []
+    await buffer.close()
+
+
+def test_flush_statement_joins_processed_videos():
+    now = datetime.utcnow()
+    rows = [{"id": "a", "user_id": "u1", "video_id": "v1", "created_at": now, "updated_at": now}]
+
+    sql = str(vb._flush_statement(rows).compile(dialect=postgresql.dialect()))
+
+    assert "FROM (VALUES" in sql
+    assert "JOIN videos ON videos.id = CAST(v.video_id AS UUID) AND videos.status = " in sql
+    assert "ON CONFLICT DO NOTHING" in sql
+
+
+@pytest.mark.asyncio
+async def test_vote_for_deleted_video_does_not_block_flush(tmp_path, flush_db):
+    buffer = VoteBuffer(str(tmp_path), flush_db)
+    buffer.start()
+    await buffer.submit("u1", "v-deleted")
+    await buffer.submit("u2", "v1")
+    flush_db.deleted.add("v-deleted")  # el dueño lo borró antes del flush
+
+    assert await buffer.flush() == 1
+    assert len(buffer) == 0
+    assert _log_lines(tmp_path) == []
+
+    await buffer.submit("u3", "v1")
+    assert await buffer.flush() == 1
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_rejected_votes_are_quarantined_not_retried(tmp_path, flush_db):
+    flushed = []
+    buffer = VoteBuffer(str(tmp_path), flush_db, on_flushed=flushed.extend)
+    buffer.start()
+    await buffer.submit("bad", "v1")
+    await buffer.submit("u1", "v1")
+    await buffer.submit("u2", "v2")
+    flush_db.poison.add("bad")
+
+    assert await buffer.flush() == 2
+    assert flushed == ["v1", "v2"]
+    assert len(buffer) == 0
+    assert _log_lines(tmp_path) == []
+    failed = [json.loads(line) for p in tmp_path.glob(f"*{vb.FAILED_SUFFIX}") for line in p.read_text().splitlines()]
+    assert [(r["user_id"], r["video_id"]) for r in failed] == [("bad", "v1")]
+
+    # Ni se reintenta ni se recupera al arrancar
+    flush_db.batches.clear()
+    assert await buffer.flush() == 0
+    assert VoteBuffer(str(tmp_path), flush_db).start() == 0
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_start_recovers_orphan_log(tmp_path, flush_db):
+    crashed = VoteBuffer(str(tmp_path), flush_db)
+    crashed.start()
+    await crashed.submit("u1", "v1")
+    # Simula un crash: el proceso muere sin flush y suelta el flock
+    vb.os.close(crashed._fd)
+    with open(crashed._active, "a") as f:
+        f.write('{"user_id": "u2", "vid')  # línea cortada a mitad de escritura
+
+    buffer = VoteBuffer(str(tmp_path), flush_db)
+    assert buffer.start() == 1
+    assert buffer.contains("u1", "v1")
+    assert await buffer.flush() == 1
+    assert _log_lines(tmp_path) == []
+    await buffer.close()
+
+
+class _ReadSession:
+    def __init__(self, row):
+        self.row = row
+        self.rollbacks = 0
+
+    async def execute(self, stmt):
+        return SimpleNamespace(one_or_none=lambda: self.row)
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "row, code, detail",
+    [
+        (None, 404, "Video no encontrado"),
+        (SimpleNamespace(status=VideoStatus.processing, voted=False), 400, "Solo se puede votar por videos procesados"),
+        (SimpleNamespace(status=VideoStatus.processed, voted=True), 400, "Ya has votado por este video"),
+    ],
+)
+async def test_buffered_vote_rejections(tmp_path, flush_db, row, code, detail):
+    buffer = VoteBuffer(str(tmp_path), flush_db)
+    buffer.start()
+    service = BufferedVoteService(inner=None, buffer=buffer)
+
+    with pytest.raises(HTTPException) as exc:
+        await service.register_vote(video_id="v1", user_id="u1", db=_ReadSession(row))
+
+    assert (exc.value.status_code, exc.value.detail) == (code, detail)
+    assert len(buffer) == 0
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_buffered_vote_accepts_once(tmp_path, flush_db):
+    buffer = VoteBuffer(str(tmp_path), flush_db)
+    buffer.start()
+    service = BufferedVoteService(inner=None, buffer=buffer)
+    db = _ReadSession(SimpleNamespace(status=VideoStatus.processed, voted=False))
+
+    await service.register_vote(video_id="v1", user_id="u1", db=db)
+    with pytest.raises(HTTPException) as exc:
+        await service.register_vote(video_id="v1", user_id="u1", db=db)
+
+    assert exc.value.detail == "Ya has votado por este video"
+    assert db.rollbacks == 1, "pending duplicate is rejected before touching the DB"
+    assert len(buffer) == 1
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_vote_in_flight_flush_still_counts_as_cast(tmp_path, flush_db):
+    """Mientras el flush inserta el lote, ni el buffer pendiente ni la DB lo ven: se consulta el lote en vuelo."""
+    buffer = VoteBuffer(str(tmp_path), flush_db)
+    buffer.start()
+    service = BufferedVoteService(inner=None, buffer=buffer)
+    db = _ReadSession(SimpleNamespace(status=VideoStatus.processed, voted=False))
+    await service.register_vote(video_id="v1", user_id="u1", db=db)
+    flush_db.gate = asyncio.Event()
+
+    flushing = asyncio.create_task(buffer.flush())
+    await asyncio.wait_for(flush_db.entered.wait(), 5)
+    with pytest.raises(HTTPException) as exc:
+        await service.register_vote(video_id="v1", user_id="u1", db=db)
+    assert (exc.value.status_code, exc.value.detail) == (400, "Ya has votado por este video")
+    assert buffer.contains("u1", "v1") and len(buffer) == 1
+
+    flush_db.gate.set()
+    assert await flushing == 1
+    assert not buffer.contains("u1", "v1") and len(buffer) == 0
+    await buffer.close()
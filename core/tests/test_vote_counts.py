@@ -0,0 +1,62 @@
+"""Reconciliación de videos.votes_count contra la tabla votes (SQLite en memoria)."""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models.video import Video, VideoStatus
+from app.models.vote import Vote
+from app.services.public_videos.vote_counts import reconcile_vote_counts
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    await engine.dispose()
+
+
+def _video(title, votes_count=0):
+    return Video(
+        user_id="owner",
+        title=title,
+        original_filename=f"{title}.mp4",
+        original_path=f"/uploads/{title}.mp4",
+        status=VideoStatus.processed,
+        votes_count=votes_count,
+    )
+
+
+@pytest.mark.asyncio
+async def test_reconcile_fixes_only_drifted_counts(session_factory):
+    async with session_factory() as db:
+        ok, drifted, stale = _video("ok", 2), _video("drifted", 0), _video("stale", 7)
+        db.add_all([ok, drifted, stale])
+        await db.flush()
+        db.add_all(
+            [
+                Vote(user_id="u1", video_id=ok.id),
+                Vote(user_id="u2", video_id=ok.id),
+                Vote(user_id="u1", video_id=drifted.id),
+            ]
+        )
+        await db.commit()
+
+        fixed = await reconcile_vote_counts(db)
+
+        counts = dict((await db.execute(select(Video.title, Video.votes_count))).all())
+    assert fixed == 2
+    assert counts == {"ok": 2, "drifted": 1, "stale": 0}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_is_noop_when_counts_match(session_factory):
+    async with session_factory() as db:
+        db.add(_video("empty"))
+        await db.commit()
+
+        assert await reconcile_vote_counts(db) == 0
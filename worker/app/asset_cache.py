@@ -0,0 +1,230 @@
+"""Cache local de assets del worker (intro/outro/marca de agua) leídos desde S3.
+
+Los assets se descargan una vez, se verifican (SHA-256 en metadata, ETag MD5 o
+tamaño) y se guardan en disco con nombre por contenido (`<sha256><ext>`). Cada
+proceso revalida el ETag con un HEAD como máximo cada `refresh_seconds`, así un
+cambio de branding en S3 se aplica sin reiniciar y sin lecturas de red por
+tarea. El directorio se acota con desalojo LRU por atime, que se actualiza en
+cada uso sin tocar mtime (el digest de assets del pipeline se cachea por mtime).
+
+Las consultas (hit/miss) ocurren en los hijos del pool, pero el exporter de
+Prometheus corre en el padre: igual que `db_pool`, cada proceso publica sus
+totales en un archivo por pid y el padre los suma (`aggregate_lookups`).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+from app.db_pool import pid_alive
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = 'index.json'
+PARTIAL_SUFFIX = '.partial'
+
+LOOKUP_RESULTS = ('hit', 'miss')
+
+# Totales de este proceso (se reinician tras el fork) y, en el padre, los de procesos ya terminados
+_lookups = {'pid': None, 'counts': dict.fromkeys(LOOKUP_RESULTS, 0)}
+_lookups_lock = threading.Lock()
+_retired = dict.fromkeys(LOOKUP_RESULTS, 0)
+
+
+def stats_dir():
+    default = Path(tempfile.gettempdir()) / 'anb_asset_cache_stats'
+    return Path(os.getenv('ANB_ASSET_CACHE_STATS_DIR', str(default)))
+
+
+def _record(result):
+    """Count a hit/miss and publish this process' totals for the parent exporter; never fails the caller."""
+    try:
+        pid = os.getpid()
+        with _lookups_lock:
+            if _lookups['pid'] != pid:
+                _lookups['pid'] = pid
+                _lookups['counts'] = dict.fromkeys(LOOKUP_RESULTS, 0)
+            _lookups['counts'][result] += 1
+            snapshot = dict(_lookups['counts'])
+        directory = stats_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f'assetcache-{pid}.json'
+        tmp = target.with_suffix('.tmp')
+        tmp.write_text(json.dumps(snapshot), encoding='utf-8')
+        os.replace(tmp, target)
+    except Exception as e:
+        logger.debug('No se pudieron publicar las consultas al cache de assets: %s', e)
+
+
+def aggregate_lookups():
+    """Sum the published hit/miss totals of all processes.
+
+    Files of exited processes are folded into running totals before being
+    removed, so the exported counter never goes backwards when a child is
+    recycled.
+    """
+    totals = dict(_retired)
+    directory = stats_dir()
+    if not directory.is_dir():
+        return totals
+    for path in directory.glob('assetcache-*.json'):
+        try:
+            pid = int(path.stem.split('-', 1)[1])
+            counts = json.loads(path.read_text(encoding='utf-8'))
+        except (IndexError, ValueError, OSError):
+            continue
+        alive = pid_alive(pid)
+        for key in LOOKUP_RESULTS:
+            value = int(counts.get(key, 0))
+            totals[key] += value
+            if not alive:
+                _retired[key] += value
+        if not alive:
+            path.unlink(missing_ok=True)
+    return totals
+
+
+def _split_s3_uri(uri):
+    """s3://bucket/key -> (bucket, key)"""
+    remainder = uri[len('s3://'):]
+    bucket, _, key = remainder.partition('/')
+    return bucket, key
+
+
+def _hash_file(path):
+    """Return (sha256_hex, md5_hex) of a local file."""
+    sha = hashlib.sha256()
+    md5 = hashlib.md5()  # noqa: S324 - solo para comparar con el ETag de S3
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+            md5.update(chunk)
+    return sha.hexdigest(), md5.hexdigest()
+
+
+class AssetCache:
+    """Cache en disco de objetos S3, verificado y acotado por tamaño (LRU)."""
+
+    def __init__(self, cache_dir, *, max_bytes, refresh_seconds, client_factory):
+        self._dir = Path(cache_dir)
+        self._max_bytes = max_bytes
+        self._refresh_seconds = refresh_seconds
+        self._client_factory = client_factory
+        self._lock = threading.Lock()
+        self._checked_at = {}
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._entries = self._load_index()
+
+    # ------------------------------------------------------------------ index
+    def _load_index(self):
+        try:
+            return json.loads((self._dir / INDEX_FILENAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        """Persist the index atomically, merging entries written by other processes."""
+        merged = self._load_index()
+        merged.update(self._entries)
+        tmp = self._dir / f'{INDEX_FILENAME}.{os.getpid()}{PARTIAL_SUFFIX}'
+        tmp.write_text(json.dumps(merged, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self._dir / INDEX_FILENAME)
+
+    # ------------------------------------------------------------------ API
+    def get(self, uri):
+        """Return the local Path for an s3:// asset, downloading it on a miss."""
+        with self._lock:
+            entry = self._entries.get(uri)
+            cached = Path(entry['path']) if entry else None
+            available = cached is not None and cached.exists()
+            last_check = self._checked_at.get(uri)
+
+            if available and last_check is not None and time.monotonic() - last_check < self._refresh_seconds:
+                return self._hit(cached)
+
+            bucket, key = _split_s3_uri(uri)
+            try:
+                head = self._client_factory().head_object(Bucket=bucket, Key=key)
+            except ClientError as e:
+                if available:
+                    logger.warning('No se pudo revalidar asset %s; usando copia local: %s', uri, e)
+                    self._checked_at[uri] = time.monotonic()
+                    return self._hit(cached)
+                raise RuntimeError(f'No se pudo obtener el asset {uri}') from e
+
+            etag = head.get('ETag', '').strip('"')
+            self._checked_at[uri] = time.monotonic()
+            if available and entry.get('etag') == etag:
+                return self._hit(cached)
+
+            path = self._download(uri, bucket, key, head, etag)
+            _record('miss')
+            return path
+
+    # ------------------------------------------------------------------ internals
+    def _hit(self, path):
+        try:
+            st = path.stat()
+            os.utime(path, ns=(time.time_ns(), st.st_mtime_ns))
+        except OSError:
+            pass
+        _record('hit')
+        return path
+
+    def _download(self, uri, bucket, key, head, etag):
+        partial = self._dir / f'.{os.getpid()}-{hashlib.sha256(uri.encode()).hexdigest()[:16]}{PARTIAL_SUFFIX}'
+        self._client_factory().download_file(bucket, key, str(partial))
+        try:
+            sha256, md5 = _hash_file(partial)
+            self._verify(uri, partial, head, etag, sha256, md5)
+        except Exception:
+            partial.unlink(missing_ok=True)
+            raise
+
+        target = self._dir / f'{sha256}{Path(key).suffix}'
+        os.replace(partial, target)
+        self._entries[uri] = {'etag': etag, 'sha256': sha256, 'path': str(target)}
+        self._save_index()
+        self._evict(keep=target)
+        logger.info('Asset descargado al cache: %s -> %s', uri, target)
+        return target
+
+    @staticmethod
+    def _verify(uri, path, head, etag, sha256, md5):
+        """Check the download against metadata sha256, a single-part ETag or the size."""
+        expected_sha = (head.get('Metadata') or {}).get('sha256')
+        if expected_sha:
+            ok = expected_sha.lower() == sha256
+        elif etag and '-' not in etag:
+            ok = etag.lower() == md5
+        else:
+            ok = path.stat().st_size == head.get('ContentLength')
+        if not ok:
+            raise RuntimeError(f'Verificación fallida para el asset {uri}')
+
+    def _evict(self, keep):
+        """Remove least recently used cached files until the directory fits in max_bytes."""
+        files = [
+            p for p in self._dir.iterdir()
+            if p.is_file() and p.name != INDEX_FILENAME and not p.name.endswith(PARTIAL_SUFFIX)
+        ]
+        total = sum(p.stat().st_size for p in files)
+        for p in sorted(files, key=lambda f: f.stat().st_atime):
+            if total <= self._max_bytes:
+                break
+            if p == keep:
+                continue
+            size = p.stat().st_size
+            try:
+                p.unlink()
+                total -= size
+                logger.info('Asset desalojado del cache (LRU): %s', p)
+            except OSError:
+                pass
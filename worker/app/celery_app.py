@@ -5,9 +5,11 @@ import traceback
 import os
 import time
 
+from app import asset_cache, db_pool
+
 # Prometheus metrics (export to /metrics via start_http_server)
 try:
-    from prometheus_client import Counter, Histogram, start_http_server
+    from prometheus_client import Counter, Gauge, Histogram, start_http_server
     _PROM_AVAILABLE = True
 except Exception:
     _PROM_AVAILABLE = False
@@ -103,6 +105,7 @@ except Exception:
 # Prometheus metrics exporter
 # ---------------------------
 _task_starts = {}
+CONTROLLER_GAUGES = {}
 if _PROM_AVAILABLE:
     # Guardar los nombres base que podrían haber sido registrados por reloads/tests
     try:
@@ -148,6 +151,65 @@ if _PROM_AVAILABLE:
         except Exception:
             TASK_DURATION = None
 
+    # Decisiones del controlador adaptativo de concurrencia (se actualizan en el proceso padre)
+    try:
+        CONTROLLER_GAUGES = {
+            name: _get_existing_collector([name]) or Gauge(name, doc)
+            for name, doc in (
+                ('anb_worker_pool_target_processes', 'Procesos del pool decididos por el controlador'),
+                ('anb_worker_ffmpeg_threads', 'Threads por ffmpeg decididos por el controlador'),
+                ('anb_worker_cpu_utilization', 'Utilización de CPU del nodo (0-1)'),
+                ('anb_worker_load_per_core', 'Load average de 1 minuto por core'),
+                ('anb_worker_queue_backlog', 'Mensajes visibles en la cola SQS'),
+            )
+        }
+    except Exception:
+        CONTROLLER_GAUGES = {}
+
+    # Estadísticas del pool de conexiones a la DB (publicadas por cada proceso del pool)
+    try:
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        class DbPoolCollector:
+            """Suma las estadísticas de psycopg_pool publicadas por los procesos vivos."""
+
+            def collect(self):
+                for key, value in db_pool.aggregate_stats().items():
+                    metric = GaugeMetricFamily(
+                        f'anb_worker_db_{key}', f'psycopg_pool {key} (suma de los procesos del worker)'
+                    )
+                    metric.add_metric([], value)
+                    yield metric
+
+            def describe(self):
+                return [GaugeMetricFamily(f'anb_worker_db_{key}', key) for key in db_pool.EXPORTED_STATS]
+
+        if not _get_existing_collector(['anb_worker_db_pool_size']):
+            REGISTRY.register(DbPoolCollector())
+    except Exception:
+        logger.exception('No se pudo registrar el collector del pool de la DB')
+
+    # Hits/misses del cache de assets (contados en los hijos del pool, publicados por pid)
+    try:
+        class AssetCacheCollector:
+            """Suma las consultas al cache de assets publicadas por los procesos del worker."""
+
+            def collect(self):
+                metric = CounterMetricFamily(
+                    'anb_worker_asset_cache', 'Consultas al cache de assets del worker', labels=['result']
+                )
+                for result, value in asset_cache.aggregate_lookups().items():
+                    metric.add_metric([result], value)
+                yield metric
+
+            def describe(self):
+                return [CounterMetricFamily('anb_worker_asset_cache', 'Consultas al cache de assets del worker')]
+
+        if not _get_existing_collector(['anb_worker_asset_cache', 'anb_worker_asset_cache_total']):
+            REGISTRY.register(AssetCacheCollector())
+    except Exception:
+        logger.exception('No se pudo registrar el collector del cache de assets')
+
     # Inicia el servidor de métricas solo una vez (padre) para evitar conflictos de puerto
     try:
         if not os.environ.get('ANB_METRICS_STARTED'):
@@ -159,10 +221,142 @@ if _PROM_AVAILABLE:
         logger.exception('No se pudo iniciar el servidor de métricas Prometheus')
 
 
+# ---------------------------
+# Controlador adaptativo de concurrencia
+# ---------------------------
+from celery.worker.autoscale import Autoscaler  # noqa: E402
+from app import concurrency, sqs_batch  # noqa: E402
+
+
+def _set_gauge(name, value):
+    gauge = CONTROLLER_GAUGES.get(name)
+    if gauge is not None and value is not None:
+        gauge.set(value)
+
+
+class AdaptiveAutoscaler(Autoscaler):
+    """Autoscaler que dimensiona el pool según CPU, load average y backlog de SQS.
+
+    Se activa con ANB_ADAPTIVE_CONCURRENCY=1 y `--autoscale=MAX,MIN`. Cada
+    ANB_CONTROLLER_INTERVAL_SECONDS decide procesos y threads de ffmpeg
+    (procesos x threads ~ cores) y publica los threads para los hijos del pool.
+    El backlog de SQS se muestrea en un thread aparte: `_maybe_scale` corre en
+    el hub del consumidor y solo lee el último valor.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = float(os.getenv('ANB_CONTROLLER_INTERVAL_SECONDS', '10'))
+        self.cores = os.cpu_count() or 1
+        self._cpu_sample = concurrency.read_cpu_times()
+        self._last_decision = None
+        self._backlog = concurrency.BacklogSampler(sqs_batch.queue_backlog, self.interval).start()
+
+    def _maybe_scale(self, req=None):
+        now = time.monotonic()
+        if self._last_decision is not None and now - self._last_decision < self.interval:
+            return False
+        if not self._backlog.ready():
+            # Sin una primera muestra no se decide (evita achicar el pool al arrancar)
+            return False
+        self._last_decision = now
+
+        cpu_sample = concurrency.read_cpu_times()
+        cpu_util = concurrency.cpu_utilization(self._cpu_sample, cpu_sample)
+        self._cpu_sample = cpu_sample
+        load = concurrency.load_per_core(self.cores)
+        backlog = self._backlog.value
+        procs = self.processes
+        target, threads = concurrency.plan(
+            self.cores,
+            current=procs,
+            busy=self.qty,
+            backlog=backlog or 0,
+            cpu_util=cpu_util,
+            load=load,
+            min_procs=self.min_concurrency,
+            max_procs=self.max_concurrency,
+        )
+        concurrency.publish(target, threads)
+        for name, value in (
+            ('anb_worker_pool_target_processes', target),
+            ('anb_worker_ffmpeg_threads', threads),
+            ('anb_worker_cpu_utilization', cpu_util),
+            ('anb_worker_load_per_core', load),
+            ('anb_worker_queue_backlog', backlog),
+        ):
+            _set_gauge(name, value)
+        logger.info(
+            'Controlador de concurrencia: procesos %s -> %s threads=%s cpu=%s load=%s backlog=%s',
+            procs, target, threads, cpu_util, load, backlog,
+        )
+
+        if target > procs:
+            self.scale_up(target - procs)
+            return True
+        if target < procs and (self._last_scale_up is None or now - self._last_scale_up > self.keepalive):
+            # Igual que scale_down, respeta el keepalive desde el último scale_up
+            self._shrink(procs - target)
+            return True
+        return False
+
+
+if concurrency.enabled():
+    app.conf.worker_autoscaler = 'app.celery_app:AdaptiveAutoscaler'
+
+
 # handler para registrar fallos y empujar metadata a la DLQ (informativo)
 from celery.signals import task_failure  # noqa: E402
 import json  # noqa: E402
 from celery.signals import task_prerun, task_postrun  # noqa: E402
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown  # noqa: E402
+from app import encoder_profiles  # noqa: E402
+
+
+def _db_pool_size(sender):
+    """Connections per process: one per prefork child, the concurrency for thread-based pools."""
+    override = os.getenv('ANB_DB_POOL_MAX_SIZE')
+    if override:
+        return int(override)
+    pool_cls = getattr(sender, 'pool_cls', None) or 'prefork'
+    pool_name = pool_cls if isinstance(pool_cls, str) else getattr(pool_cls, '__module__', '')
+    if 'prefork' in pool_name or 'solo' in pool_name:
+        return 1
+    return int(getattr(sender, 'concurrency', None) or 1)
+
+
+@worker_init.connect
+def on_worker_init(sender=None, **kwargs):
+    # Solo se dimensiona aquí; cada proceso crea su pool después del fork
+    db_pool.enable(_db_pool_size(sender))
+
+    # Calibración del encoder en el proceso padre: los hijos del pool heredan el perfil vía entorno
+    if not encoder_profiles.calibration_enabled():
+        return
+    try:
+        selected, _ = encoder_profiles.calibrate()
+        os.environ[encoder_profiles.SELECTED_PROFILE_ENV] = selected
+    except Exception:
+        logger.exception('Calibración del encoder falló; se usa el perfil %s', encoder_profiles.DEFAULT_PROFILE)
+
+
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+    # Abrir el pool al arrancar el hijo para no pagar la conexión en la primera tarea
+    db_url = os.getenv('DB_URL_CORE')
+    if not db_url:
+        return
+    try:
+        from tasks.process_video import _sync_dsn
+        db_pool.get_pool(_sync_dsn(db_url))
+        db_pool.publish_stats(force=True)
+    except Exception:
+        logger.exception('No se pudo abrir el pool de conexiones a la DB')
+
+
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(**kwargs):
+    db_pool.close_pool()
 
 
 @task_failure.connect
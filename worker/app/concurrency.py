@@ -0,0 +1,149 @@
+"""Señales y decisiones del controlador adaptativo de concurrencia del worker.
+
+El controlador (AdaptiveAutoscaler en app/celery_app.py) corre en el proceso
+padre de Celery; decide cuántos procesos del pool mantener y cuántos threads
+debe usar cada ffmpeg para que procesos x threads siga a los cores disponibles.
+La cantidad de threads se publica en un archivo de estado pequeño que los
+procesos hijos leen al construir el comando ffmpeg.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Umbrales de presión: por encima se reduce el pool aunque haya backlog
+CPU_HIGH_WATERMARK = 0.90
+LOAD_HIGH_WATERMARK = 1.5
+
+
+def enabled():
+    """True when ANB_ADAPTIVE_CONCURRENCY turns the controller on."""
+    return os.getenv('ANB_ADAPTIVE_CONCURRENCY', '0').strip().lower() in ('1', 'true', 'yes')
+
+
+def state_file():
+    default = Path(tempfile.gettempdir()) / 'anb_concurrency.json'
+    return Path(os.getenv('ANB_CONCURRENCY_STATE_FILE', str(default)))
+
+
+def read_cpu_times():
+    """Return (idle, total) jiffies from /proc/stat, or None when unavailable."""
+    try:
+        with open('/proc/stat', encoding='ascii') as f:
+            fields = [int(v) for v in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    # idle + iowait cuentan como tiempo ocioso
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return idle, sum(fields)
+
+
+def cpu_utilization(previous, current):
+    """CPU utilization (0..1) between two read_cpu_times() samples, or None."""
+    if not previous or not current:
+        return None
+    total = current[1] - previous[1]
+    if total <= 0:
+        return None
+    return max(0.0, min(1.0, 1.0 - (current[0] - previous[0]) / total))
+
+
+def load_per_core(cores):
+    """1-minute load average divided by the core count, or None."""
+    try:
+        return os.getloadavg()[0] / max(1, cores)
+    except (AttributeError, OSError):
+        return None
+
+
+class BacklogSampler:
+    """Samples the queue backlog in a daemon thread; reading `value` never blocks.
+
+    The autoscaler runs on the consumer's event-loop hub, so a synchronous SQS
+    call there would stall message consumption whenever SQS is slow.
+    """
+
+    def __init__(self, sample, interval):
+        self._sample = sample
+        self.interval = max(1.0, interval)
+        self.value = None
+        self._sampled = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='anb-backlog-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def ready(self):
+        """True once the first sample was attempted (the value may still be None if SQS failed)."""
+        return self._sampled.is_set()
+
+    def wait(self, timeout=None):
+        return self._sampled.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.value = self._sample()
+            except Exception as e:
+                logger.warning('No se pudo muestrear el backlog: %s', e)
+                self.value = None
+            self._sampled.set()
+            self._stop.wait(self.interval)
+
+
+def plan(cores, *, current, busy, backlog, cpu_util, load, min_procs, max_procs):
+    """Return (processes, ffmpeg_threads) for the next control interval.
+
+    Demand is the running tasks plus the queue backlog. Under CPU or load
+    pressure the pool shrinks by one process instead of growing. Threads split
+    the cores evenly across the chosen processes.
+    """
+    demand = busy + max(0, backlog)
+    target = max(min_procs, min(max_procs, demand, cores))
+    overloaded = (cpu_util is not None and cpu_util >= CPU_HIGH_WATERMARK) or (
+        load is not None and load >= LOAD_HIGH_WATERMARK
+    )
+    if overloaded and target >= current:
+        target = max(min_procs, current - 1)
+    target = max(1, target)
+    threads = max(1, cores // target)
+    return target, threads
+
+
+def publish(processes, threads):
+    """Write the controller decision atomically for the pool processes."""
+    path = state_file()
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        tmp.write_text(
+            json.dumps({'processes': processes, 'threads': threads, 'updated_at': time.time()}),
+            encoding='utf-8',
+        )
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning('No se pudo publicar la decisión de concurrencia: %s', e)
+
+
+def thread_hint(max_age_seconds=300):
+    """Return the ffmpeg thread count decided by the controller, or None if stale/absent."""
+    try:
+        data = json.loads(state_file().read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if time.time() - float(data.get('updated_at', 0)) > max_age_seconds:
+        return None
+    threads = data.get('threads')
+    return str(int(threads)) if threads else None
@@ -0,0 +1,149 @@
+"""Pool de conexiones psycopg por proceso para las escrituras del worker en la DB.
+
+`enable()` se llama en worker_init (proceso padre) con el tamaño por proceso;
+el pool en sí se crea dentro de cada proceso que lo usa (en worker_process_init
+para prefork, o en el primer uso), nunca antes del fork: los sockets abiertos no
+deben compartirse entre procesos. Las conexiones se validan al tomarlas del pool,
+así una conexión caída (failover de RDS, timeout de idle) se reemplaza sola.
+
+Como las métricas de los hijos del pool no se ven en el exporter del padre, cada
+proceso publica sus estadísticas en un archivo por pid y el padre las agrega.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    from psycopg_pool import ConnectionPool
+    _POOL_AVAILABLE = True
+except ImportError:
+    ConnectionPool = None
+    _POOL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Estadísticas de psycopg_pool exportadas (sumadas entre procesos)
+EXPORTED_STATS = (
+    'pool_size',
+    'pool_available',
+    'requests_waiting',
+    'requests_num',
+    'requests_errors',
+    'connections_num',
+    'connections_errors',
+    'connections_lost',
+    'returns_bad',
+)
+STATS_PUBLISH_INTERVAL_SECONDS = 5.0
+
+_state = {'enabled': False, 'max_size': 1, 'pid': None, 'pool': None, 'stats_at': 0.0}
+
+
+def stats_dir():
+    default = Path(tempfile.gettempdir()) / 'anb_db_pool'
+    return Path(os.getenv('ANB_DB_POOL_STATS_DIR', str(default)))
+
+
+def enable(max_size):
+    """Turn pooling on for this process and the ones forked from it."""
+    if not _POOL_AVAILABLE:
+        logger.warning('psycopg_pool no está instalado; el worker usa una conexión por operación')
+        return
+    if os.getenv('ANB_DB_POOL_ENABLED', '1').strip().lower() in ('0', 'false', 'no'):
+        return
+    _state['enabled'] = True
+    _state['max_size'] = max(1, int(max_size))
+
+
+def get_pool(conninfo):
+    """Return this process' pool (creating it on first use), or None when pooling is off."""
+    if not _state['enabled']:
+        return None
+    pid = os.getpid()
+    if _state['pool'] is not None and _state['pid'] == pid:
+        return _state['pool']
+    # Proceso nuevo (fork): no reutilizar el pool heredado del padre
+    _state['pool'] = ConnectionPool(
+        conninfo,
+        min_size=1,
+        max_size=_state['max_size'],
+        kwargs={'autocommit': True},
+        check=ConnectionPool.check_connection,
+        timeout=float(os.getenv('ANB_DB_POOL_TIMEOUT_SECONDS', '10')),
+        max_idle=float(os.getenv('ANB_DB_POOL_MAX_IDLE_SECONDS', '300')),
+        name=f'anb-worker-{pid}',
+        open=True,
+    )
+    _state['pid'] = pid
+    logger.info('Pool de conexiones a la DB creado (pid=%s max_size=%s)', pid, _state['max_size'])
+    return _state['pool']
+
+
+def close_pool():
+    """Close this process' pool, if it owns one, and drop its stats file."""
+    pool = _state['pool']
+    if pool is not None and _state['pid'] == os.getpid():
+        try:
+            pool.close()
+        except Exception as e:
+            logger.warning('Error cerrando el pool de la DB: %s', e)
+        (stats_dir() / f'dbpool-{os.getpid()}.json').unlink(missing_ok=True)
+    _state['pool'] = None
+    _state['pid'] = None
+
+
+def publish_stats(force=False):
+    """Write this process' pool statistics for the parent exporter (throttled)."""
+    pool = _state['pool']
+    if pool is None or _state['pid'] != os.getpid():
+        return
+    now = time.monotonic()
+    if not force and now - _state['stats_at'] < STATS_PUBLISH_INTERVAL_SECONDS:
+        return
+    _state['stats_at'] = now
+    try:
+        directory = stats_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f'dbpool-{os.getpid()}.json'
+        tmp = target.with_suffix('.tmp')
+        tmp.write_text(json.dumps(pool.get_stats()), encoding='utf-8')
+        os.replace(tmp, target)
+    except Exception as e:
+        logger.debug('No se pudieron publicar estadísticas del pool: %s', e)
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def aggregate_stats():
+    """Sum the published statistics of live processes; stale files are removed."""
+    totals = dict.fromkeys(EXPORTED_STATS, 0)
+    directory = stats_dir()
+    if not directory.is_dir():
+        return totals
+    for path in directory.glob('dbpool-*.json'):
+        try:
+            pid = int(path.stem.split('-', 1)[1])
+        except (IndexError, ValueError):
+            continue
+        if not pid_alive(pid):
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            stats = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        for key in EXPORTED_STATS:
+            totals[key] += int(stats.get(key, 0))
+    return totals
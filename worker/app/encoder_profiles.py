@@ -0,0 +1,163 @@
+"""Registro de perfiles de encoder y calibración al arranque del worker.
+
+Cada perfil fija codec, preset, CRF, threads y flags de tuning de x264. El perfil
+se elige con ANB_ENCODER_PROFILE (`throughput`, `balanced`, `quality` o `auto`);
+con `auto` el proceso padre de Celery codifica un clip de referencia con cada
+perfil al iniciar y elige el de mayor calidad que cumple el objetivo de tiempo
+por video en este nodo. El resultado se publica en el entorno para que los
+procesos hijos del pool lo hereden.
+"""
+
+import logging
+import os
+import subprocess
+import time
+
+logger = logging.getLogger(__name__)
+
+ENCODER_PROFILES = {
+    # Igual a los defaults históricos (ultrafast / CRF 25 / 2 threads)
+    'throughput': {
+        'codec': 'libx264',
+        'preset': 'ultrafast',
+        'crf': '25',
+        'threads': '2',
+        'tune': None,
+        'x264_params': None,
+    },
+    'balanced': {
+        'codec': 'libx264',
+        'preset': 'veryfast',
+        'crf': '23',
+        'threads': '0',
+        'tune': None,
+        'x264_params': 'rc-lookahead=20',
+    },
+    'quality': {
+        'codec': 'libx264',
+        'preset': 'medium',
+        'crf': '21',
+        'threads': '0',
+        'tune': 'film',
+        'x264_params': None,
+    },
+}
+DEFAULT_PROFILE = 'throughput'
+PROFILE_AUTO = 'auto'
+
+# Orden de preferencia en la calibración: de mayor calidad a mayor throughput
+CALIBRATION_ORDER = ('quality', 'balanced', 'throughput')
+
+# Variable donde la calibración publica el perfil elegido (heredada por los hijos del pool)
+SELECTED_PROFILE_ENV = 'ANB_ENCODER_PROFILE_SELECTED'
+
+
+def _requested_profile():
+    return os.getenv('ANB_ENCODER_PROFILE', '').strip().lower()
+
+
+def calibration_enabled():
+    """True when the worker should benchmark the profiles at startup."""
+    return _requested_profile() == PROFILE_AUTO
+
+
+def resolve_profile_name():
+    """Return the active profile name, falling back to the default on unknown values."""
+    name = _requested_profile()
+    if name == PROFILE_AUTO:
+        name = os.getenv(SELECTED_PROFILE_ENV, DEFAULT_PROFILE)
+    if not name:
+        return DEFAULT_PROFILE
+    if name not in ENCODER_PROFILES:
+        logger.warning('ANB_ENCODER_PROFILE desconocido %r; usando %s', name, DEFAULT_PROFILE)
+        return DEFAULT_PROFILE
+    return name
+
+
+def encoder_settings():
+    """Return the active profile settings.
+
+    FFMPEG_PRESET / FFMPEG_CRF / FFMPEG_THREADS still override the profile
+    values when set, so existing deployments keep their behavior.
+    """
+    name = resolve_profile_name()
+    settings = dict(ENCODER_PROFILES[name], profile=name)
+    for key, env in (('preset', 'FFMPEG_PRESET'), ('crf', 'FFMPEG_CRF'), ('threads', 'FFMPEG_THREADS')):
+        value = os.getenv(env)
+        if value:
+            settings[key] = value
+    return settings
+
+
+def encoder_args(settings):
+    """Return the ffmpeg output arguments for a settings dict."""
+    args = [
+        '-c:v', settings['codec'],
+        '-preset', settings['preset'],
+        '-crf', settings['crf'],
+    ]
+    if settings.get('tune'):
+        args.extend(['-tune', settings['tune']])
+    if settings.get('x264_params'):
+        args.extend(['-x264-params', settings['x264_params']])
+    args.extend([
+        '-pix_fmt', 'yuv420p',
+        '-an',
+        '-threads', settings['threads'],
+    ])
+    return args
+
+
+def _calibration_cmd(settings, clip_seconds):
+    """ffmpeg command encoding the reference clip to the null muxer."""
+    clip = os.getenv('ANB_CALIBRATION_CLIP')
+    if clip:
+        source = ['-t', str(clip_seconds), '-i', clip]
+    else:
+        source = ['-f', 'lavfi', '-i', f'testsrc2=size=1920x1080:rate=30:duration={clip_seconds}']
+    return [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        *source,
+        '-vf', 'scale=1280:720',
+        *encoder_args(settings),
+        '-f', 'null', '-',
+    ]
+
+
+def calibrate():
+    """Benchmark every profile on this node and return (selected_name, estimates).
+
+    `estimates` maps each profile that encoded successfully to its projected
+    seconds per video (measured time scaled from the reference clip length to
+    ANB_REFERENCE_VIDEO_SECONDS). The selected profile is the highest quality
+    one within ANB_TARGET_SECONDS_PER_VIDEO, or the default if none is.
+    """
+    target = float(os.getenv('ANB_TARGET_SECONDS_PER_VIDEO', '60'))
+    clip_seconds = float(os.getenv('ANB_CALIBRATION_CLIP_SECONDS', '5'))
+    video_seconds = float(os.getenv('ANB_REFERENCE_VIDEO_SECONDS', '40'))
+    timeout = float(os.getenv('ANB_CALIBRATION_TIMEOUT_SECONDS', '120'))
+
+    estimates = {}
+    for name in CALIBRATION_ORDER:
+        cmd = _calibration_cmd(ENCODER_PROFILES[name], clip_seconds)
+        start = time.monotonic()
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning('Calibración del perfil %s falló: %s', name, e)
+            continue
+        elapsed = time.monotonic() - start
+        if proc.returncode != 0:
+            logger.warning('Calibración del perfil %s falló: %s', name, (proc.stderr or '')[-500:])
+            continue
+        estimates[name] = elapsed * video_seconds / clip_seconds
+
+    selected = next(
+        (name for name in CALIBRATION_ORDER if name in estimates and estimates[name] <= target),
+        DEFAULT_PROFILE,
+    )
+    logger.info(
+        'Calibración de encoder: perfil=%s objetivo=%.1fs estimaciones=%s',
+        selected, target, {k: round(v, 2) for k, v in estimates.items()},
+    )
+    return selected, estimates
@@ -0,0 +1,166 @@
+"""Lectura directa de mensajes `process_video.run` pendientes en SQS para procesarlos en lote.
+
+Celery entrega un mensaje por tarea; cuando la cola está cargada, una tarea
+"líder" puede tomar hasta N-1 mensajes adicionales con `receive_message` y
+procesarlos junto con el suyo. Cada mensaje tomado se confirma (`ack`, borra el
+mensaje) o se libera (`release`, visibilidad 0 para que se reentregue y se
+reintente por su cuenta) de forma independiente, igual que haría Celery con
+`acks_late`. La política de redrive de la cola sigue aplicando a cada mensaje;
+`PendingRun.last_receive` indica que un `release` lo mandaría a la DLQ.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+RUN_TASK_NAME = 'tasks.process_video.run'
+
+# Máximo permitido por SQS en un receive_message
+SQS_MAX_RECEIVE = 10
+
+
+@dataclass
+class PendingRun:
+    """Un mensaje `process_video.run` tomado de SQS fuera de Celery."""
+
+    receipt_handle: str
+    args: list
+    kwargs: dict = field(default_factory=dict)
+    task_id: str | None = None
+    receive_count: int = 1
+
+    @property
+    def last_receive(self):
+        """True when the queue's redrive policy moves the message to the DLQ if it is released now."""
+        return self.receive_count >= max_receive_count()
+
+
+def max_receive_count():
+    """`maxReceiveCount` of the queue's redrive policy (SQS_MAX_RECEIVE_COUNT)."""
+    return int(os.getenv('SQS_MAX_RECEIVE_COUNT', '5'))
+
+
+@lru_cache(maxsize=1)
+def _sqs_client():
+    return boto3.client('sqs', region_name=os.getenv('AWS_REGION', 'us-east-1'))
+
+
+@lru_cache(maxsize=1)
+def _queue_url():
+    queue_name = os.getenv('SQS_QUEUE_NAME', 'video_tasks')
+    return _sqs_client().get_queue_url(QueueName=queue_name)['QueueUrl']
+
+
+def _maybe_b64(text):
+    """Decode base64 text when it is valid base64 of UTF-8, otherwise return it unchanged."""
+    try:
+        return base64.b64decode(text, validate=True).decode('utf-8')
+    except (binascii.Error, ValueError):
+        return text
+
+
+def decode_task_message(body):
+    """Return (task_name, args, kwargs, task_id) from a kombu SQS message body, or None.
+
+    kombu stores the message envelope as JSON (base64 encoded by default) and
+    the Celery protocol v2 body `[args, kwargs, embed]` inside it, base64
+    encoded when `properties.body_encoding` says so.
+    """
+    try:
+        envelope = json.loads(_maybe_b64(body))
+        headers = envelope.get('headers') or {}
+        payload = envelope.get('body')
+        if (envelope.get('properties') or {}).get('body_encoding') == 'base64':
+            payload = base64.b64decode(payload).decode('utf-8')
+        payload = json.loads(payload) if isinstance(payload, str) else payload
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+    if isinstance(payload, dict):
+        # Protocolo v1: el nombre y los argumentos vienen en el body
+        return payload.get('task'), list(payload.get('args') or []), dict(payload.get('kwargs') or {}), payload.get('id')
+    if isinstance(payload, list) and len(payload) >= 2:
+        return headers.get('task'), list(payload[0] or []), dict(payload[1] or {}), headers.get('id')
+    return None
+
+
+def drain_pending_runs(max_items):
+    """Take up to `max_items` pending `process_video.run` messages without waiting.
+
+    Messages for other tasks are released immediately. Errors talking to SQS
+    are logged and yield an empty batch: batching is only an optimization.
+    """
+    if max_items <= 0:
+        return []
+    visibility = int(os.getenv('ANB_BATCH_VISIBILITY_TIMEOUT', '600'))
+    pending = []
+    try:
+        client = _sqs_client()
+        queue_url = _queue_url()
+        while len(pending) < max_items:
+            resp = client.receive_message(
+                QueueUrl=queue_url,
+                MaxNumberOfMessages=min(SQS_MAX_RECEIVE, max_items - len(pending)),
+                VisibilityTimeout=visibility,
+                WaitTimeSeconds=0,
+                AttributeNames=['ApproximateReceiveCount'],
+            )
+            messages = resp.get('Messages') or []
+            if not messages:
+                break
+            for message in messages:
+                decoded = decode_task_message(message.get('Body', ''))
+                if not decoded or decoded[0] != RUN_TASK_NAME:
+                    _change_visibility(message['ReceiptHandle'], 0)
+                    continue
+                _, args, kwargs, task_id = decoded
+                receive_count = int((message.get('Attributes') or {}).get('ApproximateReceiveCount', 1))
+                pending.append(PendingRun(message['ReceiptHandle'], args, kwargs, task_id, receive_count))
+    except (BotoCoreError, ClientError) as e:
+        logger.warning('No se pudieron leer mensajes adicionales de SQS para el lote: %s', e)
+    return pending
+
+
+def queue_backlog():
+    """Approximate number of visible messages in the task queue, or None if SQS is unreachable."""
+    try:
+        attrs = _sqs_client().get_queue_attributes(
+            QueueUrl=_queue_url(), AttributeNames=['ApproximateNumberOfMessages'],
+        )
+        return int(attrs['Attributes']['ApproximateNumberOfMessages'])
+    except (BotoCoreError, ClientError, KeyError, ValueError) as e:
+        logger.warning('No se pudo consultar el backlog de SQS: %s', e)
+        return None
+
+
+def _change_visibility(receipt_handle, timeout):
+    try:
+        _sqs_client().change_message_visibility(
+            QueueUrl=_queue_url(), ReceiptHandle=receipt_handle, VisibilityTimeout=timeout,
+        )
+    except (BotoCoreError, ClientError) as e:
+        # Si falla, el mensaje vuelve a la cola cuando expire su visibilidad
+        logger.warning('No se pudo liberar el mensaje SQS: %s', e)
+
+
+def ack(pending_run):
+    """Delete a processed message from the queue."""
+    try:
+        _sqs_client().delete_message(QueueUrl=_queue_url(), ReceiptHandle=pending_run.receipt_handle)
+    except (BotoCoreError, ClientError) as e:
+        # Se reentregará al expirar la visibilidad; el procesamiento es idempotente
+        logger.warning('No se pudo confirmar el mensaje SQS %s: %s', pending_run.task_id, e)
+
+
+def release(pending_run):
+    """Make a message visible again so it is redelivered and retried on its own."""
+    _change_visibility(pending_run.receipt_handle, 0)
@@ -1,11 +1,18 @@
 from celery import shared_task
+from celery.exceptions import Retry
 import subprocess
 import tempfile
 import os
 import shutil
 import logging
 import time
-from pathlib import Path
+import hashlib
+import json
+import threading
+import re
+from collections import deque
+from pathlib import Path, PurePosixPath
+from contextlib import contextmanager
 from functools import lru_cache
 import psycopg
 import boto3
@@ -13,11 +20,58 @@ from botocore.exceptions import ClientError
 from botocore.config import Config
 from boto3.s3.transfer import TransferConfig
 
+from app import concurrency, db_pool, encoder_profiles
+from app import sqs_batch
+from app.asset_cache import AssetCache
+
 logger = logging.getLogger(__name__)
 
 # Constant for mapping uploaded API path to worker storage
 MNT_UPLOADS_PREFIX = '/mnt/uploads'
 
+# Modos del pipeline ffmpeg (env ANB_PIPELINE_MODE):
+# - filtergraph: un solo filter_complex re-codifica intro + main + outro (comportamiento original)
+# - concat: intro/outro pre-renderizados y cacheados; solo se codifica el main y se une con
+#   el concat demuxer en stream copy
+PIPELINE_FILTERGRAPH = 'filtergraph'
+PIPELINE_CONCAT = 'concat'
+
+# Duración máxima (s) del clip principal; se aplica como -t de entrada y como trim
+MAIN_MAX_SECONDS = 30
+
+# Modos de lectura del input S3 (env ANB_INPUT_MODE):
+# - download: descarga completa a /tmp antes de ffmpeg (comportamiento original)
+# - stream: ffmpeg lee desde una URL prefirmada con range requests; si el contenedor no
+#   es seekable (MP4 con moov al final, formatos no ISO-BMFF) se cae a download
+INPUT_DOWNLOAD = 'download'
+INPUT_STREAM = 'stream'
+
+# Modos de escritura del output S3 (env ANB_OUTPUT_MODE):
+# - file: ffmpeg escribe output.mp4 completo y luego se sube (comportamiento original)
+# - pipe: ffmpeg escribe MP4 fragmentado a stdout y se sube como multipart mientras codifica
+OUTPUT_FILE = 'file'
+OUTPUT_PIPE = 'pipe'
+FRAGMENTED_MP4_ARGS = ['-movflags', 'frag_keyframe+empty_moov+default_base_moof', '-f', 'mp4', 'pipe:1']
+
+# Cola de stderr de ffmpeg retenida para diagnóstico (chunks de 4 KiB, o líneas al leer progreso)
+STDERR_TAIL_CHUNKS = 64
+
+# Duración de cada input tal como ffmpeg la imprime en stderr ("Duration: 00:00:12.34")
+FFMPEG_DURATION_RE = re.compile(rb'Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)')
+
+# Línea key=value de `-progress`; en modo pipe llegan por stderr y no se guardan en la cola de diagnóstico
+FFMPEG_PROGRESS_LINE_RE = re.compile(rb'^[a-z0-9_]+=\S*\s*$')
+
+# Bytes iniciales leídos para ubicar el átomo moov y número máximo de cajas inspeccionadas
+MP4_PROBE_BYTES = 64 * 1024
+MP4_PROBE_MAX_BOXES = 32
+
+# Timescale fijo para que los segmentos pre-renderizados y el main sean concatenables sin re-codificar
+SEGMENT_TIMESCALE = '90000'
+
+# Atributo con el que _raise_retry marca la excepción final cuando los reintentos se agotaron
+RETRIES_EXHAUSTED_ATTR = 'anb_retries_exhausted'
+
 
 def _log_visibility(action, *, correlation_id=None, video_id=None, **extra):
     """Helper to emit structured logs for visibility."""
@@ -154,6 +208,325 @@ def _upload_to_s3(local_path: Path, s3_path: str) -> str:
         raise RuntimeError(f'No se pudo subir a S3: {s3_path}') from e
 
 
+@lru_cache(maxsize=1)
+def _asset_cache():
+    """Cache en disco de los assets publicados en S3 (uno por proceso)."""
+    default = Path(tempfile.gettempdir()) / 'anb_assets'
+    return AssetCache(
+        os.getenv('ANB_ASSET_CACHE_DIR', str(default)),
+        max_bytes=int(os.getenv('ANB_ASSET_CACHE_MAX_MB', '512')) * 1024 * 1024,
+        refresh_seconds=float(os.getenv('ANB_ASSET_REFRESH_SECONDS', '300')),
+        client_factory=_make_s3_client,
+    )
+
+
+def _resolve_asset_path(path):
+    """Assets en s3:// se sirven desde el cache local; las rutas locales se devuelven tal cual."""
+    if path and _is_s3_path(path):
+        return str(_asset_cache().get(path))
+    return path
+
+
+def _input_mode():
+    """Return the configured S3 input mode (download by default)."""
+    mode = os.getenv('ANB_INPUT_MODE', INPUT_DOWNLOAD).strip().lower()
+    if mode not in (INPUT_DOWNLOAD, INPUT_STREAM):
+        logger.warning('ANB_INPUT_MODE desconocido %r; usando %s', mode, INPUT_DOWNLOAD)
+        return INPUT_DOWNLOAD
+    return mode
+
+
+def _is_url(path) -> bool:
+    """True for http(s) inputs that ffmpeg reads over the network."""
+    return str(path).startswith(('http://', 'https://'))
+
+
+def _mp4_moov_first(read_at) -> bool:
+    """Return True when an ISO-BMFF file has its `moov` box before `mdat`.
+
+    `read_at(offset, length)` returns the bytes of that range (fewer at EOF).
+    Only top-level box headers are inspected, so besides the initial probe
+    window each extra box costs one tiny ranged read. Anything that is not
+    recognizable as MP4/MOV is reported as not streamable.
+    """
+    buf = read_at(0, MP4_PROBE_BYTES)
+    buf_offset = 0
+    offset = 0
+    for index in range(MP4_PROBE_MAX_BOXES):
+        rel = offset - buf_offset
+        if rel + 16 > len(buf):
+            buf = read_at(offset, 16)
+            buf_offset = offset
+            rel = 0
+        if rel + 8 > len(buf):
+            return False
+        size = int.from_bytes(buf[rel:rel + 4], 'big')
+        box_type = buf[rel + 4:rel + 8]
+        if index == 0 and box_type != b'ftyp':
+            return False
+        if box_type == b'moov':
+            return True
+        if box_type == b'mdat':
+            return False
+        if size == 1:
+            if rel + 16 > len(buf):
+                return False
+            size = int.from_bytes(buf[rel + 8:rel + 16], 'big')
+        if size < 8:
+            # size 0 = la caja llega hasta EOF sin haber visto moov
+            return False
+        offset += size
+    return False
+
+
+def _s3_input_streamable(s3_path: str) -> bool:
+    """Probe the S3 object with ranged GETs and tell whether ffmpeg can stream it."""
+    bucket, key = _parse_s3_path(s3_path)
+    s3_client = _make_s3_client()
+
+    def read_at(offset, length):
+        resp = s3_client.get_object(Bucket=bucket, Key=key, Range=f'bytes={offset}-{offset + length - 1}')
+        return resp['Body'].read()
+
+    try:
+        return _mp4_moov_first(read_at)
+    except ClientError as e:
+        logger.warning('No se pudo inspeccionar %s para streaming: %s', s3_path, e)
+        return False
+
+
+def _presign_s3_get(s3_path: str) -> str:
+    """Return a presigned GET URL for the S3 object (TTL via S3_PRESIGN_TTL_SECONDS)."""
+    bucket, key = _parse_s3_path(s3_path)
+    ttl = int(os.getenv('S3_PRESIGN_TTL_SECONDS', '3600'))
+    return _make_s3_client().generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket, 'Key': key},
+        ExpiresIn=ttl,
+    )
+
+
+def _resolve_worker_input(original_input):
+    """Return (video_src, streamed) for the task input.
+
+    In stream mode S3 inputs whose container allows it are handed to ffmpeg as
+    a presigned URL (`streamed=True`); otherwise falls back to
+    `_resolve_worker_path` (full download for S3, mapping for local paths).
+    """
+    if _is_s3_path(original_input) and _input_mode() == INPUT_STREAM:
+        if _s3_input_streamable(original_input):
+            return _presign_s3_get(original_input), True
+        logger.info('Input S3 no seekable para streaming (moov al final o formato no MP4); descargando: %s', original_input)
+    return _resolve_worker_path(original_input), False
+
+
+def _output_mode():
+    """Return the configured S3 output mode (file by default)."""
+    mode = os.getenv('ANB_OUTPUT_MODE', OUTPUT_FILE).strip().lower()
+    if mode not in (OUTPUT_FILE, OUTPUT_PIPE):
+        logger.warning('ANB_OUTPUT_MODE desconocido %r; usando %s', mode, OUTPUT_FILE)
+        return OUTPUT_FILE
+    return mode
+
+
+def _pipe_output_cmd(cmd):
+    """Rewrite an ffmpeg command so it writes fragmented MP4 to stdout instead of a file."""
+    args = list(cmd[:-1])
+    if '-movflags' in args:
+        i = args.index('-movflags')
+        del args[i:i + 2]
+    return args + FRAGMENTED_MP4_ARGS
+
+
+def _run_ffmpeg(cmd, on_progress=None, total=sum):
+    """Run ffmpeg to completion and return (returncode, stderr bytes).
+
+    With `on_progress`, ffmpeg runs with `-progress pipe:1` and the key=value
+    stream on stdout is parsed as it arrives; `on_progress(percent)` receives
+    the encoded time over the expected output duration (input durations read
+    from stderr, each capped at MAIN_MAX_SECONDS, combined with `total`: `sum`
+    for one concatenated output, `max` for one output per input). Only the
+    stderr tail is kept.
+    """
+    if on_progress is None:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return proc.returncode, proc.stderr
+
+    progress_cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+    proc = subprocess.Popen(progress_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_tail = deque(maxlen=STDERR_TAIL_CHUNKS)
+    durations = []
+
+    def _drain_stderr():
+        for _ in _stderr_lines(proc.stderr, stderr_tail, durations):
+            pass
+
+    drain = threading.Thread(target=_drain_stderr, daemon=True)
+    drain.start()
+    try:
+        _parse_progress_stream(proc.stdout, durations, on_progress, total)
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+        drain.join(timeout=5)
+    return returncode, b''.join(stderr_tail)
+
+
+def _stderr_lines(stream, stderr_tail, durations):
+    """Yield ffmpeg stderr lines, recording input durations and the diagnostic tail."""
+    for line in stream:
+        if not FFMPEG_PROGRESS_LINE_RE.match(line):
+            stderr_tail.append(line)
+        match = FFMPEG_DURATION_RE.search(line)
+        if match:
+            h, m, sec = match.groups()
+            durations.append(int(h) * 3600 + int(m) * 60 + float(sec))
+        yield line
+
+
+def _parse_progress_stream(stream, durations, on_progress, total=sum):
+    """Feed `on_progress` from an ffmpeg `-progress` key=value stream."""
+    for raw in stream:
+        key, _, value = raw.strip().partition(b'=')
+        # out_time_ms también viene en microsegundos (nombre histórico de ffmpeg)
+        if key not in (b'out_time_us', b'out_time_ms'):
+            continue
+        capped = [min(d, MAIN_MAX_SECONDS) for d in list(durations)]
+        expected = total(capped) if capped else 0
+        try:
+            encoded = int(value) / 1_000_000
+        except ValueError:
+            continue
+        if expected > 0:
+            try:
+                on_progress(100.0 * encoded / expected)
+            except Exception as e:
+                logger.debug('Callback de progreso falló: %s', e)
+
+
+def _progress_enabled():
+    return os.getenv('ANB_PROGRESS_ENABLED', '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def _write_progress(db_url, video_id, percent):
+    """Mark the video as processing with its progress; failures are only logged."""
+    try:
+        with _db_connection(db_url) as (conn, execute_opts):
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE videos SET status=%s, progress_percent=%s WHERE id=%s AND status<>%s",
+                    ('processing', percent, str(video_id), 'processed'),
+                    **execute_opts,
+                )
+    except Exception as e:
+        logger.warning('No se pudo registrar el progreso del video %s: %s', video_id, e)
+
+
+def _mark_failed(db_url, video_id, reason):
+    """Mark the video as failed so status pollers reach a terminal state; failures are only logged."""
+    if not (video_id and db_url):
+        return
+    try:
+        with _db_connection(db_url) as (conn, execute_opts):
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE videos SET status=%s WHERE id=%s AND status<>%s",
+                    ('failed', str(video_id), 'processed'),
+                    **execute_opts,
+                )
+        logger.error('Video %s marcado como failed: %s', video_id, reason)
+    except Exception as e:
+        logger.warning('No se pudo marcar como failed el video %s: %s', video_id, e)
+
+
+def _make_progress_reporter(video_id, db_url):
+    """Return a throttled `report(percent)` persisting progress, or None when disabled.
+
+    Writes happen only when the integer percentage increases and at most once
+    every ANB_PROGRESS_INTERVAL_SECONDS. Values are capped at 99; 100 is
+    written together with the processed state.
+    """
+    if not (video_id and db_url) or not _progress_enabled():
+        return None
+    interval = float(os.getenv('ANB_PROGRESS_INTERVAL_SECONDS', '2'))
+    state = {'at': None, 'percent': -1}
+
+    def report(percent):
+        percent = max(0, min(99, int(percent)))
+        now = time.monotonic()
+        if percent <= state['percent']:
+            return
+        if state['at'] is not None and now - state['at'] < interval:
+            return
+        state['at'] = now
+        state['percent'] = percent
+        _write_progress(db_url, video_id, percent)
+
+    return report
+
+
+def _run_ffmpeg_to_s3(cmd, s3_path, on_progress=None):
+    """Run ffmpeg with stdout streamed into an S3 multipart upload while it encodes.
+
+    boto3 cuts the non-seekable stdout into `multipart_chunksize` parts and
+    uploads them concurrently with the shared client/TransferConfig. stderr is
+    drained in a thread (keeping only its tail) so ffmpeg never blocks on it.
+    stdout carries the video, so with `on_progress` the `-progress` stream goes
+    to stderr and is parsed there, as in `_run_ffmpeg`.
+    If ffmpeg fails the truncated object is deleted. Returns (returncode, stderr).
+    """
+    bucket, key = _parse_s3_path(s3_path)
+    s3_client = _make_s3_client()
+
+    if on_progress is not None:
+        cmd = [cmd[0], '-progress', 'pipe:2', '-nostats', *cmd[1:]]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_tail = deque(maxlen=STDERR_TAIL_CHUNKS)
+    durations = []
+
+    def _drain_stderr():
+        lines = _stderr_lines(proc.stderr, stderr_tail, durations)
+        if on_progress is None:
+            for _ in lines:
+                pass
+        else:
+            _parse_progress_stream(lines, durations, on_progress)
+
+    drain = threading.Thread(target=_drain_stderr, daemon=True)
+    drain.start()
+
+    upload_error = None
+    try:
+        s3_client.upload_fileobj(
+            proc.stdout,
+            bucket,
+            key,
+            ExtraArgs={'ContentType': 'video/mp4'},
+            Config=_make_s3_transfer_config(),
+        )
+    except Exception as e:
+        upload_error = e
+        proc.kill()
+    finally:
+        proc.stdout.close()
+    returncode = proc.wait()
+    drain.join(timeout=5)
+    stderr = b''.join(stderr_tail)
+
+    if upload_error is not None:
+        logger.error('Error subiendo a S3 en streaming: %s', upload_error)
+        raise RuntimeError(f'No se pudo subir a S3: {s3_path}') from upload_error
+    if returncode != 0:
+        try:
+            s3_client.delete_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            logger.warning('No se pudo eliminar output parcial %s: %s', s3_path, e)
+        return returncode, stderr
+
+    logger.info('Subido a S3 durante la codificación: %s', s3_path)
+    return returncode, stderr
+
+
 def _resolve_worker_path(original_input):
     """Return Path para worker-local source, descargando desde S3 si es necesario."""
     if _is_s3_path(original_input):
@@ -247,7 +620,7 @@ def _scaled_label(src_idx, name, trim_main=False):
     """Return the ffmpeg scale/trim filter label for a given src index and name."""
     if trim_main:
         return (
-            f'[{src_idx}:v]trim=0:30,setpts=PTS-STARTPTS,'
+            f'[{src_idx}:v]trim=0:{MAIN_MAX_SECONDS},setpts=PTS-STARTPTS,'
             'scale=1280:720:force_original_aspect_ratio=decrease,'
             'pad=1280:720:(ow-iw)/2:(oh-ih)/2,setsar=1'
             f'[{name}_s]'
@@ -259,6 +632,22 @@ def _scaled_label(src_idx, name, trim_main=False):
     )
 
 
+def _input_args(path, *, is_main=False):
+    """Return the ffmpeg arguments that declare one input.
+
+    The main clip is limited with `-t` at the input so ffmpeg stops reading
+    (and, for URL inputs, stops fetching byte ranges) after the trimmed window.
+    URL inputs get reconnect flags for transient network errors.
+    """
+    args = []
+    if is_main:
+        args.extend(['-t', str(MAIN_MAX_SECONDS)])
+    if _is_url(path):
+        args.extend(['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5'])
+    args.extend(['-i', str(path)])
+    return args
+
+
 def _build_overlay_filters(idx_intro, idx_outro, idx_wm):
     """Return list of overlay filter strings when watermark index is provided."""
     parts = []
@@ -312,8 +701,8 @@ def _build_filter_and_cmd(inputs, idx_intro, idx_main, idx_outro, idx_wm, overla
 
     # Build ffmpeg command
     cmd = ['ffmpeg', '-y']
-    for p in inputs:
-        cmd.extend(['-i', p])
+    for i, p in enumerate(inputs):
+        cmd.extend(_input_args(p, is_main=i == idx_main))
 
     cmd.extend(['-filter_complex', filter_complex])
 
@@ -322,28 +711,309 @@ def _build_filter_and_cmd(inputs, idx_intro, idx_main, idx_outro, idx_wm, overla
     else:
         cmd.extend(['-map', '[v]'])
 
-    ff_threads = os.getenv('FFMPEG_THREADS', '2')        
-    ff_preset  = os.getenv('FFMPEG_PRESET', 'ultrafast') 
-    ff_crf     = os.getenv('FFMPEG_CRF', '25') 
-
     out_file = tmpdir / 'output.mp4'
-    cmd.extend([
-        '-c:v', 'libx264',
-        '-preset', ff_preset,
-        '-crf', ff_crf,
-        '-pix_fmt', 'yuv420p',
-        '-an',
-        '-threads', ff_threads,
-        str(out_file)
-    ])
+    cmd.extend(_encoder_args(_encoder_settings()))
+    cmd.append(str(out_file))
 
     return cmd, out_file
 
 
-def _compute_output_path(original_input, processed_dir, video_src):
+def _encoder_settings():
+    """Return the active encoder profile settings (see app.encoder_profiles).
+
+    With the adaptive concurrency controller on, its thread count replaces the
+    profile's unless FFMPEG_THREADS is set explicitly.
+    """
+    settings = encoder_profiles.encoder_settings()
+    if concurrency.enabled() and not os.getenv('FFMPEG_THREADS'):
+        hint = concurrency.thread_hint()
+        if hint:
+            settings['threads'] = hint
+    return settings
+
+
+def _encoder_args(settings):
+    """Return the encoder output arguments shared by every encode in the worker."""
+    return encoder_profiles.encoder_args(settings)
+
+
+def _encoder_material(settings):
+    """Settings that determine the encoded bytes (threads and the profile name do not)."""
+    return {k: v for k, v in settings.items() if k not in ('threads', 'profile')}
+
+
+def _pipeline_mode():
+    """Return the configured pipeline mode, falling back to the single filter graph."""
+    mode = os.getenv('ANB_PIPELINE_MODE', PIPELINE_FILTERGRAPH).strip().lower()
+    if mode not in (PIPELINE_FILTERGRAPH, PIPELINE_CONCAT):
+        logger.warning('ANB_PIPELINE_MODE desconocido %r; usando %s', mode, PIPELINE_FILTERGRAPH)
+        return PIPELINE_FILTERGRAPH
+    return mode
+
+
+@lru_cache(maxsize=32)
+def _file_digest_cached(path, size, mtime_ns):
+    """SHA-256 of a file; cached per (path, size, mtime) so assets are hashed once per process."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_digest(path):
+    """Return the SHA-256 hex digest of `path`."""
+    st = os.stat(path)
+    return _file_digest_cached(str(path), st.st_size, st.st_mtime_ns)
+
+
+def _asset_digest(path):
+    """SHA-256 of an optional asset, or None when it is not configured or not readable."""
+    if not path:
+        return None
+    try:
+        return _file_digest(path)
+    except OSError:
+        return None
+
+
+def _segment_fps():
+    """Frame rate every segment is normalized to so the concat demuxer can stream-copy them."""
+    return os.getenv('ANB_SEGMENT_FPS', '30')
+
+
+def _segment_cache_dir():
+    """Directory holding the pre-rendered intro/outro segments."""
+    default = Path(tempfile.gettempdir()) / 'anb_segments'
+    return Path(os.getenv('ANB_SEGMENT_CACHE_DIR', str(default)))
+
+
+def _segment_cache_key(asset_path, watermark_path, settings):
+    """Cache key for a rendered segment: asset + watermark content and encoder settings.
+
+    Threads and the profile name are excluded because they do not change the output.
+    """
+    material = {
+        'asset': _file_digest(asset_path),
+        'watermark': _file_digest(watermark_path) if watermark_path else None,
+        'encoder': _encoder_material(settings),
+        'fps': _segment_fps(),
+        'timescale': SEGMENT_TIMESCALE,
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _build_segment_cmd(src, watermark_path, out_file, *, trim_main, settings):
+    """Return the ffmpeg command that renders one 1280x720 watermarked segment.
+
+    Intro/outro and the main clip share this command shape (same filters, fps,
+    encoder and timescale) so their streams can be joined with `-c copy`.
+    """
+    fc_parts = [
+        _scaled_label(0, 'seg', trim_main=trim_main),
+        f'[seg_s]fps={_segment_fps()}[seg_f]',
+    ]
+    out_label = 'seg_f'
+    cmd = ['ffmpeg', '-y']
+    cmd.extend(_input_args(src, is_main=trim_main))
+    if watermark_path:
+        cmd.extend(['-i', str(watermark_path)])
+        fc_parts.append('[seg_f][1:v]overlay=main_w-overlay_w-10:10[seg_w]')
+        out_label = 'seg_w'
+
+    cmd.extend(['-filter_complex', ';'.join(fc_parts), '-map', f'[{out_label}]'])
+    cmd.extend(_encoder_args(settings))
+    cmd.extend(['-video_track_timescale', SEGMENT_TIMESCALE, str(out_file)])
+    return cmd
+
+
+def _ensure_rendered_segment(asset_path, watermark_path, settings):
+    """Return the cached rendered segment for `asset_path`, rendering it on a cache miss.
+
+    The render goes to a per-process temporary name and is published with an
+    atomic rename, so concurrent workers never see a partial file.
+    """
+    cache_dir = _segment_cache_dir()
+    key = _segment_cache_key(asset_path, watermark_path, settings)
+    target = cache_dir / f'segment_{key[:32]}.mp4'
+    if target.exists():
+        logger.debug('Segmento pre-renderizado en cache: %s', target)
+        return target
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    partial = cache_dir / f'.{target.stem}.{os.getpid()}.partial.mp4'
+    cmd = _build_segment_cmd(asset_path, watermark_path, partial, trim_main=False, settings=settings)
+    render_start = time.monotonic()
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        logger.error('ffmpeg failed rendering segment: %s', proc.stderr.decode('utf-8', errors='ignore'))
+        try:
+            partial.unlink()
+        except OSError:
+            pass
+        raise RuntimeError(f'ffmpeg failed rendering segment for {asset_path}')
+    os.replace(partial, target)
+    logger.info('Segmento pre-renderizado %s -> %s (%.1f ms)', asset_path, target, _elapsed_ms(render_start))
+    return target
+
+
+def _concat_list_line(path):
+    """Return a concat demuxer `file` directive with single quotes escaped."""
+    escaped = str(path).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+
+def _build_concat_cmds(video_src, intro_path, outro_path, watermark_path, tmpdir):
+    """Return (cmds, out_file) for the pre-rendered segments + stream-copy concat mode.
+
+    Only the trimmed main clip is encoded per task; intro/outro come from the
+    segment cache (rendered once per asset hash and encoder settings). Pass
+    None for assets that are not present.
+    """
+    settings = _encoder_settings()
+    out_file = tmpdir / 'output.mp4'
+
+    segments = []
+    if intro_path:
+        segments.append(_ensure_rendered_segment(intro_path, watermark_path, settings))
+    main_file = tmpdir / 'main.mp4' if segments or outro_path else out_file
+    segments.append(main_file)
+    if outro_path:
+        segments.append(_ensure_rendered_segment(outro_path, watermark_path, settings))
+
+    cmds = [_build_segment_cmd(video_src, watermark_path, main_file, trim_main=True, settings=settings)]
+    if len(segments) == 1:
+        return cmds, out_file
+
+    cmds.append(_concat_cmd(segments, tmpdir, out_file))
+    return cmds, out_file
+
+
+def _concat_cmd(segments, tmpdir, out_file):
+    """Return the stream-copy concat demuxer command joining `segments` into `out_file`."""
+    list_file = tmpdir / 'concat.txt'
+    list_file.write_text(''.join(_concat_list_line(p) for p in segments), encoding='utf-8')
+    return [
+        'ffmpeg', '-y',
+        '-f', 'concat', '-safe', '0',
+        '-i', str(list_file),
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        str(out_file),
+    ]
+
+
+def _pipeline_fingerprint(inout_path, watermark_path):
+    """Digest of everything besides the input that determines the processed output.
+
+    Two tasks with the same input content and the same fingerprint produce an
+    equivalent video, so the second one can reuse the first one's output.
+    """
+    material = {
+        'pipeline': _pipeline_mode(),
+        'encoder': _encoder_material(_encoder_settings()),
+        'max_seconds': MAIN_MAX_SECONDS,
+        'inout': _asset_digest(inout_path),
+        'watermark': _asset_digest(watermark_path),
+    }
+    if material['pipeline'] == PIPELINE_CONCAT:
+        material['fps'] = _segment_fps()
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _sync_dsn(db_url):
+    """Convert the SQLAlchemy asyncpg DSN used by core into a psycopg one."""
+    if db_url.startswith('postgresql+asyncpg://'):
+        return db_url.replace('postgresql+asyncpg://', 'postgresql://', 1)
+    return db_url
+
+
+@contextmanager
+def _db_connection(db_url):
+    """Yield (connection, execute options) for a short autocommit DB operation.
+
+    Inside a worker process with pooling enabled (see app/db_pool.py) the
+    connection is borrowed from the per-process pool and statements are sent
+    as server-side prepared statements; otherwise a one-off connection is used.
+    """
+    dsn = _sync_dsn(db_url)
+    pool = db_pool.get_pool(dsn)
+    if pool is None:
+        with psycopg.connect(dsn, autocommit=True) as conn:
+            yield conn, {}
+        return
+    try:
+        with pool.connection() as conn:
+            yield conn, {'prepare': True}
+    finally:
+        db_pool.publish_stats()
+
+
+def _find_processed_duplicate(db_url, video_id, content_sha256, fingerprint):
+    """Return the processed_path of another video with the same content and pipeline fingerprint.
+
+    Lookup failures are logged and treated as a miss: deduplication is only an
+    optimization and must never fail the task.
+    """
+    if not (content_sha256 and db_url):
+        return None
+    try:
+        with _db_connection(db_url) as (conn, execute_opts):
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT processed_path FROM videos WHERE content_sha256=%s AND pipeline_fingerprint=%s "
+                    "AND status=%s AND processed_path IS NOT NULL AND id<>%s LIMIT 1",
+                    (content_sha256, fingerprint, 'processed', str(video_id)),
+                    **execute_opts,
+                )
+                row = cur.fetchone()
+    except Exception as e:
+        logger.warning('Búsqueda de duplicado falló para video id=%s: %s', video_id, e)
+        return None
+    return row[0] if row else None
+
+
+def _reuse_processed_output(existing_path, original_input, processed_dir, video_id):
+    """Return the processed path for a deduplicated task.
+
+    By default the existing object is shared. With ANB_DEDUP_COPY=1 it is
+    copied (server-side for S3) to the path this task would have produced.
+    """
+    if not bool(int(os.getenv('ANB_DEDUP_COPY', '0'))):
+        return existing_path
+
+    own_path = _compute_output_path(original_input, processed_dir, Path(str(original_input)), video_id)
+    if own_path == existing_path:
+        return existing_path
+    if _is_s3_path(existing_path) and _is_s3_path(own_path):
+        src_bucket, src_key = _parse_s3_path(existing_path)
+        dst_bucket, dst_key = _parse_s3_path(own_path)
+        _make_s3_client().copy(
+            {'Bucket': src_bucket, 'Key': src_key},
+            dst_bucket,
+            dst_key,
+            Config=_make_s3_transfer_config(),
+        )
+    else:
+        _ensure_parent_dir(own_path)
+        shutil.copyfile(existing_path, own_path)
+    logger.info('Output deduplicado copiado %s -> %s', existing_path, own_path)
+    return own_path
+
+
+def _per_video(rel, video_id):
+    """Insert the video id as the last directory: 'a/b/clip.mp4' -> 'a/b/<video_id>/clip.mp4'."""
+    rel = PurePosixPath(rel)
+    return (rel.parent / str(video_id) / rel.name).as_posix()
+
+
+def _compute_output_path(original_input, processed_dir, video_src, video_id):
     """Compute output path (string). If input is S3, return an S3 URL string.
 
     For local inputs return a filesystem path string under `processed_dir`.
+    The path mirrors the input one plus a `<video_id>/` directory: core
+    deduplication lets several videos share one original, and each of them
+    must own its output (re-encoding one must never overwrite another's).
     """
     input_str = str(original_input)
 
@@ -354,14 +1024,14 @@ def _compute_output_path(original_input, processed_dir, video_src):
             processed_key = key.replace('uploads/', 'processed/', 1)
         else:
             processed_key = f'processed/{key}'
-        return f"s3://{bucket}/{processed_key}"
+        return f"s3://{bucket}/{_per_video(processed_key, video_id)}"
 
     # Local: construir path bajo processed_dir y devolver como string
     if input_str.startswith(MNT_UPLOADS_PREFIX):
         rel = input_str[len(MNT_UPLOADS_PREFIX):]
         rel = rel.lstrip('/')
-        return (Path(processed_dir) / rel).as_posix()
-    return (Path(processed_dir) / video_src.name).as_posix()
+        return (Path(processed_dir) / _per_video(rel, video_id)).as_posix()
+    return (Path(processed_dir) / _per_video(video_src.name, video_id)).as_posix()
 
 
 def _ensure_parent_dir(path: str | Path):
@@ -395,27 +1065,309 @@ def _ensure_parent_dir(path: str | Path):
         raise
 
 
-def _update_db_if_needed(video_id, correlation_id, output_str, db_url):
+def _store_output(out_file, output_path, *, correlation_id=None, video_id=None):
+    """Upload (S3) or move (local) the encoded file to its final location and return that location."""
+    transfer_start = time.monotonic()
+    if _is_s3_path(output_path):
+        _upload_to_s3(out_file, output_path)
+        logger.info('Subido archivo procesado a S3: %s', output_path)
+        _log_visibility(
+            'upload_s3_completed',
+            correlation_id=correlation_id,
+            video_id=video_id,
+            destination=output_path,
+            duration_ms=_elapsed_ms(transfer_start),
+        )
+        # Limpiar archivo local después de subir
+        try:
+            out_file.unlink()
+        except Exception as e:
+            logger.warning('No se pudo eliminar archivo temporal %s: %s', out_file, e)
+    else:
+        shutil.move(str(out_file), output_path)
+        logger.info('Moved processed file to %s', output_path)
+        _log_visibility(
+            'output_moved',
+            correlation_id=correlation_id,
+            video_id=video_id,
+            destination=output_path,
+            duration_ms=_elapsed_ms(transfer_start),
+        )
+    return output_path
+
+
+def _cleanup_s3_download(original_input):
+    """Remove the local copy `_resolve_worker_path` downloaded for an S3 input, if any."""
+    try:
+        if not _is_s3_path(original_input):
+            return
+        _, key = _parse_s3_path(original_input)
+        filename = key.split('/')[-1] if '/' in key else key
+        s3_download_path = Path(tempfile.gettempdir()) / f"s3_download_{filename}"
+        if s3_download_path.exists():
+            try:
+                s3_download_path.unlink()
+                logger.debug('Eliminado archivo temporal descargado de S3: %s', s3_download_path)
+            except Exception as e:
+                logger.warning('No se pudo eliminar archivo descargado de S3 %s: %s', s3_download_path, e)
+    except Exception:
+        pass
+
+
+def _update_db_if_needed(video_id, correlation_id, output_str, db_url, fingerprint=None):
     """Update DB if video_id and db_url are provided; convert async dsn if needed."""
     if not (video_id and db_url):
         return
-    if db_url.startswith('postgresql+asyncpg://'):
-        db_url = db_url.replace('postgresql+asyncpg://', 'postgresql://', 1)
-
     logger.info(
         'Updating DB for video id=%s correlation_id=%s processed_path=%s',
         video_id,
         correlation_id,
         output_str,
     )
-    with psycopg.connect(db_url, autocommit=True) as conn:
+    with _db_connection(db_url) as (conn, execute_opts):
         with conn.cursor() as cur:
             cur.execute(
-                "UPDATE videos SET status=%s, processed_path=%s, processed_at=now(), correlation_id=%s WHERE id=%s",
-                ('processed', output_str, correlation_id, str(video_id))
+                "UPDATE videos SET status=%s, processed_path=%s, processed_at=now(), correlation_id=%s, "
+                "pipeline_fingerprint=%s, progress_percent=100 WHERE id=%s",
+                ('processed', output_str, correlation_id, fingerprint, str(video_id)),
+                **execute_opts,
             )
             if cur.rowcount == 0:
                 logger.warning('No rows updated for video id=%s', video_id)
+                return
+            _notify_video_processed(cur, video_id, execute_opts)
+
+
+def _notify_video_processed(cur, video_id, execute_opts):
+    """NOTIFY the API replicas (public cache invalidation); never fails the task."""
+    channel = os.getenv('ANB_PUBLIC_NOTIFY_CHANNEL', 'anb_public_videos')
+    if not channel:
+        return
+    try:
+        cur.execute('SELECT pg_notify(%s, %s)', (channel, str(video_id)), **execute_opts)
+    except Exception as e:
+        logger.warning('pg_notify failed for video id=%s: %s', video_id, e)
+
+
+def _batch_size():
+    """Maximum number of videos encoded by one ffmpeg process (ANB_BATCH_SIZE, 1 disables batching)."""
+    try:
+        return max(1, int(os.getenv('ANB_BATCH_SIZE', '1')))
+    except ValueError:
+        return 1
+
+
+def _build_batch_encode_cmd(sources, watermark_path, out_files, settings):
+    """Return one ffmpeg command that encodes several main clips, one output file per clip.
+
+    Each output has the same shape as `_build_segment_cmd(trim_main=True)`, so it
+    can be joined with the cached intro/outro segments in stream-copy mode. The
+    watermark is read once and split across the outputs.
+    """
+    count = len(sources)
+    cmd = ['ffmpeg', '-y']
+    for src in sources:
+        cmd.extend(_input_args(src, is_main=True))
+
+    fc_parts = []
+    if watermark_path:
+        cmd.extend(['-i', str(watermark_path)])
+        fc_parts.append(f'[{count}:v]split={count}' + ''.join(f'[wm{i}]' for i in range(count)))
+
+    out_labels = []
+    for i in range(count):
+        fc_parts.append(_scaled_label(i, f'b{i}', trim_main=True))
+        fc_parts.append(f'[b{i}_s]fps={_segment_fps()}[b{i}_f]')
+        label = f'b{i}_f'
+        if watermark_path:
+            fc_parts.append(f'[b{i}_f][wm{i}]overlay=main_w-overlay_w-10:10[b{i}_w]')
+            label = f'b{i}_w'
+        out_labels.append(label)
+
+    cmd.extend(['-filter_complex', ';'.join(fc_parts)])
+    for label, out_file in zip(out_labels, out_files):
+        cmd.extend(['-map', f'[{label}]'])
+        cmd.extend(_encoder_args(settings))
+        cmd.extend(['-video_track_timescale', SEGMENT_TIMESCALE, str(out_file)])
+    return cmd
+
+
+def _prepare_batch_job(pending, db_url, fingerprint, processed_dir):
+    """Turn a message drained from SQS into a batch job.
+
+    Returns None when the message was already completed here (deduplicated
+    content). Raises when its input cannot be resolved; the caller releases it.
+    """
+    video_id, input_path, correlation_id = _parse_task_args(pending.args, pending.kwargs)
+    if not input_path:
+        raise ValueError('mensaje sin input_path')
+
+    duplicate = _find_processed_duplicate(db_url, video_id, pending.kwargs.get('content_sha256'), fingerprint)
+    if duplicate:
+        output_str = _reuse_processed_output(duplicate, input_path, processed_dir, video_id)
+        _update_db_if_needed(video_id, correlation_id, output_str, db_url, fingerprint)
+        sqs_batch.ack(pending)
+        _log_visibility('task_deduplicated', correlation_id=correlation_id, video_id=video_id, output=output_str)
+        return None
+
+    video_src, streamed = _resolve_worker_input(input_path)
+    if not streamed and not Path(video_src).exists():
+        raise FileNotFoundError(f'Input not found: {input_path}')
+    # Igual que la tarea líder: `processing` visible desde que el mensaje entra al lote
+    report_progress = _make_progress_reporter(video_id, db_url)
+    if report_progress:
+        report_progress(0)
+    return {
+        'video_id': video_id,
+        'input_path': input_path,
+        'correlation_id': correlation_id,
+        'video_src': video_src,
+        'pending': pending,
+        'report_progress': report_progress,
+    }
+
+
+def _finish_batch_job(job, main_file, before, after, workdir, db_url, fingerprint, processed_dir):
+    """Join one encoded main clip with the cached segments, store it and mark the video processed."""
+    output_path = _compute_output_path(job['input_path'], processed_dir, job['video_src'], job['video_id'])
+    _ensure_parent_dir(output_path)
+    out_file = main_file
+    if before or after:
+        workdir.mkdir(parents=True, exist_ok=True)
+        out_file = workdir / 'output.mp4'
+        returncode, stderr = _run_ffmpeg(_concat_cmd([*before, main_file, *after], workdir, out_file))
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg concat failed: {stderr.decode('utf-8', errors='ignore')[-500:]}")
+    output_str = _store_output(out_file, output_path, correlation_id=job['correlation_id'], video_id=job['video_id'])
+    _update_db_if_needed(job['video_id'], job['correlation_id'], output_str, db_url, fingerprint)
+    return output_str
+
+
+def _encode_mains(jobs, watermark_path, main_files, settings):
+    """Encode the main clips of `jobs` into `main_files` with one ffmpeg process; raise on failure.
+
+    Progress is reported to every job of the process: each output is one main
+    clip, so the expected duration is the longest clip rather than the sum.
+    """
+    reporters = [job['report_progress'] for job in jobs if job.get('report_progress')]
+
+    def report(percent):
+        for reporter in reporters:
+            reporter(percent)
+
+    cmd = _build_batch_encode_cmd([job['video_src'] for job in jobs], watermark_path, main_files, settings)
+    returncode, stderr = _run_ffmpeg(cmd, on_progress=report if reporters else None, total=max)
+    if returncode != 0:
+        raise RuntimeError(stderr.decode('utf-8', errors='ignore')[-500:])
+
+
+def _release_pending(pending, video_id, db_url, reason):
+    """Return a drained message to the queue.
+
+    On its last receive the redrive policy moves it to the DLQ instead of
+    redelivering it, so the video is marked `failed` first, as the last Celery
+    retry does.
+    """
+    if pending.last_receive:
+        _mark_failed(db_url, video_id, reason)
+    sqs_batch.release(pending)
+
+
+def _release_batch_job(job, db_url, reason):
+    _cleanup_s3_download(job['input_path'])
+    _release_pending(job['pending'], job['video_id'], db_url, reason)
+
+
+def _run_batch(leader, *, intro_path, outro_path, watermark_path, fingerprint, db_url, processed_dir, tmpdir):
+    """Encode the leader task together with other pending messages in a single ffmpeg process.
+
+    Returns the leader's output, or None when there was nothing to batch or the
+    shared encode failed (the leader then takes the regular path). When the
+    shared encode fails each drained message is encoded on its own, so one
+    corrupt input only spends its own SQS receives instead of pushing healthy
+    videos towards the DLQ. Drained messages are acked or released one by one;
+    a failure finishing the leader is raised after the others finish.
+    """
+    jobs = [leader]
+    for pending in sqs_batch.drain_pending_runs(_batch_size() - 1):
+        try:
+            job = _prepare_batch_job(pending, db_url, fingerprint, processed_dir)
+        except Exception as e:
+            logger.warning('Mensaje %s no se agrega al lote; se libera: %s', pending.task_id, e)
+            try:
+                video_id, input_path, _ = _parse_task_args(pending.args, pending.kwargs)
+            except Exception:
+                video_id = input_path = None
+            if input_path:
+                _cleanup_s3_download(input_path)
+            _release_pending(pending, video_id, db_url, e)
+            continue
+        if job:
+            jobs.append(job)
+    if len(jobs) == 1:
+        return None
+
+    settings = _encoder_settings()
+    main_files = [tmpdir / f'main_{i}.mp4' for i in range(len(jobs))]
+    try:
+        before = [_ensure_rendered_segment(intro_path, watermark_path, settings)] if intro_path else []
+        after = [_ensure_rendered_segment(outro_path, watermark_path, settings)] if outro_path else []
+    except Exception as e:
+        # No depende de ningún mensaje en particular: se devuelven todos a la cola
+        logger.error('No se pudieron renderizar intro/outro del lote; se liberan los mensajes: %s', e)
+        for job in jobs[1:]:
+            _release_batch_job(job, db_url, e)
+        return None
+
+    encode_start = time.monotonic()
+    try:
+        _encode_mains(jobs, watermark_path, main_files, settings)
+        encoded = list(enumerate(jobs))
+    except Exception as e:
+        logger.error('ffmpeg batch failed; cada video se codifica por separado: %s', e)
+        encoded = []
+        for i, job in enumerate(jobs[1:], start=1):
+            try:
+                _encode_mains([job], watermark_path, [main_files[i]], settings)
+            except Exception as job_error:
+                logger.error('ffmpeg falló para el video %s; se libera: %s', job['video_id'], job_error)
+                _release_batch_job(job, db_url, job_error)
+                continue
+            encoded.append((i, job))
+    _log_visibility(
+        'ffmpeg_batch_completed',
+        correlation_id=leader['correlation_id'],
+        video_id=leader['video_id'],
+        videos=len(encoded),
+        duration_ms=_elapsed_ms(encode_start),
+    )
+
+    leader_output = None
+    leader_error = None
+    for i, job in encoded:
+        try:
+            output_str = _finish_batch_job(
+                job, main_files[i], before, after, tmpdir / f'job_{i}', db_url, fingerprint, processed_dir,
+            )
+        except Exception as e:
+            logger.error('Falló la finalización del video %s en el lote: %s', job['video_id'], e)
+            if job is leader:
+                leader_error = e
+            else:
+                _release_pending(job['pending'], job['video_id'], db_url, e)
+            continue
+        finally:
+            if job is not leader:
+                _cleanup_s3_download(job['input_path'])
+        if job is leader:
+            leader_output = output_str
+        else:
+            sqs_batch.ack(job['pending'])
+            _log_visibility('task_completed', correlation_id=job['correlation_id'], video_id=job['video_id'],
+                            output=output_str, batched=True)
+    if leader_error is not None:
+        raise leader_error
+    return leader_output
 
 
 @shared_task(
@@ -439,6 +1391,18 @@ def run(self, *args, **kwargs):
     The task reads asset paths from env vars:
       ANB_INTRO_PATH, ANB_OUTRO_PATH, ANB_WATERMARK_PATH
 
+    The optional `content_sha256` kwarg (sent by core) enables reusing the
+    output of an already processed video with the same content and pipeline
+    fingerprint instead of running ffmpeg again.
+
+    ANB_PIPELINE_MODE selects how ffmpeg is driven: 'filtergraph' (default,
+    single filter graph) or 'concat' (cached pre-rendered intro/outro joined
+    to the encoded main clip in stream-copy mode).
+
+    With ANB_BATCH_SIZE > 1 (concat mode only) the task also takes other
+    pending messages from SQS and encodes all main clips in one ffmpeg
+    process; each taken message is acked or released on its own.
+
     The implementation uses ffmpeg called via subprocess.
     """
 
@@ -475,14 +1439,60 @@ def run(self, *args, **kwargs):
 
     # Keep original incoming path (from API message) for later mirroring
     original_input = input_path
+    processed_dir = os.getenv('PROCESSED_DIR', '/app/storage/processed')
+
+    # intro and outro are the same asset (INOUT)
+    # If env vars are not provided, default to the assets folder inside the worker container
+    # Ambos aceptan s3://bucket/key: se descargan una vez al cache local del worker
+    try:
+        inout_path = _resolve_asset_path(os.getenv('ANB_INOUT_PATH', '/app/assets/inout.mp4'))
+        watermark_path = _resolve_asset_path(os.getenv('ANB_WATERMARK_PATH', '/app/assets/watermark.png'))
+    except Exception as e:
+        logger.error('No se pudieron obtener los assets del pipeline: %s', e)
+        _raise_retry(task_self, e, countdown=30, video_id=video_id, db_url=db_url_env)
+    intro_path = inout_path
+    outro_path = inout_path
+
+    logger.info('Using assets: inout=%s watermark=%s', inout_path, watermark_path)
+
+    # Deduplicación: si ya existe un output para el mismo contenido y la misma configuración
+    # del pipeline, se reutiliza sin descargar ni ejecutar ffmpeg
+    content_sha256 = kwargs.get('content_sha256')
+    fingerprint = _pipeline_fingerprint(inout_path, watermark_path)
+    duplicate = _find_processed_duplicate(db_url_env, video_id, content_sha256, fingerprint)
+    output_str = None
+    if duplicate:
+        try:
+            output_str = _reuse_processed_output(duplicate, original_input, processed_dir, video_id)
+        except Exception as e:
+            logger.warning('No se pudo reutilizar output %s; se procesa normalmente: %s', duplicate, e)
+    if output_str:
+        _update_db_if_needed(video_id, correlation_id, output_str, db_url_env, fingerprint)
+        _log_visibility(
+            'task_deduplicated',
+            correlation_id=correlation_id,
+            video_id=video_id,
+            content_sha256=content_sha256,
+            output=output_str,
+        )
+        return {"status": "ok", "output": output_str, "deduplicated": True}
+
+    # Estado `processing` visible para el cliente desde que empieza el trabajo real
+    report_progress = _make_progress_reporter(video_id, db_url_env)
+    if report_progress:
+        report_progress(0)
+
     resolve_start = time.monotonic()
-    video_src = _resolve_worker_path(original_input)
+    video_src, streamed = _resolve_worker_input(original_input)
+    # No registrar la URL prefirmada (incluye firma); basta con la ruta S3 original
+    resolved_display = f'stream:{original_input}' if streamed else str(video_src)
     _log_visibility(
         'input_resolved',
         correlation_id=correlation_id,
         video_id=video_id,
         original_path=str(original_input),
-        resolved_path=str(video_src),
+        resolved_path=resolved_display,
+        streamed=streamed,
         duration_ms=_elapsed_ms(resolve_start),
     )
 
@@ -490,22 +1500,14 @@ def run(self, *args, **kwargs):
     logger.info(
         'Input original path=%s ; worker-resolved path=%s ; video_id=%s ; correlation_id=%s',
         original_input,
-        video_src,
+        resolved_display,
         video_id,
         correlation_id,
     )
-    if not video_src.exists():
+    if not streamed and not video_src.exists():
         logger.error('Input video not found: %s (resolved=%s)', original_input, video_src)
-        raise task_self.retry(exc=FileNotFoundError(f'Input not found: {original_input}'), countdown=10, max_retries=2)
-
-    # intro and outro are the same asset (INOUT)
-    # If env vars are not provided, default to the assets folder inside the worker container
-    inout_path = os.getenv('ANB_INOUT_PATH', '/app/assets/inout.mp4')
-    intro_path = inout_path
-    outro_path = inout_path
-    watermark_path = os.getenv('ANB_WATERMARK_PATH', '/app/assets/watermark.png')
-
-    logger.info('Using assets: inout=%s watermark=%s', inout_path, watermark_path)
+        _raise_retry(task_self, FileNotFoundError(f'Input not found: {original_input}'), countdown=10,
+                     video_id=video_id, db_url=db_url_env)
 
     tmpdir = Path(tempfile.mkdtemp(prefix='proc_'))
     logger.info(
@@ -523,7 +1525,36 @@ def run(self, *args, **kwargs):
     )
 
     try:
-        # Process without tracing
+            # Modo lote: esta tarea codifica junto con otros mensajes pendientes en un solo ffmpeg
+            if _batch_size() > 1 and _pipeline_mode() == PIPELINE_CONCAT:
+                leader = {
+                    'video_id': video_id,
+                    'input_path': original_input,
+                    'correlation_id': correlation_id,
+                    'video_src': video_src,
+                    'report_progress': report_progress,
+                }
+                batch_output = _run_batch(
+                    leader,
+                    intro_path=intro_path if intro_path and Path(intro_path).exists() else None,
+                    outro_path=outro_path if outro_path and Path(outro_path).exists() else None,
+                    watermark_path=watermark_path if watermark_path and Path(watermark_path).exists() else None,
+                    fingerprint=fingerprint,
+                    db_url=db_url_env,
+                    processed_dir=processed_dir,
+                    tmpdir=tmpdir,
+                )
+                if batch_output:
+                    _log_visibility(
+                        'task_completed',
+                        correlation_id=correlation_id,
+                        video_id=video_id,
+                        output=batch_output,
+                        batched=True,
+                    )
+                    return {"status": "ok", "output": batch_output, "batched": True}
+
+            # Process without tracing
             # Gather inputs and determine stream indices
             gather_start = time.monotonic()
             inputs, idx_intro, idx_main, idx_outro, idx_wm, overlay_labels = _gather_inputs(
@@ -539,39 +1570,32 @@ def run(self, *args, **kwargs):
                 watermark_enabled=idx_wm is not None,
             )
 
-            # Build ffmpeg command and filter_complex
-            cmd, out_file = _build_filter_and_cmd(inputs, idx_intro, idx_main, idx_outro, idx_wm, overlay_labels, tmpdir)
+            # Build ffmpeg command(s): single filter_complex or pre-rendered segments + concat
+            pipeline_mode = _pipeline_mode()
+            if pipeline_mode == PIPELINE_CONCAT:
+                cmds, out_file = _build_concat_cmds(
+                    video_src,
+                    intro_path if idx_intro is not None else None,
+                    outro_path if idx_outro is not None else None,
+                    watermark_path if idx_wm is not None else None,
+                    tmpdir,
+                )
+            else:
+                cmd, out_file = _build_filter_and_cmd(inputs, idx_intro, idx_main, idx_outro, idx_wm, overlay_labels, tmpdir)
+                cmds = [cmd]
             _log_visibility(
                 'ffmpeg_command_ready',
                 correlation_id=correlation_id,
                 video_id=video_id,
                 inputs=len(inputs),
+                pipeline_mode=pipeline_mode,
+                commands=len(cmds),
                 tmp_output=str(out_file),
             )
 
-            # Run and capture output
-            ffmpeg_start = time.monotonic()
-            proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if proc.returncode != 0:
-                logger.error('ffmpeg failed: %s', proc.stderr.decode('utf-8', errors='ignore'))
-                raise task_self.retry(exc=RuntimeError('ffmpeg failed'), countdown=30, max_retries=2)
-            _log_visibility(
-                'ffmpeg_completed',
-                correlation_id=correlation_id,
-                video_id=video_id,
-                duration_ms=_elapsed_ms(ffmpeg_start),
-                tmp_output=str(out_file),
-            )
-
-            # At this point, out_file should exist
-            if not out_file.exists():
-                logger.error('Expected output not found at %s', out_file)
-                raise task_self.retry(exc=RuntimeError('output missing'), countdown=10, max_retries=2)
-
             # Compute final processed path by mirroring uploads -> processed
             # Use PROCESSED_DIR (shared storage with API) as base for processed files.
-            processed_dir = os.getenv('PROCESSED_DIR', '/app/storage/processed')
-            output_path = _compute_output_path(original_input, processed_dir, video_src)
+            output_path = _compute_output_path(original_input, processed_dir, video_src, video_id)
 
             # Make sure the parent directory exists. In some CI environments (e.g. when
             # PROCESSED_DIR is like '/processed') the process may not have permission
@@ -582,50 +1606,55 @@ def run(self, *args, **kwargs):
 
             # Determinar si el output es S3 o local
             is_s3_output = _is_s3_path(output_path)
+            # En modo pipe el último comando escribe fMP4 a stdout y se sube a S3 mientras codifica
+            stream_upload = is_s3_output and _output_mode() == OUTPUT_PIPE
 
-            if is_s3_output:
-                # Output es S3: enviar la ruta tal cual (string) a la función de upload
+            # Run and capture output
+            ffmpeg_start = time.monotonic()
+            for i, cmd in enumerate(cmds):
+                if stream_upload and i == len(cmds) - 1:
+                    returncode, stderr = _run_ffmpeg_to_s3(_pipe_output_cmd(cmd), output_path, on_progress=report_progress)
+                else:
+                    returncode, stderr = _run_ffmpeg(cmd, on_progress=report_progress)
+                if returncode != 0:
+                    logger.error('ffmpeg failed: %s', stderr.decode('utf-8', errors='ignore'))
+                    _raise_retry(task_self, RuntimeError('ffmpeg failed'), countdown=30,
+                                 video_id=video_id, db_url=db_url_env)
+            _log_visibility(
+                'ffmpeg_completed',
+                correlation_id=correlation_id,
+                video_id=video_id,
+                duration_ms=_elapsed_ms(ffmpeg_start),
+                tmp_output=output_path if stream_upload else str(out_file),
+                streamed_upload=stream_upload,
+            )
+
+            # At this point, out_file should exist (unless it was streamed straight to S3)
+            if not stream_upload and not out_file.exists():
+                logger.error('Expected output not found at %s', out_file)
+                _raise_retry(task_self, RuntimeError('output missing'), countdown=10,
+                             video_id=video_id, db_url=db_url_env)
+
+            if stream_upload:
+                # Ya subido durante la codificación; no hay copia local que mover
                 output_str = output_path
-                try:
-                    transfer_start = time.monotonic()
-                    _upload_to_s3(out_file, output_str)
-                    logger.info('Subido archivo procesado a S3: %s', output_str)
-                    _log_visibility(
-                        'upload_s3_completed',
-                        correlation_id=correlation_id,
-                        video_id=video_id,
-                        destination=output_str,
-                        duration_ms=_elapsed_ms(transfer_start),
-                    )
-                    # Limpiar archivo local después de subir
-                    try:
-                        out_file.unlink()
-                    except Exception as e:
-                        logger.warning('No se pudo eliminar archivo temporal %s: %s', out_file, e)
-                except Exception as e:
-                    logger.error('Failed to upload output to S3: %s', e)
-                    raise task_self.retry(exc=e, countdown=10, max_retries=2)
+                _log_visibility(
+                    'upload_s3_completed',
+                    correlation_id=correlation_id,
+                    video_id=video_id,
+                    destination=output_str,
+                    streamed=True,
+                )
             else:
-                # Output es local: output_path es ya un string de filesystem
-                output_str = output_path
                 try:
-                    transfer_start = time.monotonic()
-                    shutil.move(str(out_file), output_str)
-                    logger.info('Moved processed file to %s', output_str)
-                    _log_visibility(
-                        'output_moved',
-                        correlation_id=correlation_id,
-                        video_id=video_id,
-                        destination=output_str,
-                        duration_ms=_elapsed_ms(transfer_start),
-                    )
+                    output_str = _store_output(out_file, output_path, correlation_id=correlation_id, video_id=video_id)
                 except Exception as e:
-                    logger.error('Failed to move output to final location: %s', e)
-                    raise task_self.retry(exc=e, countdown=10, max_retries=2)
+                    logger.error('Failed to store output at %s: %s', output_path, e)
+                    _raise_retry(task_self, e, countdown=10, video_id=video_id, db_url=db_url_env)
 
             # Update database record for the video if video_id is available (direct DB update)
             db_update_start = time.monotonic()
-            _update_db_if_needed(video_id, correlation_id, output_str, db_url_env)
+            _update_db_if_needed(video_id, correlation_id, output_str, db_url_env, fingerprint)
             _log_visibility(
                 'db_update_completed',
                 correlation_id=correlation_id,
@@ -643,26 +1672,19 @@ def run(self, *args, **kwargs):
             )
             return {"status": "ok", "output": output_str}
 
+    except Retry:
+        # Reintento ya programado por _raise_retry dentro del bloque
+        raise
     except Exception as exc:
+        if getattr(exc, RETRIES_EXHAUSTED_ATTR, False):
+            # Último intento: _raise_retry ya marcó el video como failed
+            raise
         logger.exception('Processing failed')
-        raise task_self.retry(exc=exc, countdown=30, max_retries=2)
+        _raise_retry(task_self, exc, countdown=30, video_id=video_id, db_url=db_url_env)
     finally:
         # cleanup: remove temp files
         # Si descargamos desde S3, también limpiar ese archivo
-        try:
-            if _is_s3_path(original_input):
-                # Buscar y limpiar archivo descargado de S3 si existe
-                _, key = _parse_s3_path(original_input)
-                filename = key.split('/')[-1] if '/' in key else key
-                s3_download_path = Path(tempfile.gettempdir()) / f"s3_download_{filename}"
-                if s3_download_path.exists():
-                    try:
-                        s3_download_path.unlink()
-                        logger.debug('Eliminado archivo temporal descargado de S3: %s', s3_download_path)
-                    except Exception as e:
-                        logger.warning('No se pudo eliminar archivo descargado de S3 %s: %s', s3_download_path, e)
-        except Exception:
-            pass
+        _cleanup_s3_download(original_input)
 
         # Limpiar tmpdir
         try:
@@ -671,6 +1693,20 @@ def run(self, *args, **kwargs):
             pass
 
 
-def _raise_retry(task_self, exc, countdown=10, max_retries=2):
-    """Helper to raise task retry in a single line to keep run() concise."""
-    raise task_self.retry(exc=exc, countdown=countdown, max_retries=max_retries)
+def _raise_retry(task_self, exc, countdown=10, max_retries=2, *, video_id=None, db_url=None):
+    """Helper to raise task retry in a single line to keep run() concise.
+
+    On the last attempt (the retry would exceed `max_retries`) the video is
+    marked `failed` first, so it does not stay in `processing` forever.
+    """
+    retries = getattr(getattr(task_self, 'request', None), 'retries', 0)
+    if isinstance(retries, int) and retries >= max_retries:
+        _mark_failed(db_url, video_id, exc)
+    try:
+        raise task_self.retry(exc=exc, countdown=countdown, max_retries=max_retries)
+    except Retry:
+        raise
+    except Exception as final:
+        # Superado max_retries Celery relanza `exc`: se marca para que run() no lo procese otra vez
+        setattr(final, RETRIES_EXHAUSTED_ATTR, True)
+        raise
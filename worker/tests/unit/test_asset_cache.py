@@ -0,0 +1,138 @@
+import hashlib
+import multiprocessing
+import os
+
+import pytest
+from botocore.exceptions import ClientError
+
+import app.asset_cache as ac
+
+
+@pytest.fixture(autouse=True)
+def _stats_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv('ANB_ASSET_CACHE_STATS_DIR', str(tmp_path / 'stats'))
+    monkeypatch.setattr(ac, '_retired', dict.fromkeys(ac.LOOKUP_RESULTS, 0))
+
+
+class _FakeS3:
+    def __init__(self, objects):
+        self.objects = objects  # key -> bytes
+        self.heads = 0
+        self.downloads = 0
+        self.fail_head = False
+
+    def head_object(self, Bucket, Key):
+        self.heads += 1
+        if self.fail_head:
+            raise ClientError({'Error': {'Code': '503', 'Message': 'unavailable'}}, 'HeadObject')
+        body = self.objects[Key]
+        return {'ETag': f'"{hashlib.md5(body).hexdigest()}"', 'ContentLength': len(body), 'Metadata': {}}
+
+    def download_file(self, bucket, key, path):
+        self.downloads += 1
+        with open(path, 'wb') as f:
+            f.write(self.objects[key])
+
+
+def _cache(tmp_path, s3, **kw):
+    opts = {'max_bytes': 1024 * 1024, 'refresh_seconds': 300}
+    opts.update(kw)
+    return ac.AssetCache(tmp_path / 'cache', client_factory=lambda: s3, **opts)
+
+
+def test_asset_cache_downloads_once_and_serves_hits_without_network(tmp_path):
+    s3 = _FakeS3({'brand/inout.mp4': b'intro-v1'})
+    cache = _cache(tmp_path, s3)
+
+    first = cache.get('s3://bucket/brand/inout.mp4')
+    second = cache.get('s3://bucket/brand/inout.mp4')
+
+    assert first == second
+    assert first.read_bytes() == b'intro-v1'
+    assert first.name == hashlib.sha256(b'intro-v1').hexdigest() + '.mp4'
+    assert s3.heads == 1 and s3.downloads == 1
+
+
+def test_asset_cache_picks_up_new_version_after_refresh(tmp_path):
+    s3 = _FakeS3({'wm.png': b'logo-v1'})
+    cache = _cache(tmp_path, s3, refresh_seconds=0)
+    old = cache.get('s3://bucket/wm.png')
+
+    # Mismo ETag: solo revalida con HEAD
+    assert cache.get('s3://bucket/wm.png') == old
+    assert s3.downloads == 1
+
+    s3.objects['wm.png'] = b'logo-v2'
+    new = cache.get('s3://bucket/wm.png')
+    assert new != old and new.read_bytes() == b'logo-v2'
+    assert s3.downloads == 2
+
+
+def test_asset_cache_index_survives_restart(tmp_path):
+    s3 = _FakeS3({'wm.png': b'logo'})
+    _cache(tmp_path, s3).get('s3://bucket/wm.png')
+
+    restarted = _cache(tmp_path, s3)
+    assert restarted.get('s3://bucket/wm.png').read_bytes() == b'logo'
+    assert s3.downloads == 1
+
+
+def test_asset_cache_serves_stale_copy_when_s3_unavailable(tmp_path):
+    s3 = _FakeS3({'wm.png': b'logo'})
+    cache = _cache(tmp_path, s3, refresh_seconds=0)
+    path = cache.get('s3://bucket/wm.png')
+
+    s3.fail_head = True
+    assert cache.get('s3://bucket/wm.png') == path
+
+    with pytest.raises(RuntimeError):
+        _cache(tmp_path / 'other', s3).get('s3://bucket/wm.png')
+
+
+def test_asset_cache_rejects_corrupt_download(tmp_path):
+    s3 = _FakeS3({'wm.png': b'logo'})
+    s3.download_file = lambda bucket, key, path: open(path, 'wb').write(b'truncated')
+    cache = _cache(tmp_path, s3)
+
+    with pytest.raises(RuntimeError, match='Verificación'):
+        cache.get('s3://bucket/wm.png')
+    assert [p.name for p in (tmp_path / 'cache').iterdir()] == []
+
+
+def test_asset_cache_evicts_least_recently_used(tmp_path):
+    s3 = _FakeS3({'a.bin': b'a' * 600, 'b.bin': b'b' * 600})
+    cache = _cache(tmp_path, s3, max_bytes=1000)
+
+    a = cache.get('s3://bucket/a.bin')
+    os.utime(a, (1, 1))
+    b = cache.get('s3://bucket/b.bin')
+
+    assert b.exists()
+    assert not a.exists()
+
+
+def _lookup_twice_in_child(cache_dir, s3):
+    cache = ac.AssetCache(cache_dir, max_bytes=1024 * 1024, refresh_seconds=300, client_factory=lambda: s3)
+    cache.get('s3://bucket/wm.png')
+    cache.get('s3://bucket/wm.png')
+
+
+def test_lookups_in_pool_children_reach_the_parent_exporter(tmp_path):
+    """Los hits/misses se cuentan en los hijos del prefork; el /metrics del padre debe verlos."""
+    pytest.importorskip('celery')
+    from prometheus_client import REGISTRY
+    import app.celery_app  # noqa: F401 - registra el collector
+
+    s3 = _FakeS3({'wm.png': b'logo'})
+    ctx = multiprocessing.get_context('fork')
+    for _ in range(2):
+        child = ctx.Process(target=_lookup_twice_in_child, args=(tmp_path / 'cache', s3))
+        child.start()
+        child.join(10)
+        assert child.exitcode == 0
+
+    # Los hijos ya terminaron: sus totales se acumulan y el contador no retrocede
+    for _ in range(2):
+        assert REGISTRY.get_sample_value('anb_worker_asset_cache_total', {'result': 'miss'}) == 1
+        assert REGISTRY.get_sample_value('anb_worker_asset_cache_total', {'result': 'hit'}) == 3
+    assert not list((tmp_path / 'stats').glob('assetcache-*.json'))
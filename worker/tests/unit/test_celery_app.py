@@ -1,6 +1,8 @@
 import importlib
 import os
 import sys
+import threading
+import time
 from unittest import mock
 
 import pytest
@@ -89,3 +91,84 @@ def test_task_failure_updates_metrics(monkeypatch):
 
     counter_mock.labels.assert_called_once_with(task_name='dummy.task', status='failure')
     labels_mock.inc.assert_called_once_with()
+
+
+def test_adaptive_autoscaler_tracks_cores_and_backlog(monkeypatch, tmp_path):
+    mod = reload_module(
+        monkeypatch,
+        ANB_ADAPTIVE_CONCURRENCY='1',
+        ANB_CONCURRENCY_STATE_FILE=str(tmp_path / 'state.json'),
+    )
+    assert mod.app.conf.worker_autoscaler == 'app.celery_app:AdaptiveAutoscaler'
+
+    class DummyPool:
+        num_processes = 1
+
+        def grow(self, n):
+            self.num_processes += n
+
+        def shrink(self, n):
+            self.num_processes -= n
+
+    monkeypatch.setattr(mod.os, 'cpu_count', lambda: 8)
+    monkeypatch.setattr(mod.sqs_batch, 'queue_backlog', lambda: 3)
+    monkeypatch.setattr(mod.concurrency, 'read_cpu_times', lambda: None)
+    monkeypatch.setattr(mod.concurrency, 'load_per_core', lambda cores: 0.2)
+    gauge = mock.Mock()
+    monkeypatch.setitem(mod.CONTROLLER_GAUGES, 'anb_worker_ffmpeg_threads', gauge)
+
+    scaler = mod.AdaptiveAutoscaler(DummyPool(), max_concurrency=6, min_concurrency=1)
+    assert scaler._backlog.wait(5)
+    assert scaler._maybe_scale() is True
+
+    # 3 mensajes en cola -> 3 procesos x 2 threads sobre 8 cores
+    assert scaler.processes == 3
+    assert mod.concurrency.thread_hint() == '2'
+    gauge.set.assert_called_once_with(2)
+    # Dentro del intervalo no vuelve a decidir
+    assert scaler._maybe_scale() is False
+    scaler._backlog.stop()
+
+
+def test_adaptive_autoscaler_never_calls_sqs_on_the_hub(monkeypatch, tmp_path):
+    mod = reload_module(
+        monkeypatch,
+        ANB_ADAPTIVE_CONCURRENCY='1',
+        ANB_CONCURRENCY_STATE_FILE=str(tmp_path / 'state.json'),
+    )
+
+    class DummyPool:
+        num_processes = 2
+
+        def grow(self, n):
+            self.num_processes += n
+
+        def shrink(self, n):
+            self.num_processes -= n
+
+    sqs_slow = threading.Event()
+    sampled_in = []
+
+    def _slow_backlog():
+        sampled_in.append(threading.current_thread().name)
+        sqs_slow.wait(5)  # SQS colgado
+        return 4
+
+    monkeypatch.setattr(mod.sqs_batch, 'queue_backlog', _slow_backlog)
+    monkeypatch.setattr(mod.os, 'cpu_count', lambda: 8)
+    monkeypatch.setattr(mod.concurrency, 'read_cpu_times', lambda: None)
+    monkeypatch.setattr(mod.concurrency, 'load_per_core', lambda cores: 0.2)
+
+    scaler = mod.AdaptiveAutoscaler(DummyPool(), max_concurrency=6, min_concurrency=1)
+    start = time.monotonic()
+    # Sin muestra todavía: no decide ni espera a SQS
+    assert scaler._maybe_scale() is False
+    assert time.monotonic() - start < 1
+    assert scaler.processes == 2
+
+    sqs_slow.set()
+    assert scaler._backlog.wait(5)
+    assert scaler._maybe_scale() is True
+    assert scaler.processes == 4
+    assert sampled_in and sampled_in[0] == 'anb-backlog-sampler'
+    scaler._backlog.stop()
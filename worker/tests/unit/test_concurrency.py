@@ -0,0 +1,25 @@
+import app.concurrency as cc
+
+
+def test_plan_splits_cores_across_processes():
+    assert cc.plan(8, current=1, busy=1, backlog=7, cpu_util=0.5, load=0.5, min_procs=1, max_procs=4) == (4, 2)
+    assert cc.plan(8, current=4, busy=0, backlog=0, cpu_util=0.1, load=0.1, min_procs=1, max_procs=4) == (1, 8)
+
+
+def test_plan_sheds_a_process_under_pressure():
+    target, threads = cc.plan(4, current=4, busy=4, backlog=10, cpu_util=0.97, load=2.0, min_procs=1, max_procs=4)
+    assert (target, threads) == (3, 1)
+
+
+def test_thread_hint_ignores_stale_state(monkeypatch, tmp_path):
+    monkeypatch.setenv("ANB_CONCURRENCY_STATE_FILE", str(tmp_path / "state.json"))
+    assert cc.thread_hint() is None
+
+    cc.publish(2, 4)
+    assert cc.thread_hint() == "4"
+    assert cc.thread_hint(max_age_seconds=-1) is None
+
+
+def test_cpu_utilization_from_samples():
+    assert cc.cpu_utilization((100, 1000), (150, 1100)) == 0.5
+    assert cc.cpu_utilization(None, (150, 1100)) is None
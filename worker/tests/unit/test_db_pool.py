@@ -0,0 +1,80 @@
+import json
+import os
+
+import app.db_pool as db_pool
+
+
+class _FakePool:
+    def __init__(self, conninfo, **kwargs):
+        self.conninfo = conninfo
+        self.kwargs = kwargs
+        self.closed = False
+
+    @staticmethod
+    def check_connection(conn):
+        return None
+
+    def get_stats(self):
+        return {"pool_size": 2, "pool_available": 1, "requests_num": 5, "connections_lost": 1}
+
+    def close(self):
+        self.closed = True
+
+
+def _reset(monkeypatch, tmp_path):
+    monkeypatch.setenv("ANB_DB_POOL_STATS_DIR", str(tmp_path))
+    monkeypatch.setattr(db_pool, "ConnectionPool", _FakePool)
+    monkeypatch.setattr(db_pool, "_POOL_AVAILABLE", True)
+    monkeypatch.setattr(db_pool, "_state", {"enabled": False, "max_size": 1, "pid": None, "pool": None, "stats_at": 0.0})
+
+
+def test_get_pool_is_disabled_until_enabled(monkeypatch, tmp_path):
+    _reset(monkeypatch, tmp_path)
+    assert db_pool.get_pool("postgresql://db") is None
+
+    db_pool.enable(3)
+    pool = db_pool.get_pool("postgresql://db")
+
+    assert db_pool.get_pool("postgresql://db") is pool
+    assert pool.kwargs["max_size"] == 3
+    assert pool.kwargs["kwargs"] == {"autocommit": True}
+    assert pool.kwargs["check"] is _FakePool.check_connection
+
+
+def test_get_pool_recreates_pool_after_fork(monkeypatch, tmp_path):
+    _reset(monkeypatch, tmp_path)
+    db_pool.enable(1)
+    inherited = db_pool.get_pool("postgresql://db")
+
+    # Simula un hijo del pool: el pid ya no coincide con el dueño del pool heredado
+    db_pool._state["pid"] = -1
+
+    assert db_pool.get_pool("postgresql://db") is not inherited
+
+
+def test_env_can_disable_pooling(monkeypatch, tmp_path):
+    _reset(monkeypatch, tmp_path)
+    monkeypatch.setenv("ANB_DB_POOL_ENABLED", "0")
+    db_pool.enable(4)
+    assert db_pool.get_pool("postgresql://db") is None
+
+
+def test_stats_are_published_aggregated_and_cleaned(monkeypatch, tmp_path):
+    _reset(monkeypatch, tmp_path)
+    db_pool.enable(2)
+    db_pool.get_pool("postgresql://db")
+    db_pool.publish_stats(force=True)
+    # Archivo de un proceso que ya no existe
+    dead = tmp_path / "dbpool-999999999.json"
+    dead.write_text(json.dumps({"pool_size": 7}))
+    monkeypatch.setattr(db_pool, "pid_alive", lambda pid: pid == os.getpid())
+
+    totals = db_pool.aggregate_stats()
+
+    assert totals["pool_size"] == 2
+    assert totals["connections_lost"] == 1
+    assert totals["requests_waiting"] == 0
+    assert not dead.exists()
+
+    db_pool.close_pool()
+    assert not (tmp_path / f"dbpool-{os.getpid()}.json").exists()
@@ -0,0 +1,74 @@
+import types
+
+import pytest
+
+import app.encoder_profiles as ep
+
+
+@pytest.fixture(autouse=True)
+def _clean_env(monkeypatch):
+    for var in ("ANB_ENCODER_PROFILE", ep.SELECTED_PROFILE_ENV, "FFMPEG_PRESET", "FFMPEG_CRF", "FFMPEG_THREADS"):
+        monkeypatch.delenv(var, raising=False)
+
+
+def _fake_benchmark(monkeypatch, seconds_by_preset, failing=()):
+    """Simulate ffmpeg runs whose duration depends on the preset of the command."""
+    clock = {"now": 0.0}
+
+    def fake_run(cmd, **kwargs):
+        preset = cmd[cmd.index("-preset") + 1]
+        clock["now"] += seconds_by_preset[preset]
+        return types.SimpleNamespace(returncode=1 if preset in failing else 0, stderr="boom")
+
+    monkeypatch.setattr("subprocess.run", fake_run)
+    monkeypatch.setattr(ep.time, "monotonic", lambda: clock["now"])
+
+
+def test_default_profile_matches_legacy_settings():
+    args = ep.encoder_args(ep.encoder_settings())
+    assert args == ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "25", "-pix_fmt", "yuv420p", "-an", "-threads", "2"]
+
+
+def test_named_profile_with_env_overrides(monkeypatch):
+    monkeypatch.setenv("ANB_ENCODER_PROFILE", "quality")
+    monkeypatch.setenv("FFMPEG_THREADS", "6")
+    settings = ep.encoder_settings()
+
+    assert settings["profile"] == "quality"
+    assert settings["threads"] == "6"
+    assert ["-tune", "film"] == ep.encoder_args(settings)[6:8]
+
+
+def test_unknown_profile_falls_back_to_default(monkeypatch):
+    monkeypatch.setenv("ANB_ENCODER_PROFILE", "turbo")
+    assert ep.encoder_settings()["profile"] == ep.DEFAULT_PROFILE
+
+
+def test_calibration_picks_best_profile_within_target(monkeypatch):
+    monkeypatch.setenv("ANB_TARGET_SECONDS_PER_VIDEO", "40")
+    # clip 5 s -> video 40 s: factor x8
+    _fake_benchmark(monkeypatch, {"medium": 10.0, "veryfast": 4.0, "ultrafast": 1.0})
+
+    selected, estimates = ep.calibrate()
+
+    assert selected == "balanced"
+    assert estimates == {"quality": 80.0, "balanced": 32.0, "throughput": 8.0}
+
+
+def test_calibration_skips_failing_profiles_and_falls_back(monkeypatch):
+    monkeypatch.setenv("ANB_TARGET_SECONDS_PER_VIDEO", "1")
+    _fake_benchmark(monkeypatch, {"medium": 1.0, "veryfast": 1.0, "ultrafast": 1.0}, failing=("medium",))
+
+    selected, estimates = ep.calibrate()
+
+    assert selected == ep.DEFAULT_PROFILE
+    assert "quality" not in estimates
+
+
+def test_auto_profile_uses_calibrated_selection(monkeypatch):
+    monkeypatch.setenv("ANB_ENCODER_PROFILE", "auto")
+    assert ep.calibration_enabled()
+    assert ep.encoder_settings()["profile"] == ep.DEFAULT_PROFILE
+
+    monkeypatch.setenv(ep.SELECTED_PROFILE_ENV, "quality")
+    assert ep.encoder_settings()["profile"] == "quality"
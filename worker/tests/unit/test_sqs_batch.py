@@ -0,0 +1,87 @@
+import base64
+import json
+
+import app.sqs_batch as sb
+
+
+def _kombu_body(task, args, kwargs, *, b64_envelope=True):
+    """Build an SQS message body the way kombu/Celery (protocol v2) publish it."""
+    inner = base64.b64encode(json.dumps([args, kwargs, {}]).encode()).decode()
+    envelope = json.dumps({
+        "body": inner,
+        "content-encoding": "utf-8",
+        "content-type": "application/json",
+        "headers": {"task": task, "id": "task-1"},
+        "properties": {"body_encoding": "base64", "delivery_tag": "tag"},
+    })
+    return base64.b64encode(envelope.encode()).decode() if b64_envelope else envelope
+
+
+class _FakeSQS:
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.deleted = []
+        self.released = []
+
+    def get_queue_url(self, QueueName):
+        return {"QueueUrl": f"https://sqs/{QueueName}"}
+
+    def receive_message(self, **kwargs):
+        return {"Messages": self.batches.pop(0)} if self.batches else {}
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout):
+        self.released.append((ReceiptHandle, VisibilityTimeout))
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self.deleted.append(ReceiptHandle)
+
+
+def _use_fake(monkeypatch, fake):
+    monkeypatch.setattr(sb, "_sqs_client", lambda: fake)
+    monkeypatch.setattr(sb, "_queue_url", lambda: "https://sqs/video_tasks")
+
+
+def test_decode_task_message_handles_both_envelope_encodings():
+    for b64 in (True, False):
+        decoded = sb.decode_task_message(
+            _kombu_body(sb.RUN_TASK_NAME, ["vid", "s3://b/k.mp4", "corr"], {"content_sha256": "abc"}, b64_envelope=b64)
+        )
+        assert decoded == (sb.RUN_TASK_NAME, ["vid", "s3://b/k.mp4", "corr"], {"content_sha256": "abc"}, "task-1")
+    assert sb.decode_task_message("not json") is None
+
+
+def test_drain_keeps_run_messages_and_releases_others(monkeypatch):
+    fake = _FakeSQS([[
+        {"ReceiptHandle": "r1", "Body": _kombu_body(sb.RUN_TASK_NAME, ["v1", "/mnt/uploads/a.mp4"], {})},
+        {"ReceiptHandle": "r2", "Body": _kombu_body("other.task", [], {})},
+    ]])
+    _use_fake(monkeypatch, fake)
+
+    pending = sb.drain_pending_runs(3)
+
+    assert [p.receipt_handle for p in pending] == ["r1"]
+    assert pending[0].args == ["v1", "/mnt/uploads/a.mp4"]
+    assert fake.released == [("r2", 0)]
+
+    sb.ack(pending[0])
+    sb.release(pending[0])
+    assert fake.deleted == ["r1"]
+    assert fake.released[-1] == ("r1", 0)
+
+
+def test_drain_reads_receive_count_for_the_redrive_policy(monkeypatch):
+    fake = _FakeSQS([[
+        {
+            "ReceiptHandle": "r1",
+            "Body": _kombu_body(sb.RUN_TASK_NAME, ["v1", "/mnt/uploads/a.mp4"], {}),
+            "Attributes": {"ApproximateReceiveCount": "5"},
+        },
+        {"ReceiptHandle": "r2", "Body": _kombu_body(sb.RUN_TASK_NAME, ["v2", "/mnt/uploads/b.mp4"], {})},
+    ]])
+    _use_fake(monkeypatch, fake)
+    monkeypatch.setenv("SQS_MAX_RECEIVE_COUNT", "5")
+
+    first, second = sb.drain_pending_runs(2)
+
+    assert (first.receive_count, first.last_receive) == (5, True)
+    assert (second.receive_count, second.last_receive) == (1, False)